@@ -1,17 +1,23 @@
 import os
-from typing import Dict, List, Any
-import google.generativeai as genai
-from app.schemas.models import Citation, ChatMessage, ChatResponse
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.schemas.models import Citation, ChatResponse
 from app.rag.retriever import RAGRetriever
+from app.llm import LLMClient, LLMUnavailable, create_llm_provider
+from app.memory.history import HistoryManager
+from app.memory.records import MessageRecord
+from app.context import CHAT_HISTORY_TOKENS, ContextPacker, count_tokens, get_prompt_metrics
 
 
 class ChatAgent:
     def __init__(self, gemini_api_key: str = None):
-        api_key = gemini_api_key or os.getenv("GOOGLE_API_KEY")
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel('gemini-1.5-pro')
+        # Provider chosen by LLM_PROVIDER; an explicit key gets its own Gemini client
+        self.llm = LLMClient(create_llm_provider("gemini", api_key=gemini_api_key) if gemini_api_key else None)
         self.retriever = RAGRetriever()
-        self.model = "gemini-1.5-pro"
+        self.model = self.llm.model_name
+        self.packer = ContextPacker()
+        self.history = HistoryManager()
+        # "on" answers with the retrieved guidance when the LLM is unavailable
+        self.llm_fallback = os.getenv("LLM_FALLBACK", "on") != "off"
 
         self.system_prompt = """You are a knowledgeable assistant specialized in NICE NG12 cancer guidelines.
 
@@ -29,60 +35,194 @@ Instructions:
 - Focus on cancer risk assessment and referral pathways
 """
 
+    def _build_prompt(
+        self,
+        message: str,
+        conversation_history: List[MessageRecord],
+        retrieved_texts: List[str],
+        citations: List[Citation],
+        session_id: str = "",
+    ) -> Tuple[str, List[Citation]]:
+        """
+        Build the full conversation prompt with system prompt and context.
+        Older turns are replaced by the session's rolling summary; the
+        recent window (up to CHAT_HISTORY_TOKENS) and retrieved chunks are
+        packed into the token budget. Returns the prompt and the citations
+        for the chunks that made it in.
+        """
+        summary, recent = self.history.build(session_id, conversation_history)
+        summary_block = f"Summary of the earlier conversation:\n{summary}\n\n" if summary else ""
+
+        available = self.packer.remaining(
+            self.system_prompt, summary_block, message, "--- Relevant Guidelines Context ---"
+        )
+        history, history_tokens = self.packer.pack_history(
+            recent, min(CHAT_HISTORY_TOKENS, available // 2)
+        )
+        packed = self.packer.pack_chunks(retrieved_texts, citations, budget=available - history_tokens)
+
+        # Current user message with retrieval context
+        context_info = "\n\n".join([f"Relevant NG12 content:\n{text}" for text in packed.texts])
+        user_message = f"{message}\n\n--- Relevant Guidelines Context ---\n{context_info}"
+
+        # Build full conversation with system prompt, straight from the records
+        parts = [f"{self.system_prompt}\n\n{summary_block}"]
+        for msg in history:
+            role = "User" if msg.role == "user" else "Assistant"
+            parts.append(f"{role}: {msg.content}\n\n")
+        parts.append(f"User: {user_message}\n\nAssistant:")
+        full_messages = "".join(parts)
+        get_prompt_metrics().record(
+            "chat", count_tokens(full_messages), packed.tokens,
+            history_tokens + count_tokens(summary_block),
+            turn=len(conversation_history) // 2 + 1,
+        )
+        return full_messages, packed.citations
+
+    def _generation_config(self) -> Dict[str, Any]:
+        return {"max_output_tokens": 1024, "temperature": 0.7}
+
+    def _fallback_answer(self, citations: List[Citation], error: LLMUnavailable) -> str:
+        """Retrieval-only answer: the guidance that would have grounded the reply."""
+        lines = [
+            f"I can't generate an answer right now ({error}). "
+            "These NG12 passages are the most relevant to your question:"
+        ]
+        for citation in citations[:3]:
+            lines.append(f"- {citation.excerpt.strip()} [Source: NG12, page {citation.page}]")
+        if not citations:
+            lines = [f"I can't generate an answer right now ({error}), and no relevant NG12 passages were found."]
+        return "\n".join(lines)
+
+    def _retrieve(
+        self,
+        message: str,
+        top_k: int,
+        retrieval_mode: str = "dense",
+        dense_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+        sections: Optional[List[str]] = None,
+    ) -> Tuple[List[str], List[Citation]]:
+        if retrieval_mode == "hybrid":
+            return self.retriever.retrieve_hybrid(
+                message, top_k=top_k, dense_weight=dense_weight, lexical_weight=lexical_weight,
+                sections=sections,
+            )
+        return self.retriever.retrieve(message, top_k=top_k, sections=sections)
+
+    async def _retrieve_async(
+        self,
+        message: str,
+        top_k: int,
+        retrieval_mode: str = "dense",
+        dense_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+        sections: Optional[List[str]] = None,
+    ) -> Tuple[List[str], List[Citation]]:
+        if retrieval_mode == "hybrid":
+            return await self.retriever.retrieve_hybrid_async(
+                message, top_k=top_k, dense_weight=dense_weight, lexical_weight=lexical_weight,
+                sections=sections,
+            )
+        return await self.retriever.retrieve_async(message, top_k=top_k, sections=sections)
+
     def chat(
         self,
         session_id: str,
         message: str,
-        conversation_history: List[ChatMessage],
-        top_k: int = 5
+        conversation_history: List[MessageRecord],
+        top_k: int = 5,
+        bypass_cache: bool = False,
+        **retrieval_options
     ) -> ChatResponse:
         """Process a chat message and generate response with citations."""
 
         # Step 1: Retrieve relevant NG12 content
-        retrieved_texts, citations = self.retriever.retrieve(message, top_k=top_k)
+        retrieved_texts, citations = self._retrieve(message, top_k, **retrieval_options)
 
         # Step 2: Build conversation context for LLM
-        messages = []
-
-        # Add previous messages
-        for msg in conversation_history:
-            messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
+        full_messages, citations = self._build_prompt(
+            message, conversation_history, retrieved_texts, citations, session_id
+        )
 
-        # Add current user message with retrieval context
-        context_info = "\n\n".join([f"Relevant NG12 content:\n{text}" for text in retrieved_texts])
+        # Step 3: Call LLM
+        try:
+            answer = self.llm.generate(full_messages, self._generation_config(), bypass_cache).strip()
+        except LLMUnavailable as e:
+            if not self.llm_fallback:
+                raise
+            return ChatResponse(
+                session_id=session_id, answer=self._fallback_answer(citations, e), citations=citations, degraded=True
+            )
 
-        user_message = f"{message}\n\n--- Relevant Guidelines Context ---\n{context_info}"
+        # Step 4: Return response with citations
+        return ChatResponse(
+            session_id=session_id,
+            answer=answer,
+            citations=citations
+        )
 
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
+    async def chat_async(
+        self,
+        session_id: str,
+        message: str,
+        conversation_history: List[MessageRecord],
+        top_k: int = 5,
+        bypass_cache: bool = False,
+        **retrieval_options
+    ) -> ChatResponse:
+        """Async variant of chat() for the request path."""
+        retrieved_texts, citations = await self._retrieve_async(message, top_k, **retrieval_options)
 
-        # Step 3: Call LLM
-        # Build full conversation with system prompt
-        full_messages = f"{self.system_prompt}\n\n"
-        for msg in messages:
-            role = "User" if msg["role"] == "user" else "Assistant"
-            full_messages += f"{role}: {msg['content']}\n\n"
-
-        full_messages += "Assistant:"
-
-        response = self.client.generate_content(
-            full_messages,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=1024,
-                temperature=0.7,
-            )
+        full_messages, citations = self._build_prompt(
+            message, conversation_history, retrieved_texts, citations, session_id
         )
 
-        answer = response.text.strip()
+        try:
+            answer = await self.llm.generate_async(full_messages, self._generation_config(), bypass_cache)
+        except LLMUnavailable as e:
+            if not self.llm_fallback:
+                raise
+            return ChatResponse(
+                session_id=session_id, answer=self._fallback_answer(citations, e), citations=citations, degraded=True
+            )
 
-        # Step 4: Return response with citations
         return ChatResponse(
             session_id=session_id,
-            answer=answer,
+            answer=answer.strip(),
             citations=citations
         )
+
+    async def chat_stream(
+        self,
+        session_id: str,
+        message: str,
+        conversation_history: List[MessageRecord],
+        top_k: int = 5,
+        bypass_cache: bool = False,
+        **retrieval_options
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of chat().
+        Yields ("citations", List[Citation]) first, then ("token", str) for
+        each chunk of the answer, and finally ("done", full_answer).
+        """
+        retrieved_texts, citations = await self._retrieve_async(message, top_k, **retrieval_options)
+        full_messages, citations = self._build_prompt(
+            message, conversation_history, retrieved_texts, citations, session_id
+        )
+        yield "citations", citations
+
+        parts = []
+        try:
+            async for text in self.llm.stream(full_messages, self._generation_config(), bypass_cache):
+                parts.append(text)
+                yield "token", text
+        except LLMUnavailable as e:
+            # Once tokens have been sent the answer can't be replaced
+            if parts or not self.llm_fallback:
+                raise
+            parts.append(self._fallback_answer(citations, e))
+            yield "token", parts[0]
+
+        yield "done", "".join(parts).strip()
@@ -1,19 +1,43 @@
+import asyncio
 import json
 import os
-from typing import Dict, Any, List
-import google.generativeai as genai
-from app.schemas.models import Citation, AssessmentResponse
+import re
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from app.schemas.models import Citation, AssessmentResponse, BatchAssessmentItem
 from app.rag.retriever import RAGRetriever
-from app.tools.patient_tool import get_patient_data
+from app.rag.registry import get_index_version
+from app.rag.routing import get_routing_index
+from app.tools.patient_tool import get_patient_data, get_patient_store, patient_payload
+from app.tools.triage import TriageResult, get_rule_engine
+from app.cache import get_assessment_cache
+from app.llm import LLMClient, LLMUnavailable, create_llm_provider
+from app.concurrency import get_single_flight
+from app.context import ContextPacker, count_tokens, get_prompt_metrics
 
 
 class ClinicalDecisionAgent:
     def __init__(self, gemini_api_key: str = None):
-        api_key = gemini_api_key or os.getenv("GOOGLE_API_KEY")
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel('gemini-1.5-pro')
+        # Provider chosen by LLM_PROVIDER; an explicit key gets its own Gemini client
+        self.llm = LLMClient(create_llm_provider("gemini", api_key=gemini_api_key) if gemini_api_key else None)
         self.retriever = RAGRetriever()
-        self.model = "gemini-1.5-pro"
+        self.model = self.llm.model_name
+        # "dense" (vector only), "hybrid" (BM25 fused with vector results) or
+        # "multi" (one sub-query per symptom, fused with RRF)
+        self.retrieval_mode = os.getenv("ASSESSMENT_RETRIEVAL_MODE", "dense")
+        self.multi_top_k = int(os.getenv("ASSESSMENT_MULTI_TOP_K", "6"))
+        self.context_tokens = int(os.getenv("ASSESSMENT_CONTEXT_TOKENS", "1200"))
+        # "sections" narrows retrieval to NG12 sections mentioning the
+        # patient's symptoms (see app.rag.routing); "off" searches everything
+        self.routing_mode = os.getenv("ASSESSMENT_ROUTING", "sections")
+        self.routing_stats = {"routed": 0, "fallback": 0, "unrouted": 0}
+        # "rules" lets definitive NG12 rule matches decide without the LLM and
+        # passes other matches to it as a prior; "prior" always calls the LLM;
+        # "off" skips the rule table (see app/data/ng12_rules.json)
+        self.triage_mode = os.getenv("ASSESSMENT_TRIAGE", "rules")
+        self.decision_stats = {"rules": 0, "llm_with_prior": 0, "llm": 0, "llm_unparsed": 0, "llm_unavailable": 0}
+        # "on" answers from the rule table and retrieved guidance when the LLM is unavailable
+        self.llm_fallback = os.getenv("LLM_FALLBACK", "on") != "off"
+        self.packer = ContextPacker()
 
         self.system_prompt = """You are a clinical decision support specialist trained on NICE NG12 cancer guidelines.
 
@@ -37,18 +61,19 @@ Guidelines for recommendations:
 - Routine GP Screening: Atypical symptoms without strong clinical indicators
 """
 
-    def assess_patient(self, patient_id: str) -> AssessmentResponse:
-        """Assess patient risk based on NG12 guidelines."""
-
-        # Step 1: Get patient data using tool
-        patient_data = get_patient_data(patient_id)
-
-        # Step 2: Query retriever for relevant NG12 content
-        query = f"Cancer risk assessment symptoms: {', '.join(patient_data['symptoms'])}"
-        retrieved_texts, citations = self.retriever.retrieve(query, top_k=3)
-
-        # Step 3: Create context for LLM
-        context = f"""
+    def _build_prompt(
+        self,
+        patient_data: Dict[str, Any],
+        retrieved_texts: List[str],
+        citations: List[Citation],
+        triage: Optional[TriageResult] = None,
+    ) -> Tuple[str, List[Citation]]:
+        """
+        Create the full LLM prompt from patient data and retrieved context.
+        Context is packed into whatever the token budget leaves after the
+        fixed parts; returns the prompt and the citations actually used.
+        """
+        patient_block = f"""
 Patient Data:
 - ID: {patient_data['patient_id']}
 - Name: {patient_data['name']}
@@ -56,48 +81,386 @@ Patient Data:
 - Symptoms: {', '.join(patient_data['symptoms'])}
 - Medical History: {', '.join(patient_data['medical_history']) if patient_data['medical_history'] else 'None'}
 - Risk Factors: {', '.join(patient_data['risk_factors'])}
-
+"""
+        if triage is not None:
+            patient_block += (
+                f"\nRule-based pre-triage suggests: {triage.recommendation}. {triage.describe()}\n"
+                "Confirm or override this with reasoning grounded in the guideline context.\n"
+            )
+        header = f"{self.system_prompt}\n\nAssess this patient:\n"
+        footer = "\n\nProvide your assessment as JSON with keys: recommendation, reasoning"
+        packed = self.packer.pack_chunks(
+            retrieved_texts, citations, budget=self.packer.remaining(header, patient_block, footer)
+        )
+        context = f"""{patient_block}
 NG12 Guideline Context:
-{chr(10).join([f"- {text[:300]}..." for text in retrieved_texts])}
+{chr(10).join([f"- {text}" for text in packed.texts])}
 """
+        prompt = f"{header}{context}{footer}"
+        get_prompt_metrics().record("assessment", count_tokens(prompt), packed.tokens)
+        return prompt, packed.citations
+
+    def _generation_config(self) -> Dict[str, Any]:
+        # A plain dict so it can be hashed into the LLM response cache key
+        return {"max_output_tokens": 1024, "temperature": 0.7}
+
+    def _build_query(self, patient_data: Dict[str, Any]) -> str:
+        return f"Cancer risk assessment symptoms: {', '.join(patient_data['symptoms'])}"
+
+    def _build_queries(self, patient_data: Dict[str, Any]) -> List[str]:
+        """One sub-query per symptom, so unrelated symptoms don't blur one embedding."""
+        if not patient_data['symptoms']:
+            return [self._build_query(patient_data)]
+        return [f"Cancer risk assessment symptom: {symptom}" for symptom in patient_data['symptoms']]
+
+    def _route(self, patient_data: Dict[str, Any]) -> Optional[List[str]]:
+        """NG12 sections to search for this patient, or None to search everything."""
+        if self.routing_mode == "off":
+            return None
+        index = get_routing_index(self.retriever.chroma_db_path)
+        sections = index.route(patient_data['symptoms']) if index is not None else []
+        if not sections:
+            self.routing_stats["unrouted"] += 1
+            return None
+        return sections
 
-        # Step 4: Call LLM to generate assessment
-        full_prompt = f"{self.system_prompt}\n\nAssess this patient:\n{context}\n\nProvide your assessment as JSON with keys: recommendation, reasoning"
+    def _check_routed(self, sections: Optional[List[str]], texts: List[str], top_k: int) -> bool:
+        """True if routed results are usable; False means retry without the filter."""
+        if sections is None:
+            return True
+        if len(texts) < top_k:
+            self.routing_stats["fallback"] += 1
+            return False
+        self.routing_stats["routed"] += 1
+        return True
 
-        response = self.client.generate_content(
-            full_prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=1024,
-                temperature=0.7,
+    def _search(
+        self, patient_data: Dict[str, Any], top_k: int, sections: Optional[List[str]]
+    ) -> Tuple[List[str], List[Citation]]:
+        if self.retrieval_mode == "multi":
+            return self.retriever.retrieve_multi(
+                self._build_queries(patient_data), top_k=self.multi_top_k,
+                sections=sections, max_tokens=self.context_tokens,
             )
+        query = self._build_query(patient_data)
+        if self.retrieval_mode == "hybrid":
+            return self.retriever.retrieve_hybrid(query, top_k=top_k, sections=sections)
+        return self.retriever.retrieve(query, top_k=top_k, sections=sections)
+
+    async def _search_async(
+        self, patient_data: Dict[str, Any], top_k: int, sections: Optional[List[str]]
+    ) -> Tuple[List[str], List[Citation]]:
+        if self.retrieval_mode == "multi":
+            return await self.retriever.retrieve_multi_async(
+                self._build_queries(patient_data), top_k=self.multi_top_k,
+                sections=sections, max_tokens=self.context_tokens,
+            )
+        query = self._build_query(patient_data)
+        if self.retrieval_mode == "hybrid":
+            return await self.retriever.retrieve_hybrid_async(query, top_k=top_k, sections=sections)
+        return await self.retriever.retrieve_async(query, top_k=top_k, sections=sections)
+
+    def _retrieve(self, patient_data: Dict[str, Any], top_k: int = 3) -> Tuple[List[str], List[Citation]]:
+        """Retrieve guideline context, narrowed to the patient's routed sections."""
+        sections = self._route(patient_data)
+        texts, citations = self._search(patient_data, top_k, sections)
+        if not self._check_routed(sections, texts, top_k):
+            texts, citations = self._search(patient_data, top_k, None)
+        return texts, citations
+
+    async def _retrieve_async(
+        self, patient_data: Dict[str, Any], top_k: int = 3
+    ) -> Tuple[List[str], List[Citation]]:
+        """Async variant of _retrieve()."""
+        sections = self._route(patient_data)
+        texts, citations = await self._search_async(patient_data, top_k, sections)
+        if not self._check_routed(sections, texts, top_k):
+            texts, citations = await self._search_async(patient_data, top_k, None)
+        return texts, citations
+
+    async def _search_many_async(
+        self, patients: List[Dict[str, Any]], top_k: int, sections: Optional[List[str]]
+    ) -> List[Tuple[List[str], List[Citation]]]:
+        """Retrieve for several patients with one batched encode and backend lookup."""
+        if self.retrieval_mode == "multi":
+            return await self.retriever.retrieve_multi_many_async(
+                [self._build_queries(patient_data) for patient_data in patients],
+                top_k=self.multi_top_k, sections=sections, max_tokens=self.context_tokens,
+            )
+        queries = [self._build_query(patient_data) for patient_data in patients]
+        return await self.retriever.retrieve_many_async(queries, top_k=top_k, sections=sections)
+
+    def _triage(self, patient_data: Dict[str, Any]) -> Optional[TriageResult]:
+        """Rule-table pre-triage result for the patient, if any rule matches."""
+        if self.triage_mode == "off":
+            return None
+        engine = get_rule_engine()
+        return engine.evaluate(patient_data) if engine is not None else None
+
+    def _decides(self, triage: Optional[TriageResult]) -> bool:
+        """True if the rule result stands on its own, without an LLM call."""
+        return triage is not None and triage.definitive and self.triage_mode == "rules"
+
+    def _rule_response(
+        self,
+        patient_data: Dict[str, Any],
+        triage: TriageResult,
+        citations: List[Citation],
+    ) -> AssessmentResponse:
+        """Assessment decided by the rule table alone."""
+        self.decision_stats["rules"] += 1
+        return AssessmentResponse(
+            patient_id=patient_data['patient_id'],
+            patient_name=patient_data['name'],
+            age=patient_data['age'],
+            symptoms=patient_data['symptoms'],
+            recommendation=triage.recommendation,
+            reasoning=f"Rule-based pre-triage: {triage.describe()}",
+            citations=citations,
+            decision_path="rules",
+            triage_rule=triage.rule_id,
+            rules_version=triage.version,
         )
 
-        # Step 5: Parse response
-        response_text = response.text
+    def _fallback_response(
+        self,
+        patient_data: Dict[str, Any],
+        citations: List[Citation],
+        triage: Optional[TriageResult],
+        error: LLMUnavailable,
+    ) -> AssessmentResponse:
+        """
+        Assessment when the LLM is unavailable: the rule result if one
+        matched, otherwise escalation for clinician review. Not cached, so
+        the next request tries the LLM again.
+        """
+        self.decision_stats["llm_unavailable"] += 1
+        if triage is not None:
+            recommendation, basis = triage.recommendation, f"Rule-based pre-triage: {triage.describe()}"
+        else:
+            recommendation, basis = "Urgent Referral", "No pre-triage rule matched, so this is escalated for clinician review."
+        return AssessmentResponse(
+            patient_id=patient_data['patient_id'],
+            patient_name=patient_data['name'],
+            age=patient_data['age'],
+            symptoms=patient_data['symptoms'],
+            recommendation=recommendation,
+            reasoning=f"Automated assessment unavailable ({error}). {basis} See the cited NG12 guidance.",
+            citations=citations,
+            decision_path="llm_unavailable",
+            triage_rule=triage.rule_id if triage is not None else None,
+            rules_version=triage.version if triage is not None else None,
+        )
+
+    def _build_response(
+        self,
+        patient_data: Dict[str, Any],
+        response_text: str,
+        citations: List[Citation],
+        triage: Optional[TriageResult] = None,
+    ) -> AssessmentResponse:
+        """Parse the LLM output and build the assessment response."""
+        # Unparseable output falls back to the rule result, else escalates
+        fallback = triage.recommendation if triage is not None else "Urgent Referral"
+        path = "llm_with_prior" if triage is not None else "llm"
         try:
             # Try to extract JSON from response
-            import re
             json_match = re.search(r'\{[^}]+\}', response_text, re.DOTALL)
             if json_match:
                 assessment = json.loads(json_match.group())
             else:
+                path = "llm_unparsed"
                 assessment = {
-                    "recommendation": "Urgent Referral",
+                    "recommendation": fallback,
                     "reasoning": response_text
                 }
         except json.JSONDecodeError:
+            path = "llm_unparsed"
             assessment = {
-                "recommendation": "Urgent Referral",
+                "recommendation": fallback,
                 "reasoning": response_text
             }
+        self.decision_stats[path] += 1
 
-        # Step 6: Build response with citations
         return AssessmentResponse(
-            patient_id=patient_id,
+            patient_id=patient_data['patient_id'],
             patient_name=patient_data['name'],
             age=patient_data['age'],
             symptoms=patient_data['symptoms'],
-            recommendation=assessment.get("recommendation", "Urgent Referral"),
+            recommendation=assessment.get("recommendation", fallback),
             reasoning=assessment.get("reasoning", ""),
-            citations=citations
+            citations=citations,
+            decision_path=path,
+            triage_rule=triage.rule_id if triage is not None else None,
+            rules_version=triage.version if triage is not None else None,
+        )
+
+    def _cache_version(self, patient_id: str) -> Tuple[str, str, str]:
+        """Assessments stay valid until the guideline index, the patient record or the rule table changes."""
+        engine = get_rule_engine() if self.triage_mode != "off" else None
+        return (
+            get_index_version(self.retriever.chroma_db_path),
+            get_patient_store().get_fingerprint(patient_id),
+            f"{self.triage_mode}:{engine.version}" if engine is not None else "off",
         )
+
+    def assess_patient(self, patient_id: str, bypass_cache: bool = False) -> AssessmentResponse:
+        """
+        Assess patient risk based on NG12 guidelines. `bypass_cache` skips the
+        assessment and LLM response caches (fresh results are still stored).
+        Concurrent identical requests share one assessment.
+        """
+        return get_single_flight("assess").do(
+            (patient_id, bypass_cache), self._assess, patient_id, bypass_cache
+        )
+
+    def _assess(self, patient_id: str, bypass_cache: bool) -> AssessmentResponse:
+        # Step 1: Get patient data using tool
+        patient_data = get_patient_data(patient_id)
+
+        cache = get_assessment_cache()
+        version = self._cache_version(patient_id)
+        cached = None if bypass_cache else cache.get(patient_id, version)
+        if cached is not None:
+            return cached
+
+        # Step 2: Query retriever for relevant NG12 content
+        retrieved_texts, citations = self._retrieve(patient_data)
+
+        # Step 3: Clear-cut cases are decided by the rule table
+        triage = self._triage(patient_data)
+        if self._decides(triage):
+            assessment = self._rule_response(patient_data, triage, citations)
+            cache.put(patient_id, assessment, version)
+            return assessment
+
+        # Step 4: Call LLM to generate assessment, with any rule match as a prior
+        full_prompt, citations = self._build_prompt(patient_data, retrieved_texts, citations, triage)
+        try:
+            text = self.llm.generate(full_prompt, self._generation_config(), bypass_cache)
+        except LLMUnavailable as e:
+            if not self.llm_fallback:
+                raise
+            return self._fallback_response(patient_data, citations, triage, e)
+
+        # Step 5: Parse response and attach citations
+        assessment = self._build_response(patient_data, text, citations, triage)
+        cache.put(patient_id, assessment, version)
+        return assessment
+
+    async def assess_patient_async(self, patient_id: str, bypass_cache: bool = False) -> AssessmentResponse:
+        """Async variant of assess_patient() for the request path."""
+        return await get_single_flight("assess").do_async(
+            (patient_id, bypass_cache), self._assess_async, patient_id, bypass_cache
+        )
+
+    async def _assess_async(self, patient_id: str, bypass_cache: bool) -> AssessmentResponse:
+        patient_data = get_patient_data(patient_id)
+
+        cache = get_assessment_cache()
+        version = self._cache_version(patient_id)
+        cached = None if bypass_cache else cache.get(patient_id, version)
+        if cached is not None:
+            return cached
+
+        retrieved_texts, citations = await self._retrieve_async(patient_data)
+
+        return await self._generate_async(patient_data, retrieved_texts, citations, version, bypass_cache)
+
+    async def _generate_async(
+        self,
+        patient_data: Dict[str, Any],
+        retrieved_texts: List[str],
+        citations: List[Citation],
+        version: Tuple[str, str, str],
+        bypass_cache: bool = False,
+    ) -> AssessmentResponse:
+        """Decide one patient (rule table or LLM) and cache the assessment."""
+        triage = self._triage(patient_data)
+        if self._decides(triage):
+            assessment = self._rule_response(patient_data, triage, citations)
+            get_assessment_cache().put(patient_data['patient_id'], assessment, version)
+            return assessment
+
+        full_prompt, citations = self._build_prompt(patient_data, retrieved_texts, citations, triage)
+        try:
+            text = await self.llm.generate_async(full_prompt, self._generation_config(), bypass_cache)
+        except LLMUnavailable as e:
+            if not self.llm_fallback:
+                raise
+            return self._fallback_response(patient_data, citations, triage, e)
+
+        assessment = self._build_response(patient_data, text, citations, triage)
+        get_assessment_cache().put(patient_data['patient_id'], assessment, version)
+        return assessment
+
+    async def assess_patients_async(
+        self, patient_ids: List[str], concurrency: int = 8, bypass_cache: bool = False
+    ) -> AsyncIterator[BatchAssessmentItem]:
+        """
+        Assess many patients, yielding each result as soon as it is ready.
+        Cached assessments are yielded first; the remaining symptom queries
+        are embedded and searched in one batch per routed section set, then
+        LLM calls fan out with at most `concurrency` in flight.
+        """
+        cache = get_assessment_cache()
+        pending = []
+        patients = get_patient_store().get_many(patient_ids)
+
+        for patient_id in patient_ids:
+            if patient_id not in patients:
+                yield BatchAssessmentItem(patient_id=patient_id, error=f"Patient not found: {patient_id}")
+                continue
+            patient_data = patient_payload(patients[patient_id])
+
+            version = self._cache_version(patient_id)
+            cached = None if bypass_cache else cache.get(patient_id, version)
+            if cached is not None:
+                yield BatchAssessmentItem(patient_id=patient_id, assessment=cached)
+            else:
+                pending.append((patient_data, version))
+
+        if not pending:
+            return
+
+        # One batched lookup per distinct routed section set
+        groups: Dict[Optional[Tuple[str, ...]], List[int]] = {}
+        for i, (patient_data, _) in enumerate(pending):
+            sections = self._route(patient_data)
+            groups.setdefault(tuple(sections) if sections else None, []).append(i)
+
+        retrieved: List[Any] = [None] * len(pending)
+        fallback = []
+        for sections, members in groups.items():
+            sections = list(sections) if sections else None
+            results = await self._search_many_async([pending[i][0] for i in members], 3, sections)
+            for i, (texts, citations) in zip(members, results):
+                retrieved[i] = (texts, citations)
+                if not self._check_routed(sections, texts, 3):
+                    fallback.append(i)
+        if fallback:
+            results = await self._search_many_async([pending[i][0] for i in fallback], 3, None)
+            for i, result in zip(fallback, results):
+                retrieved[i] = result
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(patient_data, version, texts, citations) -> BatchAssessmentItem:
+            patient_id = patient_data['patient_id']
+            async with semaphore:
+                try:
+                    assessment = await self._generate_async(patient_data, texts, citations, version, bypass_cache)
+                    return BatchAssessmentItem(patient_id=patient_id, assessment=assessment)
+                except Exception as e:
+                    return BatchAssessmentItem(patient_id=patient_id, error=f"Assessment error: {str(e)}")
+
+        tasks = [
+            asyncio.ensure_future(run_one(patient_data, version, texts, citations))
+            for (patient_data, version), (texts, citations) in zip(pending, retrieved)
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+class ResultCache:
+    """
+    Version-stamped LRU cache for full results (retrievals, assessments).
+
+    Every entry is stored with the version it was computed against; a lookup
+    with a different version is a miss, so re-ingesting the collection or
+    changing a patient record invalidates stale entries without a sweep.
+
+    With `similarity_threshold` set, entries may also carry an embedding and
+    `get_similar` returns a cached result whose embedding is within that
+    cosine similarity of the query (near-duplicate reuse).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: float = 0,
+        similarity_threshold: float = 0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _expired(self, created: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created > self.ttl_seconds
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_version, _, created = entry
+                if entry_version == version and not self._expired(created):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.stale += 1
+            self.misses += 1
+            return None
+
+    def get_similar(
+        self, embedding: List[float], version: Hashable, group: Hashable = None
+    ) -> Optional[Any]:
+        """Return a cached value whose embedding is close enough to `embedding`."""
+        if not self.similarity_threshold:
+            return None
+
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry[2] is not None
+                and entry[1] == version
+                and entry[2][0] == group
+                and not self._expired(entry[3])
+            ]
+        if not candidates:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        matrix = np.stack([entry[2][1] for _, entry in candidates])
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+
+        key, entry = candidates[best]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.near_hits += 1
+            # The exact lookup already counted this as a miss
+            self.misses -= 1
+            self.hits += 1
+        return entry[0]
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        version: Hashable,
+        embedding: List[float] = None,
+        group: Hashable = None,
+    ):
+        vector = None
+        if embedding is not None and self.similarity_threshold:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            self._entries[key] = (
+                value,
+                version,
+                (group, vector) if vector is not None else None,
+                time.time(),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one entry, or everything when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "near_duplicate_hits": self.near_hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+class LLMResponseCache:
+    """
+    Two-level cache of LLM responses: an in-memory LRU in front of an
+    optional SQLite file that persists across restarts and is shared by
+    workers. Keys hash the whitespace-normalised prompt together with the
+    model name and generation config, so any change to either is a miss.
+
+    Modes: "readwrite" (default), "replay" (serve only cached responses and
+    raise LLMCacheMiss otherwise, for offline test fixtures) and "off".
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 0,
+        db_path: Optional[str] = None,
+        db_max_entries: int = 20000,
+        mode: str = "readwrite",
+    ):
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.db_max_entries = db_max_entries
+        self._memory = ResultCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts = 0
+        if db_path and mode != "off":
+            self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_used ON llm_responses (used)")
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @staticmethod
+    def make_key(prompt: str, model: str, config: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"model": model, "config": config, "prompt": " ".join(prompt.split())},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        text = self._memory.get(key, None)
+        if text is not None:
+            self.memory_hits += 1
+            return text
+        if self._conn is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response, created FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self.ttl_seconds and time.time() - row[1] > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    self._conn.execute("UPDATE llm_responses SET used = ? WHERE key = ?", (time.time(), key))
+            if row is not None:
+                self.disk_hits += 1
+                self._memory.put(key, row[0], None)
+                return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, text: str, model: str):
+        self._memory.put(key, text, None)
+        if self._conn is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, created, used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, text, now, now),
+            )
+            self._puts += 1
+            # Bound the file: every 100 writes, drop the least recently used overflow
+            if self._puts % 100 == 1:
+                count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+                if count > self.db_max_entries:
+                    self._conn.execute(
+                        "DELETE FROM llm_responses WHERE key IN "
+                        "(SELECT key FROM llm_responses ORDER BY used LIMIT ?)",
+                        (count - self.db_max_entries,),
+                    )
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        disk_entries = None
+        if self._conn is not None:
+            with self._lock:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        return {
+            "mode": self.mode,
+            "memory_entries": self._memory.stats()["entries"],
+            "disk_entries": disk_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global caches
+_retrieval_cache: ResultCache = None
+_assessment_cache: ResultCache = None
+_llm_cache: LLMResponseCache = None
+
+
+def get_retrieval_cache() -> ResultCache:
+    """Get or create the cache of RAGRetriever.retrieve results."""
+    global _retrieval_cache
+    if _retrieval_cache is None:
+        _retrieval_cache = ResultCache(
+            max_entries=int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "2048")),
+            ttl_seconds=float(os.getenv("RETRIEVAL_CACHE_TTL", "0")),
+            similarity_threshold=float(os.getenv("RETRIEVAL_CACHE_SIMILARITY", "0")),
+        )
+    return _retrieval_cache
+
+
+def get_assessment_cache() -> ResultCache:
+    """Get or create the cache of ClinicalDecisionAgent assessments."""
+    global _assessment_cache
+    if _assessment_cache is None:
+        _assessment_cache = ResultCache(
+            max_entries=int(os.getenv("ASSESSMENT_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("ASSESSMENT_CACHE_TTL", "0")),
+        )
+    return _assessment_cache
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get or create the LLM response cache shared by both agents."""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL", "0")),
+            # Cached answers are about patient records, so the file is opt-in
+            db_path=os.getenv("LLM_CACHE_DB_PATH") or None,
+            db_max_entries=int(os.getenv("LLM_CACHE_DB_MAX_ENTRIES", "20000")),
+            mode=os.getenv("LLM_CACHE_MODE", "readwrite"),
+        )
+    return _llm_cache
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+# Per-stage concurrency limits for the async request path. Embedding and
+# vector search are CPU/IO-bound and run in a bounded thread pool; LLM calls
+# are awaited directly and only need a cap on in-flight requests.
+STAGE_LIMITS: Dict[str, int] = {
+    "embed": int(os.getenv("EMBED_CONCURRENCY", "4")),
+    "search": int(os.getenv("SEARCH_CONCURRENCY", "8")),
+    "llm": int(os.getenv("LLM_CONCURRENCY", "64")),
+}
+EXECUTOR_WORKERS = int(os.getenv("RAG_EXECUTOR_WORKERS", "8"))
+# Share in-flight work between concurrent identical requests
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "on") != "off"
+
+
+class StageLimiter:
+    """Bounded executor plus one semaphore per pipeline stage."""
+
+    def __init__(self, limits: Dict[str, int] = None, max_workers: int = EXECUTOR_WORKERS):
+        self.limits = dict(limits or STAGE_LIMITS)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="rag-stage"
+        )
+        # Semaphores belong to an event loop, so keep one set per loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+        self.in_flight: Dict[str, int] = {stage: 0 for stage in self.limits}
+
+    def _semaphore(self, stage: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        per_loop = self._semaphores.get(loop)
+        if per_loop is None:
+            per_loop = {name: asyncio.Semaphore(limit) for name, limit in self.limits.items()}
+            self._semaphores[loop] = per_loop
+        return per_loop[stage]
+
+    @asynccontextmanager
+    async def stage(self, stage: str):
+        """Hold a slot in `stage` for the duration of the block."""
+        async with self._semaphore(stage):
+            self.in_flight[stage] += 1
+            try:
+                yield
+            finally:
+                self.in_flight[stage] -= 1
+
+    async def run(self, stage: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking function in the bounded executor under a stage limit."""
+        async with self.stage(stage):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limits": self.limits, "in_flight": dict(self.in_flight)}
+
+
+# Global limiter
+_limiter: StageLimiter = None
+
+
+def get_stage_limiter() -> StageLimiter:
+    """Get or create the process-wide stage limiter."""
+    global _limiter
+    if _limiter is None:
+        _limiter = StageLimiter()
+    return _limiter
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing: while a call for a key is in flight, identical
+    calls wait for it and share its result (or exception) instead of doing
+    the same work again. Nothing is kept once the call finishes; caching
+    finished results is the caches' job.
+    """
+
+    def __init__(self, name: str, enabled: bool = SINGLE_FLIGHT):
+        self.name = name
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        # Futures belong to an event loop, so keep one table per loop.
+        self._tasks = weakref.WeakKeyDictionary()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) unless another thread is already running it for `key`."""
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await fn(*args, **kwargs) unless a call for `key` is already in flight
+        on this event loop. The work runs as its own task, so a caller that
+        is cancelled (e.g. a client disconnecting) doesn't cancel it for the
+        others.
+        """
+        if not self.enabled:
+            return await fn(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.get(loop)
+        if tasks is None:
+            tasks = self._tasks[loop] = {}
+
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            self.leaders += 1
+
+            def finished(t, key=key):
+                if tasks.get(key) is t:
+                    del tasks[key]
+                # Mark the exception retrieved even if every caller went away
+                if not t.cancelled():
+                    t.exception()
+
+            task.add_done_callback(finished)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.leaders + self.coalesced
+        in_flight = len(self._flights) + sum(len(tasks) for tasks in list(self._tasks.values()))
+        return {
+            "enabled": self.enabled,
+            "calls": calls,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+            "in_flight": in_flight,
+        }
+
+
+# Shared coalescing groups by name
+_single_flights: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get or create the process-wide coalescing group `name`."""
+    flight = _single_flights.get(name)
+    if flight is None:
+        flight = _single_flights.setdefault(name, SingleFlight(name))
+    return flight
+
+
+def single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: flight.stats() for name, flight in _single_flights.items()}
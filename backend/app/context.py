@@ -0,0 +1,233 @@
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.memory.records import MessageRecord
+from app.schemas.models import Citation
+
+
+# Upper bound on prompt size (system prompt + inputs + history + context)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# Most of the budget a chat prompt may spend on conversation history
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "800"))
+# Chunks whose word shingles are this contained in an earlier chunk are dropped
+CONTEXT_OVERLAP_THRESHOLD = float(os.getenv("CONTEXT_OVERLAP_THRESHOLD", "0.8"))
+# A chunk is only trimmed to fit if at least this many tokens of it survive
+MIN_TRIM_TOKENS = 40
+# Per-turn prompt size is tracked for turns 1..MAX_TRACKED_TURN (later turns share the last bucket)
+MAX_TRACKED_TURN = 50
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.;:!?\]])\s+")
+SHINGLE_SIZE = 5
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the LLM token count of a text without a network round trip.
+    Subword tokenizers emit roughly one token per 4 characters of a word
+    (clinical terms like "haemoptysis" split into several) and one per
+    punctuation mark, which this mirrors word by word.
+    """
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _WORD_RE.findall(text))
+
+
+@lru_cache(maxsize=8192)
+def count_chunk_tokens(text: str) -> int:
+    """
+    count_tokens for texts that recur across requests: guideline chunks,
+    their sentences, stored messages and summary lines. Whole prompts are
+    unique, so they are counted with count_tokens and never cached.
+    """
+    return count_tokens(text)
+
+
+def _shingles(text: str) -> frozenset:
+    words = text.lower().split()
+    if len(words) <= SHINGLE_SIZE:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+
+
+class PackedContext:
+    """Chunks chosen for one prompt, with the citations that back them."""
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.citations: List[Citation] = []
+        self.tokens = 0
+        self.trimmed = 0
+        self.duplicates = 0
+        self.dropped = 0
+
+
+class ContextPacker:
+    """
+    Assembles retrieved chunks (and chat history) into a prompt under a
+    token budget. Chunks are taken in relevance order; near-duplicates of an
+    already chosen chunk are skipped; the first chunk that doesn't fit is
+    trimmed at a sentence boundary if enough of it survives, and packing
+    stops there.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = PROMPT_TOKEN_BUDGET,
+        overlap_threshold: float = CONTEXT_OVERLAP_THRESHOLD,
+        min_trim_tokens: int = MIN_TRIM_TOKENS,
+    ):
+        self.budget_tokens = budget_tokens
+        self.overlap_threshold = overlap_threshold
+        self.min_trim_tokens = min_trim_tokens
+
+    def remaining(self, *fixed_parts: str) -> int:
+        """Tokens left for context once the fixed prompt parts are counted."""
+        return max(0, self.budget_tokens - sum(count_tokens(part) for part in fixed_parts))
+
+    def _trim(self, text: str, budget: int) -> Optional[str]:
+        """Longest sentence-aligned prefix of `text` within `budget` tokens."""
+        lines, used = [], 0
+        for line in text.split("\n"):
+            kept = []
+            for sentence in _SENTENCE_RE.split(line):
+                tokens = count_chunk_tokens(sentence)
+                if used + tokens > budget:
+                    break
+                kept.append(sentence)
+                used += tokens
+            if kept:
+                lines.append(" ".join(kept))
+            if len(kept) < len(_SENTENCE_RE.split(line)):
+                break
+        if used < self.min_trim_tokens:
+            return None
+        return "\n".join(lines)
+
+    def pack_chunks(
+        self,
+        texts: Sequence[str],
+        citations: Optional[Sequence[Citation]] = None,
+        budget: Optional[int] = None,
+        scores: Optional[Sequence[float]] = None,
+    ) -> PackedContext:
+        """Pick chunks, most relevant first, until `budget` tokens are used."""
+        budget = self.budget_tokens if budget is None else budget
+        citations = list(citations) if citations is not None else [None] * len(texts)
+        order = list(range(len(texts)))
+        if scores is not None:
+            order.sort(key=lambda i: scores[i], reverse=True)
+
+        packed = PackedContext()
+        seen: List[frozenset] = []
+        for position, i in enumerate(order):
+            text = texts[i]
+            shingles = _shingles(text)
+            if any(
+                len(shingles & other) / max(1, min(len(shingles), len(other))) >= self.overlap_threshold
+                for other in seen
+            ):
+                packed.duplicates += 1
+                continue
+
+            tokens = count_chunk_tokens(text)
+            fits = packed.tokens + tokens <= budget
+            if not fits:
+                text = self._trim(text, budget - packed.tokens)
+                if text is None:
+                    packed.dropped += len(order) - position
+                    break
+                tokens = count_chunk_tokens(text)
+                packed.trimmed += 1
+
+            seen.append(shingles)
+            packed.texts.append(text)
+            if citations[i] is not None:
+                packed.citations.append(citations[i])
+            packed.tokens += tokens
+            if not fits:
+                packed.dropped += len(order) - position - 1
+                break
+        return packed
+
+    def pack_history(
+        self, history: Sequence[MessageRecord], budget: int
+    ) -> Tuple[List[MessageRecord], int]:
+        """Most recent messages that fit in `budget` tokens, oldest first."""
+        kept: List[MessageRecord] = []
+        used = 0
+        for message in reversed(history):
+            tokens = count_chunk_tokens(message.content) + 2
+            if used + tokens > budget:
+                break
+            kept.append(message)
+            used += tokens
+        kept.reverse()
+        return kept, used
+
+
+class PromptMetrics:
+    """Tokens used per prompt, by agent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        self._by_turn: Dict[str, Dict[int, List[int]]] = {}
+
+    def record(
+        self,
+        agent: str,
+        prompt_tokens: int,
+        context_tokens: int,
+        history_tokens: int = 0,
+        turn: Optional[int] = None,
+    ):
+        with self._lock:
+            if turn is not None:
+                bucket = self._by_turn.setdefault(agent, {}).setdefault(min(turn, MAX_TRACKED_TURN), [0, 0])
+                bucket[0] += 1
+                bucket[1] += prompt_tokens
+            stats = self._agents.setdefault(agent, {
+                "prompts": 0, "total_tokens": 0, "max_tokens": 0, "last_tokens": 0,
+                "context_tokens": 0, "history_tokens": 0,
+            })
+            stats["prompts"] += 1
+            stats["total_tokens"] += prompt_tokens
+            stats["max_tokens"] = max(stats["max_tokens"], prompt_tokens)
+            stats["last_tokens"] = prompt_tokens
+            stats["context_tokens"] += context_tokens
+            stats["history_tokens"] += history_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            report = {"budget_tokens": PROMPT_TOKEN_BUDGET}
+            for agent, stats in self._agents.items():
+                prompts = stats["prompts"] or 1
+                report[agent] = {
+                    "prompts": stats["prompts"],
+                    "avg_tokens": round(stats["total_tokens"] / prompts, 1),
+                    "max_tokens": stats["max_tokens"],
+                    "last_tokens": stats["last_tokens"],
+                    "avg_context_tokens": round(stats["context_tokens"] / prompts, 1),
+                    "avg_history_tokens": round(stats["history_tokens"] / prompts, 1),
+                }
+                if agent in self._by_turn:
+                    # Prompt growth over a session: average tokens at each turn
+                    report[agent]["avg_tokens_by_turn"] = {
+                        turn: round(total / count, 1)
+                        for turn, (count, total) in sorted(self._by_turn[agent].items())
+                    }
+            return report
+
+
+# Global prompt metrics
+_metrics: PromptMetrics = None
+
+
+def get_prompt_metrics() -> PromptMetrics:
+    """Get or create prompt token metrics."""
+    global _metrics
+    if _metrics is None:
+        _metrics = PromptMetrics()
+    return _metrics
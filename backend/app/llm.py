@@ -0,0 +1,703 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.cache import LLMCacheMiss, LLMResponseCache, get_llm_cache
+from app.concurrency import get_stage_limiter
+
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-pro")
+
+
+class LLMProviderError(RuntimeError):
+    """A provider call failed (including failures injected by the local stand-in)."""
+
+
+class LLMUnavailable(LLMProviderError):
+    """The resilience layer gave up: circuit open, retries exhausted or deadline passed."""
+
+
+class LLMProvider(ABC):
+    """
+    One text-generation backend. Providers only talk to the model; caching,
+    stage limits and timing live in LLMClient so every provider gets them.
+    """
+
+    kind = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    @abstractmethod
+    def generate(self, prompt: str, config: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def generate_async(self, prompt: str, config: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream(self, prompt: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        """Async iterator over chunks of the answer as they are generated."""
+        raise NotImplementedError
+
+    def record(self, seconds: float, failed: bool):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(failed)
+            self.seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.kind,
+            "model": self.model_name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_latency_ms": round(self.seconds / self.calls * 1000, 1) if self.calls else 0.0,
+        }
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through google-generativeai."""
+
+    kind = "gemini"
+
+    def __init__(self, model_name: str = LLM_MODEL, api_key: Optional[str] = None):
+        super().__init__(model_name)
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or os.getenv("GOOGLE_API_KEY"))
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, config: Dict[str, Any]) -> str:
+        # google-generativeai 0.3 has no per-request timeout; LLMResilience enforces it
+        return self.model.generate_content(prompt, generation_config=config).text
+
+    async def generate_async(self, prompt: str, config: Dict[str, Any]) -> str:
+        response = await self.model.generate_content_async(prompt, generation_config=config)
+        return response.text
+
+    async def stream(self, prompt: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, generation_config=config, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class LocalProvider(LLMProvider):
+    """
+    Deterministic offline stand-in for benchmarking and fault testing.
+
+    Answers are a pure function of the prompt (assessment prompts get JSON
+    echoing any rule prior, chat prompts a cited answer of `answer_words`
+    words). Time to first token is drawn from a seeded fixed, normal or
+    lognormal distribution around `latency`, then each streamed chunk takes
+    `token_delay`. A `failure_rate` fraction of calls raise LLMProviderError
+    and a `stall_rate` fraction hang for `stall_seconds` first.
+    """
+
+    kind = "local"
+    CHUNK_WORDS = 4
+    RECOMMENDATIONS = ("Same-Day Referral", "Urgent Referral", "Routine GP Screening")
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        distribution: str = "lognormal",
+        spread: float = 0.4,
+        token_delay: float = 0.005,
+        answer_words: int = 80,
+        failure_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_seconds: float = 30.0,
+        seed: int = 0,
+        model_name: str = "local-standin",
+    ):
+        super().__init__(model_name)
+        if distribution not in ("fixed", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.latency = latency
+        self.distribution = distribution
+        self.spread = spread
+        self.token_delay = token_delay
+        self.answer_words = answer_words
+        self.failure_rate = failure_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self._rng = random.Random(seed)
+        self.injected_failures = 0
+        self.injected_stalls = 0
+
+    def _first_token_delay(self) -> Tuple[float, bool]:
+        """Draw (delay, fail) for one call; stalls are folded into the delay."""
+        with self._lock:
+            if self.latency <= 0 or self.distribution == "fixed":
+                delay = max(0.0, self.latency)
+            elif self.distribution == "normal":
+                delay = max(0.0, self._rng.gauss(self.latency, self.spread * self.latency))
+            else:
+                # Parameterised so the mean stays at `latency`
+                mu = math.log(self.latency) - self.spread ** 2 / 2
+                delay = self._rng.lognormvariate(mu, self.spread)
+            fail = self._rng.random() < self.failure_rate
+            stall = self._rng.random() < self.stall_rate
+            self.injected_failures += int(fail)
+            self.injected_stalls += int(stall)
+        if stall:
+            delay += self.stall_seconds
+        return delay, fail
+
+    def _text(self, prompt: str) -> str:
+        digest = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest(), 16)
+        if "Provide your assessment as JSON" in prompt:
+            prior = prompt.split("Rule-based pre-triage suggests: ", 1)
+            if len(prior) == 2:
+                recommendation = prior[1].split(".", 1)[0]
+            else:
+                recommendation = self.RECOMMENDATIONS[digest % len(self.RECOMMENDATIONS)]
+            return json.dumps({
+                "recommendation": recommendation,
+                "reasoning": "Local stand-in assessment based on the NG12 guideline context provided.",
+            })
+        filler = ("The guideline context supports this recommendation for the symptoms described " * 16).split()
+        words = filler[digest % 7:][: max(0, self.answer_words - 7)]
+        return f"Based on NG12, {' '.join(words)} [Source: NG12, page {digest % 80 + 1}]."
+
+    def _chunks(self, text: str) -> List[str]:
+        words = text.split(" ")
+        return [
+            " ".join(words[i:i + self.CHUNK_WORDS]) + (" " if i + self.CHUNK_WORDS < len(words) else "")
+            for i in range(0, len(words), self.CHUNK_WORDS)
+        ]
+
+    def generate(self, prompt: str, config: Dict[str, Any]) -> str:
+        delay, fail = self._first_token_delay()
+        text = self._text(prompt)
+        time.sleep(delay + self.token_delay * len(self._chunks(text)))
+        if fail:
+            raise LLMProviderError("Injected local provider failure")
+        return text
+
+    async def generate_async(self, prompt: str, config: Dict[str, Any]) -> str:
+        delay, fail = self._first_token_delay()
+        text = self._text(prompt)
+        await asyncio.sleep(delay + self.token_delay * len(self._chunks(text)))
+        if fail:
+            raise LLMProviderError("Injected local provider failure")
+        return text
+
+    async def stream(self, prompt: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        delay, fail = self._first_token_delay()
+        await asyncio.sleep(delay)
+        # Like a rejected request (429/5xx), injected failures come before any chunk
+        if fail:
+            raise LLMProviderError("Injected local provider failure")
+        for chunk in self._chunks(self._text(prompt)):
+            yield chunk
+            await asyncio.sleep(self.token_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update(
+            latency_distribution=self.distribution,
+            injected_failures=self.injected_failures,
+            injected_stalls=self.injected_stalls,
+        )
+        return stats
+
+
+def create_llm_provider(kind: str = None, api_key: Optional[str] = None) -> LLMProvider:
+    """Build an LLM provider of the given kind ("gemini" or "local") from the environment."""
+    kind = kind or LLM_PROVIDER
+    if kind == "gemini":
+        return GeminiProvider(LLM_MODEL, api_key=api_key)
+    if kind == "local":
+        return LocalProvider(
+            latency=float(os.getenv("LOCAL_LLM_LATENCY", "0.5")),
+            distribution=os.getenv("LOCAL_LLM_LATENCY_DIST", "lognormal"),
+            spread=float(os.getenv("LOCAL_LLM_LATENCY_SPREAD", "0.4")),
+            token_delay=float(os.getenv("LOCAL_LLM_TOKEN_DELAY", "0.005")),
+            answer_words=int(os.getenv("LOCAL_LLM_ANSWER_WORDS", "80")),
+            failure_rate=float(os.getenv("LOCAL_LLM_FAILURE_RATE", "0")),
+            stall_rate=float(os.getenv("LOCAL_LLM_STALL_RATE", "0")),
+            stall_seconds=float(os.getenv("LOCAL_LLM_STALL_SECONDS", "30")),
+            seed=int(os.getenv("LOCAL_LLM_SEED", "0")),
+        )
+    raise ValueError(f"Unknown LLM provider: {kind}")
+
+
+# Global provider, shared by both agents
+_provider: LLMProvider = None
+
+
+def get_llm_provider() -> LLMProvider:
+    """Get or create the configured LLM provider."""
+    global _provider
+    if _provider is None:
+        _provider = create_llm_provider()
+    return _provider
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the provider is unhealthy. After `failure_threshold`
+    consecutive failures the circuit opens and calls are rejected; after
+    `reset_seconds` one trial call is let through (half-open) and its outcome
+    closes or re-opens the circuit. A trial that ends without an outcome
+    (cancelled) is released so the next call can try. A threshold of 0
+    disables the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial = False
+
+    def allow(self) -> Optional[str]:
+        """Admit a call: returns a permit ("call" or "trial"), or None to reject it."""
+        with self._lock:
+            if self.state == "closed" or not self.failure_threshold:
+                return "call"
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return "trial"
+            return None
+
+    def release(self, permit: Optional[str]):
+        """End an admitted call; frees a trial that recorded neither success nor failure."""
+        if permit == "trial":
+            with self._lock:
+                self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failure_threshold and (self.state == "half_open" or self.failures >= self.failure_threshold):
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+
+def _retryable(error: BaseException) -> bool:
+    """Timeouts, provider and transport errors are retried; bad requests are not."""
+    if isinstance(error, (ValueError, TypeError)):
+        return False
+    # google.api_core errors carry the HTTP status as `code`
+    return getattr(error, "code", None) not in (400, 401, 403, 404)
+
+
+class LLMResilience:
+    """
+    Deadlines, retries, circuit breaking and hedging for provider calls.
+
+    Each attempt is bounded by `timeout` and all attempts together by
+    `deadline`. Retryable failures back off with full jitter (a uniform
+    draw up to `backoff_base * 2**attempt`, capped at `backoff_max`). When
+    hedging is on, an attempt still running after the `hedge_quantile`
+    latency of recent successful calls gets a second, parallel request and
+    the first answer wins. Giving up raises LLMUnavailable so the agents
+    can fall back.
+    """
+
+    LATENCY_WINDOW = 200
+    HEDGE_MIN_SAMPLES = 20
+    SYNC_WORKERS = 32
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        deadline: float = 60.0,
+        retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.05,
+        seed: Optional[int] = None,
+    ):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self._rng = random.Random(seed)
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.calls = 0
+        self.attempts = 0
+        self.retried = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.rejected = 0
+        self.gave_up = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def backoff(self, attempt: int) -> float:
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds before a hedge is sent, or None until enough latencies are known."""
+        if not self.hedge or len(self._latencies) < self.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))
+        return max(self.hedge_min_delay, ordered[index])
+
+    def _admit(self, deadline: float, last_error: Optional[BaseException]) -> Tuple[str, float]:
+        """(breaker permit, timeout) for the next attempt, or raise if the breaker or deadline forbids one."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.gave_up += 1
+            raise LLMUnavailable(f"LLM deadline of {self.deadline}s exceeded") from last_error
+        permit = self.breaker.allow()
+        if permit is None:
+            self.rejected += 1
+            raise LLMUnavailable("LLM circuit breaker is open") from last_error
+        self.attempts += 1
+        return permit, min(self.timeout, remaining)
+
+    def _failed(self, error: BaseException):
+        """Account for a failed attempt; non-retryable errors propagate as they are."""
+        if isinstance(error, TimeoutError):
+            self.timeouts += 1
+        else:
+            self.failures += 1
+        if not _retryable(error):
+            # The provider answered, it just refused this request
+            self.breaker.record_success()
+            raise error
+        self.breaker.record_failure()
+
+    def _succeeded(self, seconds: float):
+        self.breaker.record_success()
+        self._latencies.append(seconds)
+
+    def _next_pause(self, attempt: int, deadline: float, error: BaseException) -> float:
+        """Backoff before the next attempt, or raise once retries or time run out."""
+        if attempt < self.retries:
+            pause = self.backoff(attempt)
+            if time.monotonic() + pause < deadline:
+                self.retried += 1
+                return pause
+        self.gave_up += 1
+        raise LLMUnavailable(f"LLM call failed after {attempt + 1} attempt(s): {error!r}") from error
+
+    def _worker_pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.SYNC_WORKERS, thread_name_prefix="llm-call")
+            return self._executor
+
+    def run(self, call: Callable[[], str]) -> str:
+        """
+        Blocking calls: `call()` makes one attempt on a worker thread and is
+        abandoned (left to finish in the background) at its timeout, since
+        blocking SDK calls can't be cancelled. No hedging.
+        """
+        self.calls += 1
+        deadline = time.monotonic() + self.deadline
+        error = None
+        for attempt in range(self.retries + 1):
+            permit, timeout = self._admit(deadline, error)
+            start = time.monotonic()
+            future = self._worker_pool().submit(call)
+            try:
+                text = future.result(timeout)
+            except Exception as e:
+                error = TimeoutError(f"LLM attempt exceeded {timeout:.1f}s") if not future.done() else e
+                self._failed(error)
+            else:
+                self._succeeded(time.monotonic() - start)
+                return text
+            finally:
+                self.breaker.release(permit)
+            time.sleep(self._next_pause(attempt, deadline, error))
+
+    async def run_async(self, call: Callable[[], Awaitable[str]]) -> str:
+        """`call()` makes one attempt; attempts are cancelled at their timeout."""
+        self.calls += 1
+        deadline = time.monotonic() + self.deadline
+        error = None
+        for attempt in range(self.retries + 1):
+            permit, timeout = self._admit(deadline, error)
+            start = time.monotonic()
+            try:
+                text = await asyncio.wait_for(self._hedged(call), timeout)
+            except Exception as e:
+                error = TimeoutError(f"LLM attempt exceeded {timeout:.1f}s") if isinstance(e, asyncio.TimeoutError) else e
+                self._failed(error)
+            else:
+                self._succeeded(time.monotonic() - start)
+                return text
+            finally:
+                # Cancellation records nothing, so a cancelled trial must still be freed
+                self.breaker.release(permit)
+            await asyncio.sleep(self._next_pause(attempt, deadline, error))
+
+    async def _hedged(self, call: Callable[[], Awaitable[str]]) -> str:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await call()
+        primary = asyncio.ensure_future(call())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                tasks.add(asyncio.ensure_future(call()))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge_wins += int(task is not primary)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Streams are retried only until their first chunk arrives; after that
+        a failure propagates. Each chunk must arrive within `timeout`.
+        """
+        self.calls += 1
+        deadline = time.monotonic() + self.deadline
+        error = None
+        for attempt in range(self.retries + 1):
+            permit, timeout = self._admit(deadline, error)
+            chunks = open_stream()
+            try:
+                try:
+                    first = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    self.breaker.record_success()
+                    return
+                except Exception as e:
+                    error = TimeoutError(f"LLM attempt exceeded {timeout:.1f}s") if isinstance(e, asyncio.TimeoutError) else e
+                    self._failed(error)
+                else:
+                    yield first
+                    try:
+                        while True:
+                            yield await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                    except StopAsyncIteration:
+                        # Stream durations depend on answer length, so they don't feed the hedge delay
+                        self.breaker.record_success()
+                        return
+                    except Exception:
+                        self.failures += 1
+                        self.breaker.record_failure()
+                        raise
+            finally:
+                self.breaker.release(permit)
+                await chunks.aclose()
+            await asyncio.sleep(self._next_pause(attempt, deadline, error))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retried,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "gave_up": self.gave_up,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1) if self.hedge_delay() is not None else None,
+        }
+        stats["breaker"] = self.breaker.stats()
+        return stats
+
+
+# Global resilience policy, shared by both agents (one breaker per process)
+_resilience: LLMResilience = None
+
+
+def get_llm_resilience() -> LLMResilience:
+    """Get or create the LLM resilience policy from the environment."""
+    global _resilience
+    if _resilience is None:
+        _resilience = LLMResilience(
+            timeout=float(os.getenv("LLM_TIMEOUT", "30")),
+            deadline=float(os.getenv("LLM_DEADLINE", "60")),
+            retries=int(os.getenv("LLM_RETRIES", "2")),
+            backoff_base=float(os.getenv("LLM_BACKOFF_BASE", "0.5")),
+            backoff_max=float(os.getenv("LLM_BACKOFF_MAX", "8")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                reset_seconds=float(os.getenv("LLM_BREAKER_RESET", "30")),
+            ),
+            hedge=os.getenv("LLM_HEDGE", "off") == "on",
+            hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.95")),
+            hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.05")),
+        )
+    return _resilience
+
+
+class LLMClient:
+    """
+    The agents' single path to the LLM. Every call goes through the
+    response cache first (unless the caller bypasses it, which still stores
+    the fresh response); only misses take an "llm" stage slot and reach the
+    provider through the resilience policy. If the provider is unavailable
+    and a cached answer exists (a bypassed request), that answer is served.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[LLMProvider] = None,
+        cache: Optional[LLMResponseCache] = None,
+        resilience: Optional[LLMResilience] = None,
+    ):
+        self.provider = provider if provider is not None else get_llm_provider()
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.resilience = resilience if resilience is not None else get_llm_resilience()
+
+    @property
+    def model_name(self) -> str:
+        return self.provider.model_name
+
+    def _lookup(self, prompt: str, config: Dict[str, Any], bypass_cache: bool) -> Tuple[Optional[str], Optional[str]]:
+        """Return (cache key, cached text); the key is None when caching is off."""
+        if self.cache is None or not self.cache.enabled:
+            return None, None
+        key = self.cache.make_key(prompt, self.model_name, config)
+        if bypass_cache:
+            self.cache.record_bypass()
+            cached = None
+        else:
+            cached = self.cache.get(key)
+        if cached is None and self.cache.mode == "replay":
+            raise LLMCacheMiss(f"No cached {self.model_name} response for this prompt (LLM_CACHE_MODE=replay)")
+        return key, cached
+
+    def _store(self, key: Optional[str], text: str):
+        if key is not None and text:
+            self.cache.put(key, text, self.model_name)
+
+    def _stale(self, key: Optional[str], bypass_cache: bool) -> Optional[str]:
+        """A cached answer the caller chose to bypass, used when the provider is down."""
+        return self.cache.get(key) if key is not None and bypass_cache else None
+
+    def _timed(self, fn: Callable[..., Any], *args) -> Any:
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            self.provider.record(time.perf_counter() - start, True)
+            raise
+        self.provider.record(time.perf_counter() - start, False)
+        return result
+
+    async def _timed_async(self, prompt: str, config: Dict[str, Any]) -> str:
+        # Cancelled hedges and timed-out attempts raise CancelledError and aren't recorded
+        start = time.perf_counter()
+        try:
+            text = await self.provider.generate_async(prompt, config)
+        except Exception:
+            self.provider.record(time.perf_counter() - start, True)
+            raise
+        self.provider.record(time.perf_counter() - start, False)
+        return text
+
+    def generate(self, prompt: str, config: Dict[str, Any], bypass_cache: bool = False) -> str:
+        key, cached = self._lookup(prompt, config, bypass_cache)
+        if cached is not None:
+            return cached
+        try:
+            text = self.resilience.run(lambda: self._timed(self.provider.generate, prompt, config))
+        except LLMUnavailable:
+            stale = self._stale(key, bypass_cache)
+            if stale is None:
+                raise
+            return stale
+        self._store(key, text)
+        return text
+
+    async def generate_async(self, prompt: str, config: Dict[str, Any], bypass_cache: bool = False) -> str:
+        key, cached = self._lookup(prompt, config, bypass_cache)
+        if cached is not None:
+            return cached
+        try:
+            async with get_stage_limiter().stage("llm"):
+                text = await self.resilience.run_async(lambda: self._timed_async(prompt, config))
+        except LLMUnavailable:
+            stale = self._stale(key, bypass_cache)
+            if stale is None:
+                raise
+            return stale
+        self._store(key, text)
+        return text
+
+    async def stream(
+        self, prompt: str, config: Dict[str, Any], bypass_cache: bool = False
+    ) -> AsyncIterator[str]:
+        """Yield the answer as it is generated; a cached answer arrives as one chunk."""
+        key, cached = self._lookup(prompt, config, bypass_cache)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        try:
+            async with get_stage_limiter().stage("llm"):
+                start = time.perf_counter()
+                failed = True
+                try:
+                    async for text in self.resilience.stream(lambda: self.provider.stream(prompt, config)):
+                        parts.append(text)
+                        yield text
+                    failed = False
+                finally:
+                    self.provider.record(time.perf_counter() - start, failed)
+        except LLMUnavailable:
+            stale = self._stale(key, bypass_cache) if not parts else None
+            if stale is None:
+                raise
+            yield stale
+            return
+        # Only complete answers are cached
+        self._store(key, "".join(parts))
@@ -1,6 +1,11 @@
+import asyncio
+import json
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -8,6 +13,7 @@ from dotenv import load_dotenv
 from app.schemas.models import (
     AssessmentRequest,
     AssessmentResponse,
+    BatchAssessmentRequest,
     ChatRequest,
     ChatResponse,
     ChatHistoryResponse,
@@ -17,15 +23,38 @@ from app.agents.clinical_agent import ClinicalDecisionAgent
 from app.agents.chat_agent import ChatAgent
 from app.memory.session_store import get_session_store
 from app.tools.patient_tool import get_patient_store
+from app.startup import get_warmup_state
+from app.cache import get_assessment_cache, get_llm_cache, get_retrieval_cache
+from app.concurrency import get_stage_limiter, single_flight_stats
+from app.context import get_prompt_metrics
+from app.llm import LLMUnavailable, get_llm_provider, get_llm_resilience
+from app.rag.embedding_cache import get_embedding_cache
 
 # Load environment variables
 load_dotenv()
 
+# Largest page /patients returns when a limit is given
+PATIENTS_MAX_PAGE = 1000
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Bind immediately and warm heavy components in the background."""
+    warmup_task = asyncio.create_task(get_warmup_state().run())
+    sweeper_task = asyncio.create_task(session_store.run_sweeper())
+    yield
+    if not warmup_task.done():
+        warmup_task.cancel()
+    sweeper_task.cancel()
+    session_store.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="NG12 Cancer Risk Assessor",
     description="RAG-powered clinical decision support system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -37,42 +66,85 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
+# Initialize components. Agents are cheap to construct: the embedding model,
+# vector store and patient data are loaded by the background warm-up (or on
+# first use if a request arrives before it finishes).
 clinical_agent = ClinicalDecisionAgent()
 chat_agent = ChatAgent()
 session_store = get_session_store()
-patient_store = get_patient_store()
 
 
 
 @app.post("/assess", response_model=AssessmentResponse)
-def assess_patient(request: AssessmentRequest):
+async def assess_patient(request: AssessmentRequest):
     """
     Assess patient cancer risk using NG12 guidelines.
     Input: patient_id
     Output: Risk stratification with citations
     """
     try:
-        assessment = clinical_agent.assess_patient(request.patient_id)
+        assessment = await clinical_agent.assess_patient_async(
+            request.patient_id, bypass_cache=request.bypass_cache
+        )
         return assessment
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except LLMUnavailable as e:
+        # Only reached with LLM_FALLBACK=off
+        raise HTTPException(status_code=503, detail=f"Assessment unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Assessment error: {str(e)}")
 
 
+@app.post("/assess/batch")
+async def assess_batch(request: BatchAssessmentRequest):
+    """
+    Assess many patients at once.
+    Input: list of patient_ids, or "all"
+    Output: newline-delimited JSON, one BatchAssessmentItem per patient in
+    completion order
+    """
+    if request.patient_ids == "all":
+        patient_ids = get_patient_store().patient_ids()
+    else:
+        patient_ids = request.patient_ids
+
+    async def item_stream():
+        async for item in clinical_agent.assess_patients_async(
+            patient_ids, concurrency=request.concurrency, bypass_cache=request.bypass_cache
+        ):
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(item_stream(), media_type="application/x-ndjson")
+
+
 @app.get("/patients")
-def list_patients():
-    """List all available patients."""
+def list_patients(
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=0, le=PATIENTS_MAX_PAGE),
+    symptom: Optional[str] = None,
+    age_band: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+):
+    """
+    List patients, optionally filtered by symptom (substring), age band
+    (e.g. "50-59") or age range, and paginated with offset/limit. The total
+    number of matches is returned in the X-Total-Count header.
+    """
     try:
-        return patient_store.list_patients()
+        store = get_patient_store()
+        ids = store.filter_ids(symptom=symptom, age_band=age_band, min_age=min_age, max_age=max_age)
+        response.headers["X-Total-Count"] = str(len(ids))
+        return store.summaries(ids[offset:None if limit is None else offset + limit])
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     """
     Chat with the NG12 assistant.
     Maintains conversation history per session.
@@ -82,11 +154,13 @@ def chat(request: ChatRequest):
         history = session_store.get_session(request.session_id)
 
         # Generate response
-        response = chat_agent.chat(
+        response = await chat_agent.chat_async(
             session_id=request.session_id,
             message=request.message,
             conversation_history=history,
-            top_k=request.top_k
+            top_k=request.top_k,
+            bypass_cache=request.bypass_cache,
+            **request.retrieval_options()
         )
 
         # Store messages in session
@@ -99,19 +173,71 @@ def chat(request: ChatRequest):
             request.session_id,
             "assistant",
             response.answer,
-            citations=[c.model_dump() for c in response.citations]
+            citations=response.citations
         )
 
         return response
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Chat unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
 
+def _sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat over Server-Sent Events.
+    Sends a `citations` event first, then `token` events as the answer is
+    generated, and a final `done` event. The assembled answer is stored in
+    the session once the stream completes.
+    """
+    history = session_store.get_session(request.session_id)
+
+    async def event_stream():
+        citations = []
+        try:
+            async for event, payload in chat_agent.chat_stream(
+                session_id=request.session_id,
+                message=request.message,
+                conversation_history=history,
+                top_k=request.top_k,
+                bypass_cache=request.bypass_cache,
+                **request.retrieval_options()
+            ):
+                if event == "citations":
+                    citations = payload
+                    yield _sse_event("citations", [c.model_dump() for c in payload])
+                elif event == "token":
+                    yield _sse_event("token", {"text": payload})
+                else:
+                    session_store.add_message(request.session_id, "user", request.message)
+                    session_store.add_message(
+                        request.session_id,
+                        "assistant",
+                        payload,
+                        citations=citations
+                    )
+                    yield _sse_event("done", {"session_id": request.session_id, "answer": payload})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Chat error: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/chat/{session_id}/history", response_model=ChatHistoryResponse)
 def get_chat_history(session_id: str):
     """Get conversation history for a session."""
     try:
-        messages = session_store.get_session(session_id)
+        messages = [record.to_chat_message() for record in session_store.get_session(session_id)]
         return ChatHistoryResponse(session_id=session_id, messages=messages)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -122,6 +248,7 @@ def clear_chat_session(session_id: str):
     """Clear a chat session."""
     try:
         session_store.clear_session(session_id)
+        chat_agent.history.forget(session_id)
         return {"status": "success", "message": f"Session {session_id} cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -133,6 +260,36 @@ def health_check():
     return {"status": "ok", "service": "NG12 Cancer Risk Assessor"}
 
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness endpoint: 503 until every component has warmed up."""
+    state = get_warmup_state()
+    return JSONResponse(
+        status_code=200 if state.is_ready else 503,
+        content=state.report(),
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    """Runtime counters for caches and pipeline stages."""
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "retrieval_cache": get_retrieval_cache().stats(),
+        "assessment_cache": get_assessment_cache().stats(),
+        "llm_cache": get_llm_cache().stats(),
+        "llm_provider": get_llm_provider().stats(),
+        "llm_resilience": get_llm_resilience().stats(),
+        "stages": get_stage_limiter().stats(),
+        "coalescing": single_flight_stats(),
+        "assessment_routing": clinical_agent.routing_stats,
+        "assessment_decisions": clinical_agent.decision_stats,
+        "prompt_tokens": get_prompt_metrics().stats(),
+        "chat_history": chat_agent.history.stats(),
+        "sessions": session_store.stats(),
+    }
+
+
 # Mount frontend static files if they exist
 frontend_dist_path = Path(__file__).parent.parent.parent / "frontend" / "dist"
 if frontend_dist_path.exists():
@@ -1,3 +1,15 @@
-from .session_store import SessionStore, get_session_store
+from .session_store import (
+    MemorySessionStore,
+    SessionStore,
+    SQLiteSessionStore,
+    create_session_store,
+    get_session_store,
+)
 
-__all__ = ["SessionStore", "get_session_store"]
+__all__ = [
+    "SessionStore",
+    "MemorySessionStore",
+    "SQLiteSessionStore",
+    "create_session_store",
+    "get_session_store",
+]
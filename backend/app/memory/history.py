@@ -0,0 +1,133 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+from app.context import count_chunk_tokens
+from app.memory.records import MessageRecord
+
+
+# Most recent messages sent verbatim (a user turn plus its answer is 2)
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "6"))
+# Token cap on the rolling summary of older messages (0 disables it)
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+# Sessions whose summaries are kept in memory
+CHAT_SUMMARY_CACHE_SESSIONS = int(os.getenv("CHAT_SUMMARY_CACHE_SESSIONS", "1024"))
+
+CONTEXT_MARKER = "--- Relevant Guidelines Context ---"
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+_PAGE_RE = re.compile(r"page (\d+)", re.IGNORECASE)
+
+
+def strip_context(content: str) -> str:
+    """Drop a retrieved-context block that was stored along with a message."""
+    return content.split(CONTEXT_MARKER, 1)[0].strip()
+
+
+def _first_sentence(text: str, max_words: int) -> str:
+    sentence = _SENTENCE_END_RE.split(" ".join(text.split()), 1)[0]
+    words = sentence.split()
+    return " ".join(words[:max_words]) + ("..." if len(words) > max_words else "")
+
+
+def summarize_message(message: MessageRecord) -> str:
+    """One-line extractive summary of a message for the rolling summary."""
+    content = strip_context(message.content)
+    if message.role == "user":
+        return f"User asked: {_first_sentence(content, 25)}"
+    pages = sorted({c.page for c in message.citations or []} | {int(p) for p in _PAGE_RE.findall(content)})
+    cited = f" (NG12 p. {', '.join(str(p) for p in pages[:5])})" if pages else ""
+    return f"Assistant answered: {_first_sentence(content, 30)}{cited}"
+
+
+class _Summary:
+    __slots__ = ("covered", "anchor", "lines", "tokens")
+
+    def __init__(self, anchor: str):
+        self.covered = 0
+        self.anchor = anchor
+        self.lines: List[str] = []
+        self.tokens = 0
+
+
+class HistoryManager:
+    """
+    Sliding window of recent messages plus a rolling summary of the rest.
+
+    Messages that slide out of the window are folded into a per-session
+    summary one at a time, so each turn only summarises what was evicted
+    since the last turn. The summary is extractive (first sentence of each
+    question and answer, plus cited pages) and capped at `summary_tokens`,
+    oldest lines going first. Summaries are cached per session in an LRU.
+    """
+
+    def __init__(
+        self,
+        window: int = CHAT_HISTORY_WINDOW,
+        summary_tokens: int = CHAT_SUMMARY_TOKENS,
+        max_sessions: int = CHAT_SUMMARY_CACHE_SESSIONS,
+    ):
+        self.window = window
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._summaries: "OrderedDict[str, _Summary]" = OrderedDict()
+        self.summarized_messages = 0
+
+    @staticmethod
+    def _anchor(history: Sequence[MessageRecord]) -> str:
+        # Identifies the session's first message, so a cleared and reused
+        # session ID doesn't inherit a stale summary
+        return hashlib.sha1(history[0].content.encode("utf-8")).hexdigest() if history else ""
+
+    def _summary_for(self, session_id: str, history: Sequence[MessageRecord]) -> _Summary:
+        anchor = self._anchor(history)
+        summary = self._summaries.get(session_id)
+        if summary is None or summary.anchor != anchor or summary.covered > len(history):
+            summary = _Summary(anchor)
+            self._summaries[session_id] = summary
+        self._summaries.move_to_end(session_id)
+        while len(self._summaries) > self.max_sessions:
+            self._summaries.popitem(last=False)
+        return summary
+
+    def build(
+        self, session_id: str, history: Sequence[MessageRecord]
+    ) -> Tuple[str, List[MessageRecord]]:
+        """Return (summary of older messages, recent messages to send verbatim)."""
+        cut = max(0, len(history) - self.window)
+        recent = [
+            m._replace(content=strip_context(m.content)) if CONTEXT_MARKER in m.content else m
+            for m in history[cut:]
+        ]
+        if not cut or self.summary_tokens <= 0:
+            return "", recent
+
+        with self._lock:
+            summary = self._summary_for(session_id, history)
+            # Incremental: only messages evicted since the last turn
+            for message in history[summary.covered:cut]:
+                line = summarize_message(message)
+                summary.lines.append(line)
+                summary.tokens += count_chunk_tokens(line)
+                self.summarized_messages += 1
+            summary.covered = max(summary.covered, cut)
+            while summary.tokens > self.summary_tokens and len(summary.lines) > 1:
+                summary.tokens -= count_chunk_tokens(summary.lines.pop(0))
+            text = "\n".join(summary.lines)
+        return text, recent
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._summaries.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window": self.window,
+                "summary_tokens": self.summary_tokens,
+                "cached_sessions": len(self._summaries),
+                "summarized_messages": self.summarized_messages,
+            }
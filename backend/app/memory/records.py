@@ -0,0 +1,84 @@
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.schemas.models import ChatMessage, Citation
+
+
+# Shared role strings, so records don't each carry a copy
+_ROLES = {"user": "user", "assistant": "assistant"}
+
+
+class MessageRecord(NamedTuple):
+    """
+    Compact session message: a plain tuple with the citations kept as chunk
+    IDs. Pydantic `ChatMessage`s are only built at the API boundary.
+    """
+
+    role: str
+    content: str
+    citation_ids: Tuple[str, ...] = ()
+
+    @property
+    def citations(self) -> List[Citation]:
+        return get_citation_registry().resolve(self.citation_ids)
+
+    @property
+    def size(self) -> int:
+        """Approximate payload bytes held by this record."""
+        return len(self.content.encode("utf-8")) + sum(len(chunk_id) for chunk_id in self.citation_ids)
+
+    def to_chat_message(self) -> ChatMessage:
+        return ChatMessage(role=self.role, content=self.content, citations=self.citations)
+
+
+class CitationRegistry:
+    """
+    One `Citation` per chunk ID, shared by every session that cites it.
+    Chunk IDs are content hashes, so a chunk's citation never changes and
+    the registry only grows with the corpus, not with traffic.
+    """
+
+    def __init__(self):
+        self._citations: Dict[str, Citation] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, citations: Optional[Iterable]) -> Tuple[str, ...]:
+        """Register citations (models, dicts or known chunk IDs) and return their chunk IDs."""
+        ids = []
+        for citation in citations or ():
+            if isinstance(citation, str):
+                ids.append(citation)
+                continue
+            chunk_id = citation["chunk_id"] if isinstance(citation, dict) else citation.chunk_id
+            if chunk_id not in self._citations:
+                if isinstance(citation, dict):
+                    citation = Citation(**citation)
+                with self._lock:
+                    self._citations.setdefault(chunk_id, citation)
+            ids.append(chunk_id)
+        return tuple(ids)
+
+    def missing(self, chunk_ids: Iterable[str]) -> List[str]:
+        return [chunk_id for chunk_id in chunk_ids if chunk_id not in self._citations]
+
+    def resolve(self, chunk_ids: Sequence[str]) -> List[Citation]:
+        return [self._citations[chunk_id] for chunk_id in chunk_ids if chunk_id in self._citations]
+
+    def __len__(self) -> int:
+        return len(self._citations)
+
+
+def make_record(role: str, content: str, citations: Optional[Iterable] = None) -> MessageRecord:
+    return MessageRecord(_ROLES.get(role, role), content, get_citation_registry().intern(citations))
+
+
+# Global citation registry
+_registry: CitationRegistry = None
+
+
+def get_citation_registry() -> CitationRegistry:
+    """Get or create the shared citation registry."""
+    global _registry
+    if _registry is None:
+        _registry = CitationRegistry()
+    return _registry
@@ -1,19 +1,60 @@
-from typing import Dict, List
-from app.schemas.models import ChatMessage
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from app.memory.records import MessageRecord, get_citation_registry, make_record
 
+logger = logging.getLogger(__name__)
 
-class SessionStore:
-    """In-memory store for chat sessions."""
 
-    def __init__(self):
-        self.sessions: Dict[str, List[ChatMessage]] = {}
+# "memory" (per-process LRU) or "sqlite" (WAL database shared by workers)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "./sessions.db")
+# Idle seconds before a session expires (0 = never)
+SESSION_TTL = float(os.getenv("SESSION_TTL", "86400"))
+# Sessions kept before the least recently used are evicted
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+# Messages kept per session; older ones are dropped
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "200"))
+# Seconds between eviction sweeps
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
 
-    def get_session(self, session_id: str) -> List[ChatMessage]:
-        """Get chat history for a session."""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-        return self.sessions[session_id]
 
+class SessionStore(ABC):
+    """
+    Chat session storage.
+    History is kept as compact `MessageRecord`s with citations referenced by
+    chunk ID; callers convert to `ChatMessage` only when serialising a
+    response. Reads never create a session; sessions idle for longer than `ttl_seconds`
+    expire, each keeps at most `max_messages` (oldest dropped first), and
+    `sweep()` evicts expired and least recently used sessions.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        max_messages: int = SESSION_MAX_MESSAGES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.expired = 0
+        self.evicted = 0
+        self.truncated = 0
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> List[MessageRecord]:
+        """Get chat history for a session ([] if it doesn't exist)."""
+        raise NotImplementedError
+
+    @abstractmethod
     def add_message(
         self,
         session_id: str,
@@ -21,25 +62,355 @@ class SessionStore:
         content: str,
         citations: list = None
     ):
-        """Add a message to a session."""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-
-        message = ChatMessage(
-            role=role,
-            content=content,
-            citations=citations or []
-        )
-        self.sessions[session_id].append(message)
+        """Add a message to a session, creating it if needed."""
+        raise NotImplementedError
 
+    @abstractmethod
     def clear_session(self, session_id: str):
         """Clear a session."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        raise NotImplementedError
 
+    @abstractmethod
     def list_sessions(self) -> List[str]:
         """List all active session IDs."""
-        return list(self.sessions.keys())
+        raise NotImplementedError
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Evict expired and excess sessions; returns how many were removed."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    async def run_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL):
+        """Sweep periodically until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception:
+                logger.exception("Session sweep failed")
+
+    def _counters(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "max_sessions": self.max_sessions,
+            "max_messages": self.max_messages,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "truncated_messages": self.truncated,
+        }
+
+
+class _Session:
+    __slots__ = ("messages", "bytes", "touched")
+
+    def __init__(self, touched: float):
+        self.messages: List[MessageRecord] = []
+        self.bytes = 0
+        self.touched = touched
+
+
+class MemorySessionStore(SessionStore):
+    """In-process sessions in an LRU; lost on restart, not shared by workers."""
+
+    def __init__(self, **limits):
+        super().__init__(**limits)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+    def _expired(self, session: _Session, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - session.touched > self.ttl_seconds
+
+    def _drop(self, session_id: str):
+        self._bytes -= self._sessions.pop(session_id).bytes
+
+    def _live(self, session_id: str, now: float) -> Optional[_Session]:
+        session = self._sessions.get(session_id)
+        if session is not None and self._expired(session, now):
+            self._drop(session_id)
+            self.expired += 1
+            return None
+        return session
+
+    def get_session(self, session_id: str) -> List[MessageRecord]:
+        now = time.monotonic()
+        with self._lock:
+            session = self._live(session_id, now)
+            if session is None:
+                return []
+            session.touched = now
+            self._sessions.move_to_end(session_id)
+            return list(session.messages)
+
+    def add_message(self, session_id: str, role: str, content: str, citations: list = None):
+        record = make_record(role, content, citations)
+        size = record.size
+        now = time.monotonic()
+        with self._lock:
+            session = self._live(session_id, now)
+            if session is None:
+                session = self._sessions[session_id] = _Session(now)
+            session.messages.append(record)
+            session.bytes += size
+            self._bytes += size
+            excess = len(session.messages) - self.max_messages
+            if excess > 0:
+                dropped = sum(r.size for r in session.messages[:excess])
+                del session.messages[:excess]
+                session.bytes -= dropped
+                self._bytes -= dropped
+                self.truncated += excess
+            session.touched = now
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._drop(next(iter(self._sessions)))
+                self.evicted += 1
+
+    def clear_session(self, session_id: str):
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    def list_sessions(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions.keys())
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            # LRU order: expired sessions are at the front
+            expired = []
+            for session_id, session in self._sessions.items():
+                if not self._expired(session, now):
+                    break
+                expired.append(session_id)
+            for session_id in expired:
+                self._drop(session_id)
+            self.expired += len(expired)
+            return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "active_sessions": len(self._sessions),
+                "messages": sum(len(s.messages) for s in self._sessions.values()),
+                "bytes": self._bytes,
+                **self._counters(),
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite database in WAL mode, so every uvicorn worker sees
+    the same history and it survives restarts. The session cap is enforced
+    by the sweeper rather than on every write. Messages store the chunk IDs
+    they cite; each citation body is written once to a `citations` table.
+    """
+
+    def __init__(self, db_path: str = SESSION_DB_PATH, **limits):
+        super().__init__(**limits)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # Chunk IDs whose citation this process has already written
+        self._stored_citations = set()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                touched REAL NOT NULL,
+                messages INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched);
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                citations TEXT,
+                bytes INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+            CREATE TABLE IF NOT EXISTS citations (
+                chunk_id TEXT PRIMARY KEY,
+                citation TEXT NOT NULL
+            );
+            """
+        )
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds else float("-inf")
+
+    def _delete(self, where: str, params: tuple) -> int:
+        ids = [row[0] for row in self._conn.execute(f"SELECT session_id FROM sessions WHERE {where}", params)]
+        for session_id in ids:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return len(ids)
+
+    def _load_citations(self, chunk_ids: List[str]):
+        """Fetch citations written by other workers into the registry."""
+        registry = get_citation_registry()
+        missing = registry.missing(set(chunk_ids))
+        for start in range(0, len(missing), 500):
+            batch = missing[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT citation FROM citations WHERE chunk_id IN ({','.join('?' * len(batch))})", batch
+            )
+            registry.intern(json.loads(citation) for (citation,) in rows)
+
+    def get_session(self, session_id: str) -> List[MessageRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT touched FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[0] < self._cutoff():
+                return []
+            self._conn.execute(
+                "UPDATE sessions SET touched = ? WHERE session_id = ?", (time.time(), session_id)
+            )
+            rows = self._conn.execute(
+                "SELECT role, content, citations FROM messages WHERE session_id = ? ORDER BY id",
+                (session_id,),
+            ).fetchall()
+            cited = [(role, content, json.loads(citations) if citations else ()) for role, content, citations in rows]
+            self._load_citations([chunk_id for _, _, ids in cited for chunk_id in ids])
+        return [make_record(role, content, ids) for role, content, ids in cited]
+
+    def add_message(self, session_id: str, role: str, content: str, citations: list = None):
+        record = make_record(role, content, citations)
+        citations_json = json.dumps(record.citation_ids) if record.citation_ids else None
+        size = record.size
+        now = time.time()
+        with self._lock:
+            new_citations = [
+                c for c in record.citations if c.chunk_id not in self._stored_citations
+            ]
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if new_citations:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO citations (chunk_id, citation) VALUES (?, ?)",
+                        [(c.chunk_id, c.model_dump_json()) for c in new_citations],
+                    )
+                # An expired session starts over rather than being extended
+                self.expired += self._delete("session_id = ? AND touched < ?", (session_id, self._cutoff()))
+                self._conn.execute(
+                    "INSERT INTO messages (session_id, role, content, citations, bytes) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, role, content, citations_json, size),
+                )
+                self._conn.execute(
+                    """
+                    INSERT INTO sessions (session_id, touched, messages, bytes) VALUES (?, ?, 1, ?)
+                    ON CONFLICT (session_id) DO UPDATE SET
+                        touched = excluded.touched,
+                        messages = messages + 1,
+                        bytes = bytes + excluded.bytes
+                    """,
+                    (session_id, now, size),
+                )
+                count = self._conn.execute(
+                    "SELECT messages FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                if count > self.max_messages:
+                    excess = count - self.max_messages
+                    dropped = self._conn.execute(
+                        """
+                        SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM (
+                            SELECT bytes FROM messages WHERE session_id = ? ORDER BY id LIMIT ?
+                        )
+                        """,
+                        (session_id, excess),
+                    ).fetchone()
+                    self._conn.execute(
+                        """
+                        DELETE FROM messages WHERE id IN (
+                            SELECT id FROM messages WHERE session_id = ? ORDER BY id LIMIT ?
+                        )
+                        """,
+                        (session_id, excess),
+                    )
+                    self._conn.execute(
+                        "UPDATE sessions SET messages = messages - ?, bytes = bytes - ? WHERE session_id = ?",
+                        (dropped[0], dropped[1], session_id),
+                    )
+                    self.truncated += dropped[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._stored_citations.update(c.chunk_id for c in new_citations)
+
+    def clear_session(self, session_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._delete("session_id = ?", (session_id,))
+            self._conn.execute("COMMIT")
+
+    def list_sessions(self) -> List[str]:
+        with self._lock:
+            return [
+                row[0] for row in self._conn.execute(
+                    "SELECT session_id FROM sessions WHERE touched >= ? ORDER BY touched", (self._cutoff(),)
+                )
+            ]
+
+    def sweep(self) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = self._delete("touched < ?", (self._cutoff(),))
+                excess = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+                evicted = 0
+                if excess > 0:
+                    evicted = self._delete(
+                        "session_id IN (SELECT session_id FROM sessions ORDER BY touched LIMIT ?)", (excess,)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.expired += expired
+            self.evicted += evicted
+            return expired + evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions, messages, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(messages), 0), COALESCE(SUM(bytes), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "active_sessions": sessions,
+            "messages": messages,
+            "bytes": size,
+            **self._counters(),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_store(kind: str = None, **options) -> SessionStore:
+    """Build a session store of the given kind ("memory" or "sqlite")."""
+    kind = kind or SESSION_BACKEND
+    if kind == "memory":
+        return MemorySessionStore(**options)
+    if kind == "sqlite":
+        return SQLiteSessionStore(**options)
+    raise ValueError(f"Unknown session backend: {kind}")
 
 
 # Global session store
@@ -50,5 +421,5 @@ def get_session_store() -> SessionStore:
     """Get or create session store."""
     global _store
     if _store is None:
-        _store = SessionStore()
+        _store = create_session_store()
     return _store
@@ -1,4 +1,13 @@
 from .ingestion import PDFIngester, ingest_ng12_pdf
 from .retriever import RAGRetriever
+from .registry import get_embedding_model, get_chroma_client, get_collection, get_vector_backend
 
-__all__ = ["PDFIngester", "ingest_ng12_pdf", "RAGRetriever"]
+__all__ = [
+    "PDFIngester",
+    "ingest_ng12_pdf",
+    "RAGRetriever",
+    "get_embedding_model",
+    "get_chroma_client",
+    "get_collection",
+    "get_vector_backend",
+]
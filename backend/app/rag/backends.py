@@ -0,0 +1,330 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style `where` filter ($eq, $ne, $in, $nin, $and, $or)."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class VectorBackend(ABC):
+    """
+    Storage and nearest-neighbour search for chunk embeddings.
+    Query results use Chroma's shape (one inner list per query embedding) so
+    callers don't depend on which backend is configured.
+    """
+
+    @abstractmethod
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, List[List[Any]]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of existing chunks without re-embedding them."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(
+        self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, List[Any]]:
+        """Fetch stored chunks (ids, documents, metadatas) by id and/or filter."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def flush(self):
+        """Persist buffered writes. A no-op for backends that write through."""
+
+
+class ChromaBackend(VectorBackend):
+    """Backend over a Chroma collection (HNSW, cosine space)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def query(self, query_embeddings, top_k, where=None):
+        return self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            where=where or None,
+            include=["documents", "metadatas", "distances"]
+        )
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas
+        )
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def update_metadata(self, ids, metadatas):
+        if ids:
+            self.collection.update(ids=ids, metadatas=metadatas)
+
+    def get(self, ids=None, where=None):
+        results = self.collection.get(
+            ids=ids, where=where or None, include=["documents", "metadatas"]
+        )
+        return {
+            "ids": results["ids"],
+            "documents": results["documents"],
+            "metadatas": results["metadatas"],
+        }
+
+    def count(self):
+        return self.collection.count()
+
+
+class NumpyBackend(VectorBackend):
+    """
+    Exact search over a memory-mapped float32 matrix.
+
+    Embeddings are L2-normalised and stored in `embeddings.npy`; ids, texts
+    and metadata live in a `metadata.json` sidecar in the same row order.
+    Top-k is one matrix product plus `argpartition`. The matrix is opened
+    with mmap, so every worker on a host shares the same page-cache copy.
+    Writes are buffered until flush(), which rewrites both files atomically;
+    readers pick up the new files when the sidecar's mtime changes.
+    """
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    METADATA_FILE = "metadata.json"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._loaded_mtime: Optional[int] = None
+        self._embeddings: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._filter_rows: Dict[str, np.ndarray] = {}
+        self._pending_upserts: Dict[str, tuple] = {}
+        self._pending_metadata: Dict[str, Dict[str, Any]] = {}
+        self._pending_deletes: set = set()
+
+    @property
+    def embeddings_path(self) -> Path:
+        return self.path / self.EMBEDDINGS_FILE
+
+    @property
+    def metadata_path(self) -> Path:
+        return self.path / self.METADATA_FILE
+
+    def _refresh(self):
+        """(Re)load the files if another process has rewritten them."""
+        try:
+            mtime = self.metadata_path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with self._lock:
+            if mtime == self._loaded_mtime:
+                return
+            sidecar = json.loads(self.metadata_path.read_text())
+            embeddings = np.load(self.embeddings_path, mmap_mode="r")
+            if embeddings.shape[0] != len(sidecar["ids"]):
+                # Caught between the two renames of a flush; retry next call
+                return
+            self._embeddings = embeddings
+            self._ids = sidecar["ids"]
+            self._documents = sidecar["documents"]
+            self._metadatas = sidecar["metadatas"]
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+            self._filter_rows = {}
+            self._loaded_mtime = mtime
+
+    def _rows_matching(self, where: Dict[str, Any]) -> np.ndarray:
+        """Row indices passing a filter; memoised until the files change."""
+        key = json.dumps(where, sort_keys=True)
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            rows = np.array(
+                [i for i, metadata in enumerate(self._metadatas) if _matches(metadata, where)],
+                dtype=np.int64,
+            )
+            if len(self._filter_rows) >= 256:
+                self._filter_rows.clear()
+            self._filter_rows[key] = rows
+        return rows
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def query(self, query_embeddings, top_k, where=None):
+        self._refresh()
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if self._embeddings is None or not self._ids:
+            for key in results:
+                results[key] = [[] for _ in query_embeddings]
+            return results
+
+        candidates = None
+        matrix = self._embeddings
+        if where:
+            candidates = self._rows_matching(where)
+            matrix = self._embeddings[candidates]
+
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1))
+        k = min(top_k, matrix.shape[0])
+        if k == 0:
+            for key in results:
+                results[key] = [[] for _ in query_embeddings]
+            return results
+
+        scores = queries @ matrix.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for row, cols in enumerate(top):
+            cols = cols[np.argsort(-scores[row, cols])]
+            rows = candidates[cols] if candidates is not None else cols
+            results["ids"].append([self._ids[i] for i in rows])
+            results["documents"].append([self._documents[i] for i in rows])
+            results["metadatas"].append([self._metadatas[i] for i in rows])
+            results["distances"].append([float(1.0 - s) for s in scores[row, cols]])
+        return results
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        with self._lock:
+            for chunk_id, embedding, document, metadata in zip(ids, embeddings, documents, metadatas):
+                self._pending_deletes.discard(chunk_id)
+                self._pending_upserts[chunk_id] = (embedding, document, metadata)
+
+    def delete(self, ids):
+        with self._lock:
+            for chunk_id in ids:
+                self._pending_upserts.pop(chunk_id, None)
+                self._pending_metadata.pop(chunk_id, None)
+                self._pending_deletes.add(chunk_id)
+
+    def update_metadata(self, ids, metadatas):
+        with self._lock:
+            for chunk_id, metadata in zip(ids, metadatas):
+                if chunk_id in self._pending_upserts:
+                    embedding, document, _ = self._pending_upserts[chunk_id]
+                    self._pending_upserts[chunk_id] = (embedding, document, metadata)
+                else:
+                    self._pending_metadata[chunk_id] = metadata
+
+    def get(self, ids=None, where=None):
+        self._refresh()
+        if ids is None:
+            rows = range(len(self._ids))
+        else:
+            rows = [self._positions[i] for i in ids if i in self._positions]
+        rows = [i for i in rows if _matches(self._metadatas[i], where)]
+        return {
+            "ids": [self._ids[i] for i in rows],
+            "documents": [self._documents[i] for i in rows],
+            "metadatas": [self._metadatas[i] for i in rows],
+        }
+
+    def count(self):
+        self._refresh()
+        return len(self._ids)
+
+    def flush(self):
+        self._refresh()
+        with self._lock:
+            if not (self._pending_upserts or self._pending_deletes or self._pending_metadata):
+                return
+
+            keep = [
+                i for i, chunk_id in enumerate(self._ids)
+                if chunk_id not in self._pending_deletes and chunk_id not in self._pending_upserts
+            ]
+            ids = [self._ids[i] for i in keep]
+            documents = [self._documents[i] for i in keep]
+            metadatas = [self._pending_metadata.get(self._ids[i], self._metadatas[i]) for i in keep]
+            blocks = []
+            if keep and self._embeddings is not None:
+                blocks.append(np.asarray(self._embeddings[keep], dtype=np.float32))
+
+            if self._pending_upserts:
+                new_ids = list(self._pending_upserts)
+                new_embeddings = np.asarray(
+                    [self._pending_upserts[i][0] for i in new_ids], dtype=np.float32
+                )
+                blocks.append(self._normalize(new_embeddings))
+                ids.extend(new_ids)
+                documents.extend(self._pending_upserts[i][1] for i in new_ids)
+                metadatas.extend(self._pending_upserts[i][2] for i in new_ids)
+
+            matrix = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.float32)
+
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_embeddings = self.path / f"{self.EMBEDDINGS_FILE}.tmp"
+            tmp_metadata = self.path / f"{self.METADATA_FILE}.tmp"
+            with open(tmp_embeddings, "wb") as f:
+                np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+            tmp_metadata.write_text(json.dumps(
+                {"ids": ids, "documents": documents, "metadatas": metadatas},
+                separators=(",", ":"),
+            ))
+            # Matrix first: readers reload only when the sidecar changes
+            os.replace(tmp_embeddings, self.embeddings_path)
+            os.replace(tmp_metadata, self.metadata_path)
+
+            self._pending_upserts.clear()
+            self._pending_metadata.clear()
+            self._pending_deletes.clear()
+            self._loaded_mtime = None
+        self._refresh()
@@ -0,0 +1,206 @@
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+
+# Chunk size bounds in words; a recommendation is kept whole when it fits
+CHUNK_MAX_WORDS = int(os.getenv("CHUNK_MAX_WORDS", "180"))
+CHUNK_MIN_WORDS = int(os.getenv("CHUNK_MIN_WORDS", "20"))
+
+DEFAULT_SECTION = "NG12 Cancer Guidelines"
+
+# "1.1.1 Refer people using a suspected cancer pathway referral ..."
+RECOMMENDATION_RE = re.compile(r"^(\d{1,2}\.\d{1,2}\.\d{1,2})\s+(\S.*)$")
+# "1.1 Lung and pleural cancers" / "1 Recommendations organised by site of cancer"
+SECTION_RE = re.compile(r"^(\d{1,2}(?:\.\d{1,2})?)\s+([A-Z][^.;:]{2,100})$")
+# Running headers/footers repeated on every page of the NICE PDF
+FURNITURE_RE = re.compile(
+    r"©\s*NICE|All rights\s+reserved|Notice of rights|^Page \d+ of \d+$"
+    r"|recognition and referral \(NG12\)$",
+    re.IGNORECASE,
+)
+BULLET_RE = re.compile(r"^[•\-–(]|^\(cid:\d+\)")
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+class StructureChunker:
+    """
+    Splits extracted NG12 pages along the guideline's own structure.
+
+    Numbered recommendations (1.1.1) become one chunk each, split at line
+    boundaries only when longer than `max_words`. Section headings (1.1 ...)
+    and unnumbered sub-headings (e.g. "Lung cancer") are tracked and stamped
+    on every chunk, both as metadata and as a one-line context header in the
+    chunk text. Tables are emitted as row groups with the header row
+    repeated. Section state carries over page breaks, so a recommendation
+    that continues onto the next page keeps its ID; `state` / `restore()`
+    let incremental ingestion skip unchanged pages without losing it.
+    """
+
+    def __init__(self, max_words: int = CHUNK_MAX_WORDS, min_words: int = CHUNK_MIN_WORDS):
+        self.max_words = max_words
+        self.min_words = min_words
+        self.section_id = ""
+        self.section_title = ""
+        self.heading = ""
+        self.recommendation = ""
+
+    @property
+    def state(self) -> Dict[str, str]:
+        return {
+            "section_id": self.section_id,
+            "section_title": self.section_title,
+            "heading": self.heading,
+            "recommendation": self.recommendation,
+        }
+
+    def restore(self, state: Dict[str, str]):
+        self.section_id = state.get("section_id", "")
+        self.section_title = state.get("section_title", "")
+        self.heading = state.get("heading", "")
+        self.recommendation = state.get("recommendation", "")
+
+    @property
+    def section_label(self) -> str:
+        if self.section_id:
+            return f"{self.section_id} {self.section_title}".strip()
+        return DEFAULT_SECTION
+
+    def _is_heading(self, line: str, next_line: Optional[str]) -> bool:
+        """Unnumbered (sub-)heading: short, no sentence punctuation, not a bullet."""
+        if _words(line) > 10 or BULLET_RE.match(line) or line[0].islower():
+            return False
+        if line.isupper() and len(line) <= 80:
+            return True
+        if line[-1] in ".,;:)" or not line[0].isupper():
+            return False
+        return next_line is not None and bool(RECOMMENDATION_RE.match(next_line))
+
+    def _emit(self, lines: List[str], kind: str, continued: bool = False) -> List[Dict[str, Any]]:
+        """Turn one block of lines into chunks of at most max_words."""
+        context = self.section_label + (f" > {self.heading}" if self.heading else "")
+        parts: List[List[str]] = [[]]
+        size = 0
+        for line in lines:
+            words = line.split()
+            # A single overlong line is split on words
+            pieces = [" ".join(words[i:i + self.max_words]) for i in range(0, len(words), self.max_words)]
+            for piece in pieces:
+                n = _words(piece)
+                if size and size + n > self.max_words:
+                    parts.append([])
+                    size = 0
+                parts[-1].append(piece)
+                size += n
+
+        chunks = []
+        for i, part in enumerate(parts):
+            if not part:
+                continue
+            body = "\n".join(part)
+            if kind == "recommendation" and (continued or i > 0):
+                body = f"{self.recommendation} (continued)\n{body}"
+            chunks.append({
+                "text": f"{context}\n{body}",
+                "section": self.section_label,
+                "section_id": self.section_id,
+                "heading": self.heading,
+                "recommendation": self.recommendation if kind == "recommendation" else "",
+                "kind": kind,
+            })
+        return chunks
+
+    def _table_chunks(self, table: List[List[Optional[str]]]) -> List[Dict[str, Any]]:
+        rows = [
+            " | ".join(" ".join((cell or "").split()) for cell in row)
+            for row in table
+            if any(cell and cell.strip() for cell in row)
+        ]
+        if not rows:
+            return []
+        header, body = rows[0], rows[1:]
+        header_words = _words(header)
+        groups: List[List[str]] = [[]]
+        size = header_words
+        for row in body:
+            n = _words(row)
+            if groups[-1] and size + n > self.max_words:
+                groups.append([])
+                size = header_words
+            groups[-1].append(row)
+            size += n
+        return [
+            chunk
+            for group in groups
+            for chunk in self._emit([header] + group, "table")
+        ]
+
+    def chunk_page(self, page_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Chunk one extracted page, continuing from the previous page's state."""
+        lines = [
+            line.strip()
+            for paragraph in page_data.get("paragraphs", [])
+            for line in paragraph.split("\n")
+            if line.strip() and not FURNITURE_RE.search(line)
+        ]
+
+        chunks: List[Dict[str, Any]] = []
+        block: List[str] = []
+        kind = "recommendation" if self.recommendation else "text"
+        continued = bool(self.recommendation)
+
+        def flush():
+            nonlocal block, continued
+            if block:
+                chunks.extend(self._emit(block, kind, continued))
+            block = []
+            continued = False
+
+        for i, line in enumerate(lines):
+            next_line = lines[i + 1] if i + 1 < len(lines) else None
+            match = RECOMMENDATION_RE.match(line)
+            if match:
+                recommendation = match.group(1)
+                section_id = recommendation.rsplit(".", 1)[0]
+                lead_in = []
+                if (
+                    kind == "text" and section_id == self.section_id
+                    and _words(" ".join(block)) < self.min_words
+                ):
+                    # A short lead-in folds into the recommendation it introduces
+                    lead_in, block = block, []
+                flush()
+                block = lead_in + [line]
+                if section_id != self.section_id:
+                    self.section_id, self.section_title = section_id, ""
+                self.recommendation = recommendation
+                kind = "recommendation"
+                continue
+
+            match = SECTION_RE.match(line)
+            if match and _words(line) <= 12:
+                flush()
+                self.section_id, self.section_title = match.group(1), match.group(2).strip()
+                self.heading = ""
+                self.recommendation = ""
+                kind = "text"
+                continue
+
+            if self._is_heading(line, next_line):
+                flush()
+                self.heading = line.rstrip(":")
+                self.recommendation = ""
+                kind = "text"
+                continue
+
+            block.append(line)
+
+        flush()
+
+        for table in page_data.get("tables", []):
+            chunks.extend(self._table_chunks(table))
+        return chunks
+
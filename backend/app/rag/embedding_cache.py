@@ -0,0 +1,217 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different strings share a cache key."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings with optional TTL.
+    Vectors are stored as packed float32 arrays. An optional SQLite file lets
+    several workers on the same host share computed embeddings; it keeps the
+    `disk_max_entries` most recently used vectors.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 0,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 50000,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._disk_puts = 0
+
+        if self.disk_path:
+            conn = self._disk()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+
+    def _disk(self) -> sqlite3.Connection:
+        # sqlite3 connections are per-thread; lookups run in executor threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.disk_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _expired(self, created: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created > self.ttl_seconds
+
+    @staticmethod
+    def _entry_size(key: str, vector: array) -> int:
+        return len(key) + vector.itemsize * len(vector)
+
+    def _put_memory(self, key: str, vector: array, created: float):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entry_size(key, self._entries.pop(key)[0])
+            self._entries[key] = (vector, created)
+            self._bytes += self._entry_size(key, vector)
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                old_key, (old_vector, _) = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(old_key, old_vector)
+                self.evictions += 1
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Look up an embedding by (already normalized) key."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, created = entry
+                if self._expired(created):
+                    del self._entries[key]
+                    self._bytes -= self._entry_size(key, vector)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector.tolist()
+
+        if self.disk_path:
+            conn = self._disk()
+            row = conn.execute(
+                "SELECT vector, created FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._expired(row[1]):
+                conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE embeddings SET used = ? WHERE key = ?", (time.time(), key))
+                vector = array("f")
+                vector.frombytes(row[0])
+                self._put_memory(key, vector, row[1])
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return vector.tolist()
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, embedding: List[float]):
+        """Store an embedding under a (normalized) key."""
+        vector = array("f", embedding)
+        created = time.time()
+        self._put_memory(key, vector, created)
+        if self.disk_path:
+            conn = self._disk()
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created, used) VALUES (?, ?, ?, ?)",
+                (key, vector.tobytes(), created, created),
+            )
+            with self._lock:
+                self._disk_puts += 1
+                trim = self._disk_puts % 100 == 1
+            # Bound the file: every 100 writes, drop the least recently used overflow
+            if trim:
+                count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                if count > self.disk_max_entries:
+                    conn.execute(
+                        "DELETE FROM embeddings WHERE key IN "
+                        "(SELECT key FROM embeddings ORDER BY used LIMIT ?)",
+                        (count - self.disk_max_entries,),
+                    )
+                    with self._lock:
+                        self.disk_evictions += count - self.disk_max_entries
+
+    @staticmethod
+    def make_key(text: str, namespace: str = "") -> str:
+        return f"{namespace}:{normalize_query(text)}"
+
+    def get_or_compute(self, text: str, compute: Callable[[str], List[float]], namespace: str = "") -> List[float]:
+        """Return the cached embedding for `text`, computing it on a miss."""
+        key = self.make_key(text, namespace)
+        embedding = self.get(key)
+        if embedding is None:
+            embedding = compute(text)
+            self.put(key, embedding)
+        return embedding
+
+    def get_or_compute_many(
+        self,
+        texts: List[str],
+        compute_many: Callable[[List[str]], List[List[float]]],
+        namespace: str = "",
+    ) -> List[List[float]]:
+        """Batch variant of get_or_compute(): all misses are computed in one call."""
+        keys = [self.make_key(text, namespace) for text in texts]
+        embeddings = [self.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = compute_many([texts[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+                self.put(keys[i], embedding)
+        return embeddings
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_path:
+            self._disk().execute("DELETE FROM embeddings")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global embedding cache
+_cache: EmbeddingCache = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the process-wide query-embedding cache."""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(
+            max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000")),
+            max_bytes=int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("EMBEDDING_CACHE_TTL", "0")),
+            disk_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+            disk_max_entries=int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", "50000")),
+        )
+    return _cache
@@ -0,0 +1,127 @@
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import pdfplumber
+
+
+DEFAULT_EXTRACT_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+# Several shards per worker so one slow page range doesn't idle the pool
+SHARDS_PER_WORKER = 4
+
+
+def _outside(bboxes: List[Tuple[float, float, float, float]]):
+    """pdfplumber object filter dropping characters that fall inside any bbox."""
+    def keep(obj) -> bool:
+        if obj.get("object_type") != "char":
+            return True
+        x = (obj["x0"] + obj["x1"]) / 2
+        y = (obj["top"] + obj["bottom"]) / 2
+        return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+    return keep
+
+
+def extract_page(page, page_num: int) -> Optional[Dict[str, Any]]:
+    """
+    Extract one pdfplumber page into page data (None for pages without text).
+    Ruled tables are returned separately as rows of cells and removed from
+    the running text, so their cells aren't flattened into prose.
+    """
+    tables = page.find_tables()
+    if tables:
+        text = page.filter(_outside([table.bbox for table in tables])).extract_text()
+        rows = [table.extract() for table in tables]
+    else:
+        text = page.extract_text()
+        rows = []
+    if not text and not rows:
+        return None
+
+    # Split by paragraphs (double newlines)
+    paragraphs = re.split(r'\n\n+', text or "")
+
+    return {
+        'page': page_num,
+        'paragraphs': [p.strip() for p in paragraphs if p.strip()],
+        'tables': rows,
+    }
+
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, Optional[Dict[str, Any]], float]]:
+    """
+    Extract pages [start, end) (0-based) from a PDF opened by this process.
+    Returns (page_num, page_data, seconds) per page.
+    """
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for index in range(start, min(end, len(pdf.pages))):
+            page_start = time.perf_counter()
+            page_data = extract_page(pdf.pages[index], index + 1)
+            results.append((index + 1, page_data, time.perf_counter() - page_start))
+            # Release layout objects; long documents otherwise grow per page
+            pdf.pages[index].flush_cache()
+    return results
+
+
+def count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def shard_pages(n_pages: int, n_shards: int) -> List[Tuple[int, int]]:
+    """Split [0, n_pages) into contiguous, nearly equal page ranges."""
+    n_shards = max(1, min(n_shards, n_pages))
+    size, extra = divmod(n_pages, n_shards)
+    ranges = []
+    start = 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def iter_page_results(
+    pdf_path: str, workers: int = DEFAULT_EXTRACT_WORKERS
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]], float]]:
+    """
+    Yield (page_num, page_data, seconds) for every page, in page order, as
+    soon as each page range is extracted. With more than one worker, page
+    ranges are sharded across a process pool (each worker opens the PDF
+    itself) with at most a few shards in flight, so memory stays bounded.
+    """
+    n_pages = count_pages(pdf_path)
+    workers = max(1, min(workers, n_pages))
+
+    if workers == 1:
+        yield from extract_page_range(pdf_path, 0, n_pages)
+        return
+
+    shards = shard_pages(n_pages, workers * SHARDS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        next_shard = 0
+        while next_shard < len(shards) or in_flight:
+            while next_shard < len(shards) and len(in_flight) < workers * 2:
+                start, end = shards[next_shard]
+                in_flight.append(pool.submit(extract_page_range, pdf_path, start, end))
+                next_shard += 1
+            # Shards are contiguous and consumed in submission order
+            yield from in_flight.popleft().result()
+
+
+def extract_pages(
+    pdf_path: str, workers: int = DEFAULT_EXTRACT_WORKERS
+) -> Tuple[List[Dict[str, Any]], List[Tuple[int, float]]]:
+    """
+    Extract text from every page, sharding page ranges across a process pool.
+    Results are merged in page order, so the output is identical to the
+    serial path (workers=1).
+    Returns (pages_data, [(page_num, seconds), ...]).
+    """
+    page_results = list(iter_page_results(pdf_path, workers))
+    pages_data = [page_data for _, page_data, _ in page_results if page_data is not None]
+    timings = [(page_num, seconds) for page_num, _, seconds in page_results]
+    return pages_data, timings
@@ -1,115 +1,301 @@
+import hashlib
+import json
 import os
-import re
+import time
 from pathlib import Path
-from typing import List, Dict, Any
-import pdfplumber
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
+from typing import List, Dict, Any, Tuple
+from app.rag.chunking import StructureChunker
+from app.rag.extraction import DEFAULT_EXTRACT_WORKERS, extract_pages, iter_page_results
+from app.rag.lexical import BM25Index, lexical_index_path
+from app.rag.pipeline import AdaptiveBatchSize, BackgroundWriter, IngestionMetrics, prefetch
+from app.rag.routing import RoutingIndex, routing_index_path
+from app.rag.registry import (
+    DEFAULT_CHROMA_DB_PATH,
+    get_embedding_model,
+    get_vector_backend,
+    bump_index_version,
+)
+
+
+MANIFEST_FILE = "ingest_manifest.json"
+MANIFEST_FORMAT = 2
 
 
 class PDFIngester:
-    def __init__(self, chroma_db_path: str = "./vector_store"):
+    def __init__(
+        self,
+        chroma_db_path: str = DEFAULT_CHROMA_DB_PATH,
+        extract_workers: int = DEFAULT_EXTRACT_WORKERS,
+    ):
         self.chroma_db_path = chroma_db_path
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.extract_workers = extract_workers
+        self.page_timings: List[Tuple[int, float]] = []
+        # Reuse the process-wide model and vector backend (shared with retrievers)
+        self.model = get_embedding_model()
+        self.backend = get_vector_backend(chroma_db_path)
 
-        # Initialize Chroma client with persistence
-        settings = Settings(
-            chroma_db_impl="duckdb+parquet",
-            persist_directory=chroma_db_path,
-            anonymized_telemetry=False,
-        )
-        self.client = chromadb.Client(settings)
-        self.collection = self.client.get_or_create_collection(
-            name="ng12_guidelines",
-            metadata={"hnsw:space": "cosine"}
+    def extract_text_from_pdf(self, pdf_path: str) -> List[Dict[str, Any]]:
+        """Extract text and structure from PDF, sharding pages across processes."""
+        start = time.perf_counter()
+        pages_data, self.page_timings = extract_pages(pdf_path, workers=self.extract_workers)
+        elapsed = time.perf_counter() - start
+
+        page_seconds = sum(seconds for _, seconds in self.page_timings)
+        print(
+            f"Extracted {len(self.page_timings)} pages in {elapsed:.2f}s "
+            f"({page_seconds:.2f}s of page work, {self.extract_workers} workers)"
         )
+        for page_num, seconds in sorted(self.page_timings, key=lambda t: t[1], reverse=True)[:5]:
+            print(f"  page {page_num}: {seconds * 1000:.0f} ms")
+        return pages_data
 
-    def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-        """Split text into overlapping chunks by word count."""
-        words = text.split()
-        chunks = []
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            if chunk.strip():
-                chunks.append(chunk)
-        return chunks
+    @staticmethod
+    def chunk_id_for(text: str) -> str:
+        """Content-derived chunk ID: stable however the surrounding text moves."""
+        return f"ng12_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]}"
 
-    def extract_text_from_pdf(self, pdf_path: str) -> List[Dict[str, Any]]:
-        """Extract text and structure from PDF."""
-        pages_data = []
+    @property
+    def manifest_path(self) -> Path:
+        return Path(self.chroma_db_path) / MANIFEST_FILE
 
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                text = page.extract_text()
-                if not text:
-                    continue
+    def load_manifest(self) -> Dict[str, Any]:
+        """Load the previous ingestion manifest, or an empty one if unusable."""
+        empty = {"pages": {}, "chunks": {}}
+        if not self.manifest_path.exists():
+            return empty
+        manifest = json.loads(self.manifest_path.read_text())
+        if manifest.get("format") != MANIFEST_FORMAT:
+            return empty
+        if manifest.get("backend") != type(self.backend).__name__:
+            return empty
+        if manifest["chunks"] and self.backend.count() == 0:
+            # Manifest survived but the store was wiped
+            return empty
+        return manifest
 
-                # Split by paragraphs (double newlines)
-                paragraphs = re.split(r'\n\n+', text)
+    def save_manifest(self, pdf_path: str, pages: Dict[str, Any], chunks: Dict[str, int]):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(f"{self.manifest_path}.tmp")
+        tmp_path.write_text(json.dumps({
+            "format": MANIFEST_FORMAT,
+            "backend": type(self.backend).__name__,
+            "source": Path(pdf_path).name,
+            "pages": pages,
+            "chunks": chunks,
+        }, indent=1))
+        tmp_path.replace(self.manifest_path)
 
-                page_data = {
-                    'page': page_num + 1,
-                    'paragraphs': [p.strip() for p in paragraphs if p.strip()]
-                }
-                pages_data.append(page_data)
+    def _embed_batch(
+        self,
+        batch: List[Tuple[str, str, Dict[str, Any]]],
+        writer: BackgroundWriter,
+        metrics: IngestionMetrics,
+        batch_size: AdaptiveBatchSize,
+    ):
+        ids = [chunk_id for chunk_id, _, _ in batch]
+        documents = [document for _, document, _ in batch]
+        metadatas = [metadata for _, _, metadata in batch]
+        start = time.perf_counter()
+        embeddings = self.model.encode(documents, convert_to_list=True)
+        seconds = time.perf_counter() - start
+        metrics.add("embeddings", len(batch), stage="embed", seconds=seconds)
+        batch_size.observe(len(batch), seconds)
+        # The writer upserts in the background while the next batch encodes
+        writer.put(ids, embeddings, documents, metadatas)
 
-        return pages_data
+    def ingest_pdf(self, pdf_path: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Ingest PDF into the vector store with embeddings.
 
-    def ingest_pdf(self, pdf_path: str):
-        """Ingest PDF into ChromaDB with embeddings."""
-        print(f"Extracting text from {pdf_path}...")
-        pages_data = self.extract_text_from_pdf(pdf_path)
+        Runs as a pipeline: pages are extracted in a background thread (and
+        process pool), chunked along NG12's recommendation structure and
+        diffed as they arrive, embedded in batches
+        whose size adapts to encode time, and upserted by a background
+        writer. Queues between stages are bounded, so memory holds a few
+        pages and batches rather than the whole document.
 
-        chunk_id_counter = 0
-        all_docs = []
-        all_embeddings = []
-        all_metadatas = []
-        all_ids = []
+        Incremental: pages whose extracted text hash matches the manifest are
+        not re-chunked, chunks whose content hash is already stored are not
+        re-embedded, and chunks no longer produced by the PDF are deleted.
+        Identical chunk texts are stored once, under the first page they
+        appear on. Pass force=True to rebuild everything.
+        Returns counts of the work done and skipped, plus throughput.
+        """
+        previous = {"pages": {}, "chunks": {}} if force else self.load_manifest()
+        old_pages = previous["pages"]
+        old_chunks = previous["chunks"]
 
-        for page_data in pages_data:
-            page_num = page_data['page']
-            chunk_idx = 0
+        stats: Dict[str, Any] = {
+            "pages": 0,
+            "pages_unchanged": 0,
+            "pages_changed": 0,
+            "chunks": 0,
+            "chunks_embedded": 0,
+            "chunks_reused": 0,
+            "chunks_moved": 0,
+            "chunks_deleted": 0,
+        }
 
-            for paragraph in page_data['paragraphs']:
-                # Create chunks from paragraphs
-                chunks = self.chunk_text(paragraph, chunk_size=500, overlap=50)
+        pages: Dict[str, Any] = {}
+        chunk_pages: Dict[str, int] = {}
+        moved_ids, moved_metadatas = [], []
+        repaged: Dict[str, int] = {}
+        pending: List[Tuple[str, str, Dict[str, Any]]] = []
+        self.page_timings = []
 
-                for chunk in chunks:
-                    chunk_id = f"ng12_{page_num:04d}_{chunk_idx:02d}"
+        chunker = StructureChunker()
+        metrics = IngestionMetrics()
+        batch_size = AdaptiveBatchSize()
+        writer = BackgroundWriter(self.backend, metrics).start()
+
+        print(f"Ingesting {pdf_path} ({self.extract_workers} extraction workers)...")
+        try:
+            for page_num, page_data, seconds in prefetch(
+                iter_page_results(pdf_path, workers=self.extract_workers)
+            ):
+                self.page_timings.append((page_num, seconds))
+                metrics.add("pages", stage="extract", seconds=seconds)
+                if page_data is None:
+                    continue
+                stats["pages"] += 1
+
+                # The chunker's carried-in state (open section/recommendation)
+                # is part of the hash: a page reads differently under a new heading
+                page_hash = hashlib.sha1(json.dumps(
+                    [chunker.state, page_data['paragraphs'], page_data.get('tables', [])]
+                ).encode("utf-8")).hexdigest()
+
+                old_page = old_pages.get(str(page_num))
+                if old_page is not None and old_page["hash"] == page_hash:
+                    stats["pages_unchanged"] += 1
+                    pages[str(page_num)] = old_page
+                    chunker.restore(old_page["state"])
+                    for chunk_id in old_page["chunks"]:
+                        if chunk_id in chunk_pages:
+                            continue
+                        chunk_pages[chunk_id] = page_num
+                        if old_chunks.get(chunk_id) != page_num:
+                            # A duplicate whose first page changed or dropped
+                            # it: the stored copy now belongs to this page
+                            repaged[chunk_id] = page_num
+                        else:
+                            stats["chunks_reused"] += 1
+                    continue
 
-                    all_docs.append(chunk)
-                    all_metadatas.append({
+                stats["pages_changed"] += 1
+                page_chunk_ids = []
+                for chunk in chunker.chunk_page(page_data):
+                    chunk_id = self.chunk_id_for(chunk["text"])
+                    page_chunk_ids.append(chunk_id)
+                    if chunk_id in chunk_pages:
+                        continue
+                    chunk_pages[chunk_id] = page_num
+                    metrics.add("chunks")
+                    metadata = {
                         "page": page_num,
                         "chunk_id": chunk_id,
-                        "section": "NG12 Cancer Guidelines",
-                    })
-                    all_ids.append(chunk_id)
-                    chunk_idx += 1
-
-        # Generate embeddings in batches
-        print(f"Generating embeddings for {len(all_docs)} chunks...")
-        batch_size = 32
-        for i in range(0, len(all_docs), batch_size):
-            batch_docs = all_docs[i:i+batch_size]
-            batch_embeddings = self.model.encode(batch_docs, convert_to_list=True)
-            batch_metadatas = all_metadatas[i:i+batch_size]
-            batch_ids = all_ids[i:i+batch_size]
-
-            # Add to collection
-            self.collection.upsert(
-                documents=batch_docs,
-                embeddings=batch_embeddings,
-                metadatas=batch_metadatas,
-                ids=batch_ids
-            )
-            print(f"Added batch {i//batch_size + 1}...")
-
-        print(f"Successfully ingested PDF. Total chunks: {len(all_docs)}")
-
-
-def ingest_ng12_pdf(pdf_path: str, chroma_db_path: str = "./vector_store"):
+                        "section": chunk["section"],
+                        "section_id": chunk["section_id"],
+                        "heading": chunk["heading"],
+                        "recommendation": chunk["recommendation"],
+                        "kind": chunk["kind"],
+                    }
+                    # Diff against what is already stored
+                    if chunk_id not in old_chunks:
+                        pending.append((chunk_id, chunk["text"], metadata))
+                    elif old_chunks[chunk_id] != page_num:
+                        moved_ids.append(chunk_id)
+                        moved_metadatas.append(metadata)
+                    else:
+                        stats["chunks_reused"] += 1
+                pages[str(page_num)] = {"hash": page_hash, "chunks": page_chunk_ids, "state": chunker.state}
+
+                while len(pending) >= batch_size.size:
+                    batch, pending = pending[:batch_size.size], pending[batch_size.size:]
+                    self._embed_batch(batch, writer, metrics, batch_size)
+                    stats["chunks_embedded"] += len(batch)
+                metrics.maybe_report(batch_size.size)
+
+            if pending:
+                self._embed_batch(pending, writer, metrics, batch_size)
+                stats["chunks_embedded"] += len(pending)
+                pending = []
+        finally:
+            writer.close()
+
+        if repaged:
+            # Unchanged pages aren't re-chunked, so only the page number moves
+            stored = self.backend.get(ids=list(repaged))
+            for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]):
+                moved_ids.append(chunk_id)
+                moved_metadatas.append({**metadata, "page": repaged[chunk_id]})
+
+        stats["chunks"] = len(chunk_pages)
+        stats["chunks_moved"] = len(moved_ids)
+        if previous["pages"]:
+            known_ids = list(old_chunks)
+        else:
+            # No usable manifest: anything already stored that this PDF no
+            # longer produces (including legacy positional IDs) is an orphan
+            known_ids = self.backend.get()["ids"]
+        orphans = [chunk_id for chunk_id in known_ids if chunk_id not in chunk_pages]
+        stats["chunks_deleted"] = len(orphans)
+
+        if moved_ids:
+            self.backend.update_metadata(moved_ids, moved_metadatas)
+        if orphans:
+            self.backend.delete(orphans)
+        self.backend.flush()
+
+        changed = bool(stats["chunks_embedded"] or moved_ids or orphans)
+        index_path = lexical_index_path(self.chroma_db_path)
+        routing_path = routing_index_path(self.chroma_db_path)
+        if changed or not index_path.exists() or not routing_path.exists():
+            # Lexical and symptom routing indexes over the same chunks,
+            # persisted next to the vector store
+            print("Building lexical (BM25) and routing indexes...")
+            stored = self.backend.get()
+            BM25Index.build(stored["ids"], stored["documents"], stored["metadatas"]).save(str(index_path))
+            RoutingIndex.build(stored["ids"], stored["documents"], stored["metadatas"]).save(str(routing_path))
+
+        if changed:
+            # New version stamp invalidates cached retrievals and assessments
+            bump_index_version(self.chroma_db_path)
+
+        self.save_manifest(pdf_path, pages, chunk_pages)
+
+        stats["throughput"] = metrics.summary()
+        throughput = stats["throughput"]
+        skipped = stats["chunks"] - stats["chunks_embedded"]
+        print(
+            f"Pages: {stats['pages']} ({stats['pages_unchanged']} unchanged, {stats['pages_changed']} changed)"
+        )
+        print(
+            f"Chunks: {stats['chunks']} ({stats['chunks_embedded']} embedded, {stats['chunks_reused']} reused, "
+            f"{stats['chunks_moved']} moved, {stats['chunks_deleted']} deleted)"
+        )
+        if stats["chunks"]:
+            print(f"Skipped {skipped / stats['chunks']:.1%} of embedding work")
+        print(
+            f"Throughput: {throughput['pages_per_s']} pages/s, {throughput['chunks_per_s']} chunks/s, "
+            f"{throughput['embeddings_per_s']} embeddings/s in {throughput['seconds']}s "
+            f"(final embed batch {batch_size.size})"
+        )
+        print(f"  stage time: {throughput['stage_seconds']}")
+        for page_num, seconds in sorted(self.page_timings, key=lambda t: t[1], reverse=True)[:5]:
+            print(f"  page {page_num}: {seconds * 1000:.0f} ms")
+        print(f"Successfully ingested PDF. Total chunks: {stats['chunks']}")
+        return stats
+
+
+def ingest_ng12_pdf(
+    pdf_path: str,
+    chroma_db_path: str = DEFAULT_CHROMA_DB_PATH,
+    force: bool = False,
+    workers: int = DEFAULT_EXTRACT_WORKERS,
+) -> Dict[str, Any]:
     """Main function to ingest NG12 PDF."""
-    ingester = PDFIngester(chroma_db_path)
-    ingester.ingest_pdf(pdf_path)
+    ingester = PDFIngester(chroma_db_path, extract_workers=workers)
+    stats = ingester.ingest_pdf(pdf_path, force=force)
     print("PDF ingestion complete!")
+    return stats
@@ -0,0 +1,159 @@
+import json
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.rag.backends import _matches
+from app.rag.registry import DEFAULT_CHROMA_DB_PATH
+
+
+LEXICAL_INDEX_FILE = "bm25_index.json"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or that the this "
+    "to was were will with who which what when should".split()
+)
+
+
+def _normalize_token(token: str) -> str:
+    # NG12 uses British spellings (haemoptysis, oesophageal, tumour) while
+    # patient records and questions often don't; fold both to one form.
+    token = token.replace("ae", "e").replace("oe", "e")
+    if token.endswith("our") and len(token) > 5:
+        token = token[:-3] + "or"
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word/number tokens, stopwords removed, spelling variants folded."""
+    return [
+        _normalize_token(token)
+        for token in _TOKEN_RE.findall(text.lower())
+        if token not in _STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Compact in-memory inverted index with Okapi BM25 scoring.
+    Stores chunk texts and metadata as well, so lexical-only retrieval can
+    answer without touching the vector store.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.avg_doc_length = 0.0
+
+    @classmethod
+    def build(
+        cls, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]
+    ) -> "BM25Index":
+        index = cls()
+        for doc_idx, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+            tokens = tokenize(text)
+            index.ids.append(doc_id)
+            index.texts.append(text)
+            index.metadatas.append(metadata)
+            index.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                index.postings.setdefault(term, []).append((doc_idx, tf))
+        index.avg_doc_length = (
+            sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        )
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(
+        self, query: str, top_k: int = 5, where: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[int, float]]:
+        """Return (doc_idx, score) pairs for the best-matching chunks passing `where`."""
+        n_docs = len(self.ids)
+        if not n_docs:
+            return []
+
+        allowed = None
+        if where:
+            allowed = {i for i, metadata in enumerate(self.metadatas) if _matches(metadata, where)}
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_idx, tf in postings:
+                if allowed is not None and doc_idx not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_idx] / self.avg_doc_length)
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def save(self, path: str):
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        tmp_path = Path(f"{path}.tmp")
+        tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(data, separators=(",", ":")))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        data = json.loads(Path(path).read_text())
+        index = cls(k1=data["k1"], b=data["b"])
+        index.ids = data["ids"]
+        index.texts = data["texts"]
+        index.metadatas = data["metadatas"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {term: [tuple(p) for p in plist] for term, plist in data["postings"].items()}
+        index.avg_doc_length = (
+            sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        )
+        return index
+
+
+# Loaded indexes, keyed by file path and reloaded when the file changes
+_lock = threading.Lock()
+_indexes: Dict[str, Tuple[int, BM25Index]] = {}
+
+
+def lexical_index_path(chroma_db_path: str = DEFAULT_CHROMA_DB_PATH) -> Path:
+    return Path(chroma_db_path) / LEXICAL_INDEX_FILE
+
+
+def get_lexical_index(chroma_db_path: str = DEFAULT_CHROMA_DB_PATH) -> Optional[BM25Index]:
+    """Get the persisted BM25 index for a vector store, or None if not built yet."""
+    path = lexical_index_path(chroma_db_path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    key = str(path.resolve())
+    cached = _indexes.get(key)
+    if cached is None or cached[0] != mtime:
+        with _lock:
+            cached = _indexes.get(key)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, BM25Index.load(str(path)))
+                _indexes[key] = cached
+    return cached[1]
@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.rag.backends import VectorBackend
+
+
+# Bounded hand-off queues between ingestion stages
+PAGE_QUEUE_SIZE = int(os.getenv("INGEST_PAGE_QUEUE", "16"))
+WRITE_QUEUE_SIZE = int(os.getenv("INGEST_WRITE_QUEUE", "4"))
+# Adaptive embedding batch bounds and the wall time one batch should take
+EMBED_BATCH_MIN = int(os.getenv("INGEST_EMBED_BATCH_MIN", "8"))
+EMBED_BATCH_MAX = int(os.getenv("INGEST_EMBED_BATCH_MAX", "256"))
+EMBED_BATCH_TARGET_SECONDS = float(os.getenv("INGEST_EMBED_BATCH_TARGET", "0.5"))
+UPSERT_BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH", "256"))
+
+_DONE = object()
+
+
+class IngestionMetrics:
+    """Thread-safe counters and throughput for one ingestion run."""
+
+    def __init__(self, report_every: float = 5.0):
+        self.report_every = report_every
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+        self.counts = {"pages": 0, "chunks": 0, "embeddings": 0, "upserts": 0}
+        self.seconds = {"extract": 0.0, "embed": 0.0, "write": 0.0}
+
+    def add(self, counter: str, n: int = 1, stage: Optional[str] = None, seconds: float = 0.0):
+        with self._lock:
+            self.counts[counter] += n
+            if stage:
+                self.seconds[stage] += seconds
+
+    def rates(self) -> Dict[str, float]:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "pages_per_s": round(self.counts["pages"] / elapsed, 2),
+            "chunks_per_s": round(self.counts["chunks"] / elapsed, 2),
+            "embeddings_per_s": round(self.counts["embeddings"] / elapsed, 2),
+        }
+
+    def maybe_report(self, embed_batch: int):
+        now = time.perf_counter()
+        if now - self._last_report < self.report_every:
+            return
+        self._last_report = now
+        rates = self.rates()
+        print(
+            f"  {self.counts['pages']} pages, {self.counts['chunks']} chunks, "
+            f"{self.counts['embeddings']} embedded ({rates['pages_per_s']} pages/s, "
+            f"{rates['chunks_per_s']} chunks/s, {rates['embeddings_per_s']} embeddings/s, "
+            f"batch {embed_batch})"
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "seconds": round(time.perf_counter() - self.started, 3),
+            **self.rates(),
+            "stage_seconds": {stage: round(s, 3) for stage, s in self.seconds.items()},
+        }
+
+
+class AdaptiveBatchSize:
+    """
+    Embedding batch size that grows while batches finish under the target
+    time and shrinks when they overrun it, within [minimum, maximum].
+    """
+
+    def __init__(
+        self,
+        initial: int = 32,
+        minimum: int = EMBED_BATCH_MIN,
+        maximum: int = EMBED_BATCH_MAX,
+        target_seconds: float = EMBED_BATCH_TARGET_SECONDS,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.size = max(minimum, min(initial, maximum))
+
+    def observe(self, batch_size: int, seconds: float):
+        # Only full batches say anything about the size limit
+        if batch_size < self.size:
+            return
+        if seconds < self.target_seconds / 2:
+            self.size = min(self.size * 2, self.maximum)
+        elif seconds > self.target_seconds * 2:
+            self.size = max(self.size // 2, self.minimum)
+
+
+def prefetch(iterable: Iterable[Any], maxsize: int = PAGE_QUEUE_SIZE) -> Iterator[Any]:
+    """
+    Run an iterator in a background thread, handing items over through a
+    bounded queue so the producer stays at most `maxsize` items ahead.
+    Exceptions raised by the producer are re-raised in the consumer.
+    """
+    items: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    return
+                items.put(item)
+            items.put(_DONE)
+        except BaseException as e:
+            items.put(e)
+
+    thread = threading.Thread(target=produce, name="ingest-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue
+        while thread.is_alive():
+            try:
+                items.get_nowait()
+            except queue.Empty:
+                thread.join(timeout=0.05)
+
+
+class BackgroundWriter:
+    """
+    Writes embedded chunks to a vector backend from a background thread,
+    coalescing them into upserts of `batch_size` rows. put() blocks when
+    `max_pending` batches are queued, bounding memory when writes are slower
+    than embedding.
+    """
+
+    def __init__(
+        self,
+        backend: VectorBackend,
+        metrics: IngestionMetrics,
+        batch_size: int = UPSERT_BATCH_SIZE,
+        max_pending: int = WRITE_QUEUE_SIZE,
+    ):
+        self.backend = backend
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+
+    def start(self) -> "BackgroundWriter":
+        self._thread.start()
+        return self
+
+    def put(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[Dict[str, Any]]):
+        if self._error is not None:
+            raise self._error
+        self._queue.put((ids, embeddings, documents, metadatas))
+
+    def close(self):
+        """Write everything still queued, stop the thread and surface write errors."""
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _write(self, buffer: List[List[Any]]):
+        if not buffer[0]:
+            return
+        start = time.perf_counter()
+        self.backend.upsert(ids=buffer[0], embeddings=buffer[1], documents=buffer[2], metadatas=buffer[3])
+        self.metrics.add("upserts", len(buffer[0]), stage="write", seconds=time.perf_counter() - start)
+        for column in buffer:
+            column.clear()
+
+    def _run(self):
+        buffer: List[List[Any]] = [[], [], [], []]
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                break
+            if self._error is not None:
+                # Keep draining so the producer never blocks on a dead writer
+                continue
+            try:
+                for column, values in zip(buffer, item):
+                    column.extend(values)
+                if len(buffer[0]) >= self.batch_size:
+                    self._write(buffer)
+            except BaseException as e:
+                self._error = e
+        if self._error is None:
+            try:
+                self._write(buffer)
+            except BaseException as e:
+                self._error = e
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Tuple
+from sentence_transformers import SentenceTransformer
+import chromadb
+from chromadb.config import Settings
+
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+COLLECTION_NAME = "ng12_guidelines"
+DEFAULT_CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./vector_store")
+# "chroma" (default) or "numpy" (exact search over a memory-mapped matrix)
+DEFAULT_VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
+# Process-wide handles. One embedding model per model name and one Chroma
+# client per persist directory, shared by every retriever and ingester.
+_model_lock = threading.Lock()
+_store_lock = threading.Lock()
+_models: Dict[str, SentenceTransformer] = {}
+_clients: Dict[str, Any] = {}
+_collections: Dict[Tuple[str, str], Any] = {}
+_backends: Dict[Tuple[str, str], Any] = {}
+
+
+def _normalize_path(chroma_db_path: str) -> str:
+    return str(Path(chroma_db_path).resolve())
+
+
+def get_embedding_model(model_name: str = EMBEDDING_MODEL_NAME) -> SentenceTransformer:
+    """Get or load the shared sentence-transformer model."""
+    model = _models.get(model_name)
+    if model is None:
+        with _model_lock:
+            model = _models.get(model_name)
+            if model is None:
+                model = SentenceTransformer(model_name)
+                _models[model_name] = model
+    return model
+
+
+def get_chroma_client(chroma_db_path: str = DEFAULT_CHROMA_DB_PATH) -> Any:
+    """Get or create the shared Chroma client for a persist directory."""
+    key = _normalize_path(chroma_db_path)
+    client = _clients.get(key)
+    if client is None:
+        with _store_lock:
+            client = _clients.get(key)
+            if client is None:
+                settings = Settings(
+                    chroma_db_impl="duckdb+parquet",
+                    persist_directory=chroma_db_path,
+                    anonymized_telemetry=False,
+                )
+                client = chromadb.Client(settings)
+                _clients[key] = client
+    return client
+
+
+def get_collection(
+    chroma_db_path: str = DEFAULT_CHROMA_DB_PATH,
+    name: str = COLLECTION_NAME,
+):
+    """Get or create the shared NG12 collection."""
+    key = (_normalize_path(chroma_db_path), name)
+    collection = _collections.get(key)
+    if collection is None:
+        client = get_chroma_client(chroma_db_path)
+        with _store_lock:
+            collection = _collections.get(key)
+            if collection is None:
+                collection = client.get_or_create_collection(
+                    name=name,
+                    metadata={"hnsw:space": "cosine"}
+                )
+                _collections[key] = collection
+    return collection
+
+
+def get_vector_backend(
+    chroma_db_path: str = DEFAULT_CHROMA_DB_PATH,
+    kind: str = None,
+):
+    """Get or create the shared vector backend for a store directory."""
+    from app.rag.backends import ChromaBackend, NumpyBackend
+
+    kind = kind or DEFAULT_VECTOR_BACKEND
+    key = (_normalize_path(chroma_db_path), kind)
+    backend = _backends.get(key)
+    if backend is None:
+        if kind == "chroma":
+            backend = ChromaBackend(get_collection(chroma_db_path))
+        elif kind == "numpy":
+            backend = NumpyBackend(str(Path(chroma_db_path) / "numpy"))
+        else:
+            raise ValueError(f"Unknown vector backend: {kind}")
+        with _store_lock:
+            backend = _backends.setdefault(key, backend)
+    return backend
+
+
+INDEX_VERSION_FILE = "index_version"
+_index_versions: Dict[str, Tuple[int, str]] = {}
+
+
+def get_index_version(chroma_db_path: str = DEFAULT_CHROMA_DB_PATH) -> str:
+    """
+    Current ingestion version stamp of the collection.
+    Written by the ingester after every upsert; readers only pay for a stat()
+    unless the stamp file changed.
+    """
+    stamp_path = Path(chroma_db_path) / INDEX_VERSION_FILE
+    try:
+        mtime = stamp_path.stat().st_mtime_ns
+    except OSError:
+        return "0"
+    cached = _index_versions.get(str(stamp_path))
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, stamp_path.read_text().strip() or "0")
+        _index_versions[str(stamp_path)] = cached
+    return cached[1]
+
+
+def bump_index_version(chroma_db_path: str = DEFAULT_CHROMA_DB_PATH) -> str:
+    """Write a new version stamp, invalidating cached results for the collection."""
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    stamp_path = Path(chroma_db_path) / INDEX_VERSION_FILE
+    stamp_path.parent.mkdir(parents=True, exist_ok=True)
+    stamp_path.write_text(version)
+    return version
+
+
+def is_model_loaded(model_name: str = EMBEDDING_MODEL_NAME) -> bool:
+    """Check whether the embedding model has already been loaded."""
+    return model_name in _models
+
+
+def reset_registry():
+    """Drop all shared handles (used by benchmarks to measure cold start)."""
+    with _model_lock, _store_lock:
+        _models.clear()
+        _backends.clear()
+        _collections.clear()
+        _clients.clear()
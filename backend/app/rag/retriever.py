@@ -1,72 +1,430 @@
-from typing import List, Dict, Any, Tuple
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
+from typing import List, Dict, Any, Optional, Tuple
 from app.schemas.models import Citation
+from app.cache import get_retrieval_cache
+from app.context import count_chunk_tokens
+from app.concurrency import get_single_flight, get_stage_limiter
+from app.rag.embedding_cache import get_embedding_cache, normalize_query
+from app.rag.lexical import BM25Index, get_lexical_index
+from app.rag.registry import (
+    DEFAULT_CHROMA_DB_PATH,
+    EMBEDDING_MODEL_NAME,
+    get_embedding_model,
+    get_index_version,
+    get_vector_backend,
+    is_model_loaded,
+)
 
 
 class RAGRetriever:
-    def __init__(self, chroma_db_path: str = "./vector_store"):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, chroma_db_path: str = DEFAULT_CHROMA_DB_PATH):
+        # Model and vector backend are process-wide; every retriever shares them.
+        # They are resolved on first use so constructing a retriever is cheap.
+        self.chroma_db_path = chroma_db_path
 
-        settings = Settings(
-            chroma_db_impl="duckdb+parquet",
-            persist_directory=chroma_db_path,
-            anonymized_telemetry=False,
-        )
-        self.client = chromadb.Client(settings)
-        self.collection = self.client.get_or_create_collection(
-            name="ng12_guidelines",
-            metadata={"hnsw:space": "cosine"}
+    @property
+    def model(self):
+        return get_embedding_model()
+
+    @property
+    def backend(self):
+        return get_vector_backend(self.chroma_db_path)
+
+    def _encode(self, query: str) -> List[float]:
+        return self.model.encode(query, convert_to_list=True)
+
+    def _embed(self, query: str) -> List[float]:
+        """Generate the embedding for a query, reusing cached vectors."""
+        return get_embedding_cache().get_or_compute(
+            query, self._encode, namespace=EMBEDDING_MODEL_NAME
         )
 
-    def retrieve(self, query: str, top_k: int = 5) -> Tuple[List[str], List[Citation]]:
-        """
-        Retrieve relevant chunks from vector store.
-        Returns: (texts, citations)
-        """
-        # Generate embedding for query
-        query_embedding = self.model.encode(query, convert_to_list=True)
-
-        # Query ChromaDB
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            include=["documents", "metadatas", "distances"]
+    def _encode_many(self, queries: List[str]) -> List[List[float]]:
+        return self.model.encode(queries, convert_to_list=True)
+
+    def _embed_many(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries with a single batched model call for the misses."""
+        return get_embedding_cache().get_or_compute_many(
+            queries, self._encode_many, namespace=EMBEDDING_MODEL_NAME
         )
 
+    @staticmethod
+    def section_filter(sections: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        """`where` filter restricting results to NG12 sections (e.g. ["1.1", "1.3"])."""
+        if not sections:
+            return None
+        return {"section_id": {"$in": sorted(set(sections))}}
+
+    def _search(
+        self, query_embedding: List[float], top_k: int, where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Query the vector backend with a precomputed embedding."""
+        return self._search_many([query_embedding], top_k, where)
+
+    def _search_many(
+        self, query_embeddings: List[List[float]], top_k: int, where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Query the vector backend with several embeddings in one call."""
+        return self.backend.query(list(query_embeddings), top_k, where=where)
+
+    def _to_citations(self, results: Dict[str, Any], index: int = 0) -> Tuple[List[str], List[Citation]]:
+        """Convert one query's backend result into texts and citations."""
         texts = []
         citations = []
 
-        if results['documents'] and len(results['documents']) > 0:
+        if results['documents'] and len(results['documents']) > index:
             for i, (doc, metadata, distance) in enumerate(
                 zip(
-                    results['documents'][0],
-                    results['metadatas'][0],
-                    results['distances'][0]
+                    results['documents'][index],
+                    results['metadatas'][index],
+                    results['distances'][index]
                 )
             ):
-                # Distance is 1 - cosine similarity in ChromaDB
+                # Distance is 1 - cosine similarity in every backend
                 similarity = 1 - distance
 
                 texts.append(doc)
+                citations.append(self._make_citation(doc, metadata))
 
-                citation = Citation(
-                    source="NG12 PDF",
-                    page=metadata.get("page", 0),
-                    chunk_id=metadata.get("chunk_id", "unknown"),
-                    excerpt=doc[:200] + "..." if len(doc) > 200 else doc
+        return texts, citations
+
+    @staticmethod
+    def _make_citation(doc: str, metadata: Dict[str, Any]) -> Citation:
+        return Citation(
+            source="NG12 PDF",
+            page=metadata.get("page", 0),
+            chunk_id=metadata.get("chunk_id", "unknown"),
+            excerpt=doc[:200] + "..." if len(doc) > 200 else doc,
+            section=metadata.get("section") or None,
+            recommendation=metadata.get("recommendation") or None,
+        )
+
+    def _cache_key(
+        self, query: str, top_k: int, sections: Optional[List[str]] = None
+    ) -> Tuple[str, str, int, Tuple[str, ...]]:
+        return (self.chroma_db_path, normalize_query(query), top_k, tuple(sorted(set(sections or ()))))
+
+    def retrieve(
+        self, query: str, top_k: int = 5, sections: Optional[List[str]] = None
+    ) -> Tuple[List[str], List[Citation]]:
+        """
+        Retrieve relevant chunks from vector store, optionally only from the
+        given NG12 sections. Results are cached until the collection is
+        re-ingested.
+        Returns: (texts, citations)
+        """
+        version = get_index_version(self.chroma_db_path)
+        key = self._cache_key(query, top_k, sections)
+        # Concurrent identical queries share one embedding and search
+        texts, citations = get_single_flight("retrieve").do(
+            (key, version), self._lookup, query, top_k, sections, key, version
+        )
+        return list(texts), list(citations)
+
+    def _lookup(
+        self, query: str, top_k: int, sections: Optional[List[str]], key: Tuple, version: str
+    ) -> Tuple[List[str], List[Citation]]:
+        cache = get_retrieval_cache()
+        group = key[2:]
+        cached = cache.get(key, version)
+        if cached is None:
+            query_embedding = self._embed(query)
+            cached = cache.get_similar(query_embedding, version, group=group)
+            if cached is None:
+                results = self._search(query_embedding, top_k, self.section_filter(sections))
+                cached = self._to_citations(results)
+                cache.put(key, cached, version, embedding=query_embedding, group=group)
+        return cached
+
+    async def retrieve_async(
+        self, query: str, top_k: int = 5, sections: Optional[List[str]] = None
+    ) -> Tuple[List[str], List[Citation]]:
+        """
+        Async variant of retrieve().
+        Embedding and search run in the bounded stage executor so the event
+        loop never blocks on the model or the vector store.
+        """
+        version = get_index_version(self.chroma_db_path)
+        key = self._cache_key(query, top_k, sections)
+        texts, citations = await get_single_flight("retrieve").do_async(
+            (key, version), self._lookup_async, query, top_k, sections, key, version
+        )
+        return list(texts), list(citations)
+
+    async def _lookup_async(
+        self, query: str, top_k: int, sections: Optional[List[str]], key: Tuple, version: str
+    ) -> Tuple[List[str], List[Citation]]:
+        cache = get_retrieval_cache()
+        group = key[2:]
+        cached = cache.get(key, version)
+        if cached is None:
+            limiter = get_stage_limiter()
+            query_embedding = await limiter.run("embed", self._embed, query)
+            cached = cache.get_similar(query_embedding, version, group=group)
+            if cached is None:
+                results = await limiter.run(
+                    "search", self._search, query_embedding, top_k, self.section_filter(sections)
                 )
-                citations.append(citation)
+                cached = self._to_citations(results)
+                cache.put(key, cached, version, embedding=query_embedding, group=group)
+        return cached
+
+    async def retrieve_many_async(
+        self, queries: List[str], top_k: int = 5, sections: Optional[List[str]] = None
+    ) -> List[Tuple[List[str], List[Citation]]]:
+        """
+        Retrieve for several queries at once.
+        Cached queries are answered directly; the rest share one batched
+        encode call and one multi-query vector backend lookup.
+        """
+        cache = get_retrieval_cache()
+        version = get_index_version(self.chroma_db_path)
+        keys = [self._cache_key(query, top_k, sections) for query in queries]
+        results: List[Any] = [cache.get(key, version) for key in keys]
+
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            limiter = get_stage_limiter()
+            embeddings = await limiter.run(
+                "embed", self._embed_many, [queries[i] for i in missing]
+            )
+            raw = await limiter.run(
+                "search", self._search_many, list(embeddings), top_k, self.section_filter(sections)
+            )
+            for n, (i, embedding) in enumerate(zip(missing, embeddings)):
+                results[i] = self._to_citations(raw, index=n)
+                cache.put(keys[i], results[i], version, embedding=embedding, group=keys[i][2:])
+
+        return [(list(texts), list(citations)) for texts, citations in results]
 
+    def _fuse_queries(
+        self,
+        results: Dict[str, Any],
+        indices: List[int],
+        top_k: int,
+        rrf_k: int,
+        max_tokens: Optional[int],
+    ) -> Tuple[List[str], List[Citation]]:
+        """
+        Reciprocal rank fusion of several sub-query rankings from one backend
+        result, de-duplicated by chunk ID and cut to a token budget.
+        """
+        scores: Dict[str, float] = {}
+        docs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for index in indices:
+            for rank, (chunk_id, doc, metadata) in enumerate(zip(
+                results['ids'][index], results['documents'][index], results['metadatas'][index]
+            )):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+                docs.setdefault(chunk_id, (doc, metadata))
+
+        texts, citations = [], []
+        used = 0
+        for chunk_id in sorted(scores, key=scores.get, reverse=True)[:top_k]:
+            doc, metadata = docs[chunk_id]
+            tokens = count_chunk_tokens(doc)
+            if max_tokens is not None and texts and used + tokens > max_tokens:
+                break
+            used += tokens
+            texts.append(doc)
+            citations.append(self._make_citation(doc, metadata))
         return texts, citations
 
+    async def retrieve_multi_many_async(
+        self,
+        query_groups: List[List[str]],
+        top_k: int = 5,
+        per_query_k: int = 3,
+        sections: Optional[List[str]] = None,
+        rrf_k: int = 60,
+        max_tokens: Optional[int] = None,
+    ) -> List[Tuple[List[str], List[Citation]]]:
+        """
+        Multi-query retrieval for several groups of sub-queries (e.g. one
+        group of per-symptom queries per patient). Every uncached sub-query
+        across all groups shares one batched encode and one multi-query
+        backend lookup; each group's rankings are then fused with RRF,
+        de-duplicated, and cut to `max_tokens` of context.
+        """
+        cache = get_retrieval_cache()
+        version = get_index_version(self.chroma_db_path)
+        keys = [
+            ("multi", per_query_k, rrf_k, max_tokens)
+            + self._cache_key("\n".join(sorted(set(normalize_query(q) for q in queries))), top_k, sections)
+            for queries in query_groups
+        ]
+        results: List[Any] = [cache.get(key, version) for key in keys]
+
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            # Flatten the distinct sub-queries of every missing group
+            positions: Dict[str, int] = {}
+            for i in missing:
+                for query in query_groups[i]:
+                    positions.setdefault(query, len(positions))
+            flat = list(positions)
+
+            limiter = get_stage_limiter()
+            embeddings = await limiter.run("embed", self._embed_many, flat)
+            raw = await limiter.run(
+                "search", self._search_many, list(embeddings), per_query_k, self.section_filter(sections)
+            )
+            for i in missing:
+                indices = [positions[query] for query in dict.fromkeys(query_groups[i])]
+                results[i] = self._fuse_queries(raw, indices, top_k, rrf_k, max_tokens)
+                cache.put(keys[i], results[i], version)
+
+        return [(list(texts), list(citations)) for texts, citations in results]
+
+    async def retrieve_multi_async(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        per_query_k: int = 3,
+        sections: Optional[List[str]] = None,
+        rrf_k: int = 60,
+        max_tokens: Optional[int] = None,
+    ) -> Tuple[List[str], List[Citation]]:
+        """Multi-query retrieval for one set of sub-queries (see retrieve_multi_many_async)."""
+        results = await self.retrieve_multi_many_async(
+            [queries], top_k, per_query_k, sections, rrf_k, max_tokens
+        )
+        return results[0]
+
+    def retrieve_multi(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        per_query_k: int = 3,
+        sections: Optional[List[str]] = None,
+        rrf_k: int = 60,
+        max_tokens: Optional[int] = None,
+    ) -> Tuple[List[str], List[Citation]]:
+        """Sync variant of retrieve_multi_async(): one batched encode, one backend query."""
+        cache = get_retrieval_cache()
+        version = get_index_version(self.chroma_db_path)
+        key = ("multi", per_query_k, rrf_k, max_tokens) + self._cache_key(
+            "\n".join(sorted(set(normalize_query(q) for q in queries))), top_k, sections
+        )
+
+        cached = cache.get(key, version)
+        if cached is None:
+            unique = list(dict.fromkeys(queries))
+            raw = self._search_many(self._embed_many(unique), per_query_k, self.section_filter(sections))
+            cached = self._fuse_queries(raw, list(range(len(unique))), top_k, rrf_k, max_tokens)
+            cache.put(key, cached, version)
+
+        texts, citations = cached
+        return list(texts), list(citations)
+
+    def _fuse(
+        self,
+        dense_results: Optional[Dict[str, Any]],
+        lexical_hits: List[Tuple[int, float]],
+        index: Optional[BM25Index],
+        top_k: int,
+        dense_weight: float,
+        lexical_weight: float,
+        rrf_k: int,
+    ) -> Tuple[List[str], List[Citation]]:
+        """Weighted reciprocal rank fusion of dense and lexical rankings."""
+        scores: Dict[str, float] = {}
+        docs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+        if dense_results and dense_results['ids']:
+            for rank, (chunk_id, doc, metadata) in enumerate(zip(
+                dense_results['ids'][0],
+                dense_results['documents'][0],
+                dense_results['metadatas'][0],
+            )):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + dense_weight / (rrf_k + rank + 1)
+                docs[chunk_id] = (doc, metadata)
+
+        for rank, (doc_idx, _) in enumerate(lexical_hits):
+            chunk_id = index.ids[doc_idx]
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + lexical_weight / (rrf_k + rank + 1)
+            docs.setdefault(chunk_id, (index.texts[doc_idx], index.metadatas[doc_idx]))
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        texts = [docs[chunk_id][0] for chunk_id in ranked]
+        citations = [self._make_citation(*docs[chunk_id]) for chunk_id in ranked]
+        return texts, citations
+
+    def _hybrid_plan(self, dense_weight: float, lexical_weight: float):
+        """Decide which rankers to run; lexical-only while the embedding model is cold."""
+        index = get_lexical_index(self.chroma_db_path)
+        use_lexical = index is not None and len(index) > 0 and lexical_weight > 0
+        use_dense = dense_weight > 0 and (is_model_loaded() or not use_lexical)
+        return index, use_dense, use_lexical
+
+    def retrieve_hybrid(
+        self,
+        query: str,
+        top_k: int = 5,
+        dense_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+        rrf_k: int = 60,
+        sections: Optional[List[str]] = None,
+    ) -> Tuple[List[str], List[Citation]]:
+        """
+        Hybrid retrieval: BM25 over the chunk index fused with dense results.
+        Exact clinical terms and thresholds that MiniLM misses are picked up
+        lexically. `sections` restricts both rankers to those NG12 sections.
+        Before the embedding model has loaded, this answers from the lexical
+        index alone.
+        """
+        cache = get_retrieval_cache()
+        version = get_index_version(self.chroma_db_path)
+        index, use_dense, use_lexical = self._hybrid_plan(dense_weight, lexical_weight)
+        key = ("hybrid", use_dense, dense_weight, lexical_weight, rrf_k) + self._cache_key(query, top_k, sections)
+        where = self.section_filter(sections)
+
+        cached = cache.get(key, version)
+        if cached is None:
+            pool = top_k * 3
+            dense_results = self._search(self._embed(query), pool, where) if use_dense else None
+            lexical_hits = index.search(query, pool, where) if use_lexical else []
+            cached = self._fuse(dense_results, lexical_hits, index, top_k, dense_weight, lexical_weight, rrf_k)
+            cache.put(key, cached, version)
+
+        texts, citations = cached
+        return list(texts), list(citations)
+
+    async def retrieve_hybrid_async(
+        self,
+        query: str,
+        top_k: int = 5,
+        dense_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+        rrf_k: int = 60,
+        sections: Optional[List[str]] = None,
+    ) -> Tuple[List[str], List[Citation]]:
+        """Async variant of retrieve_hybrid()."""
+        cache = get_retrieval_cache()
+        version = get_index_version(self.chroma_db_path)
+        index, use_dense, use_lexical = self._hybrid_plan(dense_weight, lexical_weight)
+        key = ("hybrid", use_dense, dense_weight, lexical_weight, rrf_k) + self._cache_key(query, top_k, sections)
+        where = self.section_filter(sections)
+
+        cached = cache.get(key, version)
+        if cached is None:
+            limiter = get_stage_limiter()
+            pool = top_k * 3
+            dense_results = None
+            if use_dense:
+                query_embedding = await limiter.run("embed", self._embed, query)
+                dense_results = await limiter.run("search", self._search, query_embedding, pool, where)
+            lexical_hits = await limiter.run("search", index.search, query, pool, where) if use_lexical else []
+            cached = self._fuse(dense_results, lexical_hits, index, top_k, dense_weight, lexical_weight, rrf_k)
+            cache.put(key, cached, version)
+
+        texts, citations = cached
+        return list(texts), list(citations)
+
     def retrieve_with_query_expansion(
         self, query: str, top_k: int = 5
     ) -> Tuple[List[str], List[Citation]]:
         """
-        Retrieve with simple query expansion.
-        This can be enhanced later.
+        Retrieve with lexical expansion.
+        Exact-term matches from the BM25 index are fused with dense results.
         """
-        # For now, just use basic retrieval
-        return self.retrieve(query, top_k)
+        return self.retrieve_hybrid(query, top_k)
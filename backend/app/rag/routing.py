@@ -0,0 +1,173 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.rag.lexical import tokenize
+from app.rag.registry import DEFAULT_CHROMA_DB_PATH
+
+
+ROUTING_INDEX_FILE = "routing_index.json"
+
+# NG12 symptom and cancer-site concepts with the surface forms used in the
+# guideline and in patient records. Forms go through the lexical tokenizer,
+# so British/American spellings (haemoptysis/hemoptysis) match each other.
+NG12_VOCABULARY: Dict[str, List[str]] = {
+    # Symptoms and signs
+    "haemoptysis": ["haemoptysis", "coughing up blood"],
+    "cough": ["cough"],
+    "chest pain": ["chest pain", "chest wall pain"],
+    "dyspnoea": ["dyspnoea", "shortness of breath", "breathlessness", "difficulty breathing", "breathing difficulty"],
+    "chest infection": ["chest infection", "pneumonia"],
+    "finger clubbing": ["finger clubbing", "clubbing"],
+    "lymphadenopathy": ["lymphadenopathy", "swollen lymph", "neck lump"],
+    "hoarseness": ["hoarseness", "hoarse voice"],
+    "stridor": ["stridor"],
+    "dysphagia": ["dysphagia", "difficulty swallowing"],
+    "dyspepsia": ["dyspepsia", "indigestion", "reflux"],
+    "nausea or vomiting": ["nausea", "vomiting"],
+    "weight loss": ["weight loss", "losing weight"],
+    "appetite loss": ["appetite loss", "loss of appetite"],
+    "fatigue": ["fatigue", "tiredness"],
+    "night sweats": ["night sweats", "sweating"],
+    "fever": ["fever"],
+    "abdominal pain": ["abdominal pain"],
+    "abdominal mass": ["abdominal mass"],
+    "bloating": ["bloating", "abdominal distension"],
+    "change in bowel habit": ["change in bowel habit", "bowel habit"],
+    "rectal bleeding": ["rectal bleeding"],
+    "anaemia": ["anaemia", "iron-deficiency"],
+    "jaundice": ["jaundice"],
+    "haematuria": ["haematuria", "blood in urine"],
+    "breast lump": ["breast lump", "breast mass"],
+    "nipple changes": ["nipple"],
+    "postmenopausal bleeding": ["postmenopausal bleeding"],
+    "bone pain": ["bone pain", "back pain"],
+    "fracture": ["fracture"],
+    "thrombocytosis": ["thrombocytosis", "raised platelet"],
+    "headache": ["headache"],
+    "sore throat": ["sore throat"],
+    "mouth ulcer": ["mouth ulcer", "oral ulceration"],
+    "skin lesion": ["pigmented skin lesion", "mole", "skin lesion"],
+    "bruising or bleeding": ["bruising", "bleeding gums"],
+    # Cancer sites
+    "lung cancer": ["lung cancer", "lung"],
+    "mesothelioma": ["mesothelioma", "asbestos"],
+    "oesophageal cancer": ["oesophageal cancer", "oesophageal"],
+    "stomach cancer": ["stomach cancer", "gastric"],
+    "pancreatic cancer": ["pancreatic cancer", "pancreatic"],
+    "colorectal cancer": ["colorectal cancer", "colorectal", "bowel cancer"],
+    "breast cancer": ["breast cancer"],
+    "ovarian cancer": ["ovarian cancer", "ovarian"],
+    "endometrial cancer": ["endometrial cancer", "endometrial"],
+    "cervical cancer": ["cervical cancer"],
+    "prostate cancer": ["prostate cancer", "prostate"],
+    "bladder cancer": ["bladder cancer", "bladder"],
+    "renal cancer": ["renal cancer", "kidney cancer"],
+    "laryngeal cancer": ["laryngeal cancer", "laryngeal"],
+    "oral cancer": ["oral cancer"],
+    "thyroid cancer": ["thyroid cancer", "thyroid"],
+    "brain tumour": ["brain tumour", "central nervous system"],
+    "leukaemia": ["leukaemia"],
+    "myeloma": ["myeloma"],
+    "lymphoma": ["lymphoma"],
+    "melanoma": ["melanoma"],
+    "sarcoma": ["sarcoma"],
+}
+
+
+def phrase(text: str) -> str:
+    """Token string padded with spaces, for whole-token phrase matching."""
+    return f" {' '.join(tokenize(text))} "
+
+
+_FORMS: List[Tuple[str, str]] = [
+    (concept, phrase(form))
+    for concept, forms in NG12_VOCABULARY.items()
+    for form in forms
+    if tokenize(form)
+]
+
+
+def match_concepts(text: str) -> List[str]:
+    """NG12 concepts mentioned in a piece of text, in vocabulary order."""
+    padded = phrase(text)
+    return list(dict.fromkeys(concept for concept, form in _FORMS if form in padded))
+
+
+class RoutingIndex:
+    """
+    Precomputed map from NG12 symptom/cancer-site concepts to the chunks and
+    sections that mention them. Built at ingestion time; at assessment time
+    it turns a patient's symptoms into a section filter so the vector search
+    only scores chunks that can be relevant.
+    """
+
+    def __init__(self):
+        # concept -> {"chunks": [chunk_id, ...], "sections": {section_id: mentions}}
+        self.concepts: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def build(
+        cls, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]
+    ) -> "RoutingIndex":
+        index = cls()
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            section_id = metadata.get("section_id")
+            for concept in match_concepts(text):
+                entry = index.concepts.setdefault(concept, {"chunks": [], "sections": {}})
+                entry["chunks"].append(chunk_id)
+                if section_id:
+                    entry["sections"][section_id] = entry["sections"].get(section_id, 0) + 1
+        return index
+
+    def route(self, phrases: List[str]) -> List[str]:
+        """
+        Sections mentioning any concept found in `phrases` (e.g. a patient's
+        symptoms). Empty when nothing matches, meaning "don't filter".
+        """
+        sections = set()
+        for text in phrases:
+            for concept in match_concepts(text):
+                sections.update(self.concepts.get(concept, {}).get("sections", {}))
+        return sorted(sections)
+
+    def save(self, path: str):
+        tmp_path = Path(f"{path}.tmp")
+        tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps({"concepts": self.concepts}, separators=(",", ":")))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str) -> "RoutingIndex":
+        index = cls()
+        index.concepts = json.loads(Path(path).read_text())["concepts"]
+        return index
+
+
+# Loaded indexes, keyed by file path and reloaded when the file changes
+_lock = threading.Lock()
+_indexes: Dict[str, Tuple[int, RoutingIndex]] = {}
+
+
+def routing_index_path(chroma_db_path: str = DEFAULT_CHROMA_DB_PATH) -> Path:
+    return Path(chroma_db_path) / ROUTING_INDEX_FILE
+
+
+def get_routing_index(chroma_db_path: str = DEFAULT_CHROMA_DB_PATH) -> Optional[RoutingIndex]:
+    """Get the persisted routing index for a vector store, or None if not built yet."""
+    path = routing_index_path(chroma_db_path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    key = str(path.resolve())
+    cached = _indexes.get(key)
+    if cached is None or cached[0] != mtime:
+        with _lock:
+            cached = _indexes.get(key)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, RoutingIndex.load(str(path)))
+                _indexes[key] = cached
+    return cached[1]
@@ -4,6 +4,8 @@ __all__ = [
     "Citation",
     "AssessmentRequest",
     "AssessmentResponse",
+    "BatchAssessmentRequest",
+    "BatchAssessmentItem",
     "PatientData",
     "ChatMessage",
     "ChatRequest",
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Literal, Union
 
 
 class Citation(BaseModel):
@@ -7,10 +7,14 @@ class Citation(BaseModel):
     page: int
     chunk_id: str
     excerpt: str
+    section: Optional[str] = None
+    recommendation: Optional[str] = None
 
 
 class AssessmentRequest(BaseModel):
     patient_id: str
+    # Skip the assessment and LLM response caches for this request
+    bypass_cache: bool = False
 
 
 class AssessmentResponse(BaseModel):
@@ -21,6 +25,29 @@ class AssessmentResponse(BaseModel):
     recommendation: str
     reasoning: str
     citations: List[Citation]
+    # How the recommendation was produced: "rules" (rule table alone),
+    # "llm_with_prior" (LLM given the rule result), "llm",
+    # "llm_unparsed" (LLM output unreadable, fallback recommendation used) or
+    # "llm_unavailable" (LLM down; rule result or escalation, not cached)
+    decision_path: Optional[str] = None
+    triage_rule: Optional[str] = None
+    rules_version: Optional[str] = None
+
+
+# Upper bound on a batch's concurrent assessments (the LLM stage limit's default)
+BATCH_MAX_CONCURRENCY = 64
+
+
+class BatchAssessmentRequest(BaseModel):
+    patient_ids: Union[List[str], Literal["all"]] = "all"
+    concurrency: int = Field(8, ge=1, le=BATCH_MAX_CONCURRENCY)
+    bypass_cache: bool = False
+
+
+class BatchAssessmentItem(BaseModel):
+    patient_id: str
+    assessment: Optional[AssessmentResponse] = None
+    error: Optional[str] = None
 
 
 class PatientData(BaseModel):
@@ -42,12 +69,29 @@ class ChatRequest(BaseModel):
     session_id: str
     message: str
     top_k: int = 5
+    retrieval_mode: Literal["dense", "hybrid"] = "dense"
+    dense_weight: float = 1.0
+    lexical_weight: float = 1.0
+    # Restrict retrieval to NG12 sections, e.g. ["1.1", "1.3"]
+    sections: Optional[List[str]] = None
+    # Skip the LLM response cache for this message
+    bypass_cache: bool = False
+
+    def retrieval_options(self) -> Dict[str, Any]:
+        return {
+            "retrieval_mode": self.retrieval_mode,
+            "dense_weight": self.dense_weight,
+            "lexical_weight": self.lexical_weight,
+            "sections": self.sections,
+        }
 
 
 class ChatResponse(BaseModel):
     session_id: str
     answer: str
     citations: List[Citation]
+    # True when the LLM was unavailable and the answer only lists retrieved guidance
+    degraded: bool = False
 
 
 class ChatHistoryResponse(BaseModel):
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.rag.lexical import get_lexical_index
+from app.rag.registry import get_embedding_model, get_vector_backend
+from app.rag.routing import get_routing_index
+from app.tools.patient_tool import get_patient_store
+
+
+def _warm_embedding_model():
+    model = get_embedding_model()
+    # First encode pays for tokenizer and graph initialisation
+    model.encode("warm-up", convert_to_list=True)
+
+
+def _warm_vector_store():
+    get_vector_backend().count()
+
+
+def _warm_lexical_index():
+    # Optional: absent until the first ingestion that builds it
+    get_lexical_index()
+
+
+def _warm_routing_index():
+    # Optional, like the lexical index
+    get_routing_index()
+
+
+def _warm_patient_store():
+    get_patient_store()
+
+
+class WarmupState:
+    """Tracks background warm-up of the heavy application components."""
+
+    def __init__(self, components: Dict[str, Callable[[], Any]] = None):
+        self.warmers = components or {
+            "embedding_model": _warm_embedding_model,
+            "vector_store": _warm_vector_store,
+            "lexical_index": _warm_lexical_index,
+            "routing_index": _warm_routing_index,
+            "patient_store": _warm_patient_store,
+        }
+        self.components: Dict[str, Dict[str, Any]] = {
+            name: {"status": "pending", "seconds": None, "error": None}
+            for name in self.warmers
+        }
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    async def _warm(self, name: str, warmer: Callable[[], Any]):
+        component = self.components[name]
+        component["status"] = "warming"
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(warmer)
+            component["status"] = "ready"
+        except Exception as e:
+            component["status"] = "failed"
+            component["error"] = str(e)
+            print(f"Warm-up failed for {name}: {e}")
+        component["seconds"] = round(time.perf_counter() - start, 3)
+
+    async def run(self):
+        """Warm every component concurrently in worker threads."""
+        self.started_at = time.time()
+        await asyncio.gather(
+            *(self._warm(name, warmer) for name, warmer in self.warmers.items())
+        )
+        self.finished_at = time.time()
+
+    @property
+    def is_ready(self) -> bool:
+        return all(c["status"] == "ready" for c in self.components.values())
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.is_ready else "starting",
+            "components": self.components,
+            "total_seconds": (
+                round(self.finished_at - self.started_at, 3)
+                if self.finished_at is not None else None
+            ),
+        }
+
+
+# Global warm-up state
+_state: WarmupState = None
+
+
+def get_warmup_state() -> WarmupState:
+    """Get or create warm-up state."""
+    global _state
+    if _state is None:
+        _state = WarmupState()
+    return _state
@@ -1,3 +1,3 @@
-from .patient_tool import PatientDataStore, get_patient_store, get_patient_data
+from .patient_tool import PatientDataStore, get_patient_store, get_patient_data, patient_payload
 
-__all__ = ["PatientDataStore", "get_patient_store", "get_patient_data"]
+__all__ = ["PatientDataStore", "get_patient_store", "get_patient_data", "patient_payload"]
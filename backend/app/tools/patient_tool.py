@@ -1,44 +1,306 @@
+import hashlib
 import json
+import logging
+import os
+import re
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
 from app.schemas.models import PatientData
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATIENT_DATA_PATH = os.getenv("PATIENT_DATA_PATH", "./app/data/patients.json")
+# Minimum seconds between checks of the data file's mtime (0 = every access)
+PATIENT_RELOAD_INTERVAL = float(os.getenv("PATIENT_RELOAD_INTERVAL", "2"))
+# Width in years of the age bands used for filtering
+AGE_BAND_WIDTH = int(os.getenv("PATIENT_AGE_BAND_WIDTH", "10"))
+
+_READ_SIZE = 1 << 16
+_WHITESPACE_RE = re.compile(r"\s*")
+_SEPARATOR_RE = re.compile(r"[\s,]*")
+
+
+def age_band(age: int, width: int = AGE_BAND_WIDTH) -> str:
+    """Age band label, e.g. 55 -> "50-59"."""
+    low = age // width * width
+    return f"{low}-{low + width - 1}"
+
+
+def normalize_symptom(symptom: str) -> str:
+    return " ".join(symptom.lower().split())
+
+
+def iter_json_array(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer, pos, eof = "", 0, False
+
+        def fill():
+            # Keep at least one read's worth of text ahead of `pos`
+            nonlocal buffer, pos, eof
+            more = f.read(_READ_SIZE)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+
+        def skip(pattern):
+            nonlocal pos
+            while True:
+                pos = pattern.match(buffer, pos).end()
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+
+        fill()
+        skip(_WHITESPACE_RE)
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"Expected a JSON array in {path}")
+        pos += 1
+        while True:
+            skip(_SEPARATOR_RE)
+            if buffer[pos:pos + 1] == "]":
+                return
+            if len(buffer) - pos < _READ_SIZE and not eof:
+                fill()
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Record spans the read boundary: read more and retry
+                if eof:
+                    raise
+                fill()
+                continue
+            yield record
+
+
+def iter_json_lines(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield one object per non-empty line of a JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_patient_records(path: Path) -> Iterator[Dict[str, Any]]:
+    if path.suffix in (".jsonl", ".ndjson"):
+        return iter_json_lines(path)
+    return iter_json_array(path)
+
+
+class _Snapshot:
+    """One load of the data file: raw records plus the indexes built from them."""
+
+    def __init__(self, mtime_ns: int):
+        self.mtime_ns = mtime_ns
+        self.raw: Dict[str, Dict[str, Any]] = {}
+        self.validated: Dict[str, PatientData] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.summaries: Dict[str, Dict[str, Any]] = {}
+        self.by_symptom: Dict[str, Set[str]] = {}
+        self.by_age_band: Dict[str, Set[str]] = {}
+
 
 class PatientDataStore:
-    def __init__(self, data_path: str = "./app/data/patients.json"):
+    """
+    Patient records streamed from a JSON array or JSONL file.
+
+    Loading only parses records and builds the symptom and age-band indexes;
+    each record is validated into `PatientData` the first time it is read.
+    The file's mtime is checked at most every `reload_interval` seconds and
+    a changed file is reloaded in a background thread, so fingerprints (and
+    the assessment cache entries keyed on them) follow edits without a
+    restart. Requests keep reading the previous snapshot until the new one
+    is swapped in.
+    """
+
+    def __init__(
+        self,
+        data_path: str = DEFAULT_PATIENT_DATA_PATH,
+        reload_interval: float = PATIENT_RELOAD_INTERVAL,
+    ):
         self.data_path = Path(data_path)
-        self.patients: Dict[str, PatientData] = {}
-        self._load_patients()
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self._reloader: Optional[threading.Thread] = None
+        self._checked_at = time.monotonic()
+        self._snapshot = self._load_patients()
 
-    def _load_patients(self):
-        """Load patient data from JSON file."""
-        if not self.data_path.exists():
+    def _mtime_ns(self) -> int:
+        try:
+            return self.data_path.stat().st_mtime_ns
+        except OSError:
             raise FileNotFoundError(f"Patient data file not found: {self.data_path}")
 
-        with open(self.data_path) as f:
-            data = json.load(f)
+    def _load_patients(self) -> _Snapshot:
+        """Load patient data from the JSON/JSONL file."""
+        snapshot = _Snapshot(self._mtime_ns())
+        for record in iter_patient_records(self.data_path):
+            patient_id = record.get("patient_id")
+            if not isinstance(patient_id, str):
+                raise ValueError(f"Patient record without a patient_id in {self.data_path}")
+            snapshot.raw[patient_id] = record
+        # Index after de-duplication so a repeated ID (last one wins) isn't indexed twice
+        normalized: Dict[str, str] = {}
+        for patient_id, record in snapshot.raw.items():
+            symptoms = record.get("symptoms") or []
+            age = record.get("age")
+            snapshot.summaries[patient_id] = {
+                "patient_id": patient_id,
+                "name": record.get("name"),
+                "age": age,
+                "symptoms": symptoms,
+            }
+            for symptom in symptoms:
+                key = normalized.get(symptom)
+                if key is None:
+                    key = normalized[symptom] = normalize_symptom(symptom)
+                snapshot.by_symptom.setdefault(key, set()).add(patient_id)
+            if isinstance(age, int):
+                snapshot.by_age_band.setdefault(age_band(age), set()).add(patient_id)
+        return snapshot
+
+    def _current(self) -> _Snapshot:
+        """The loaded snapshot; starts a background reload if the file changed."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            try:
+                changed = self._mtime_ns() != self._snapshot.mtime_ns
+            except FileNotFoundError:
+                # Keep serving the last good load while the file is being replaced
+                changed = False
+            # Held until the reload finishes, so at most one runs at a time
+            if changed and self._reload_lock.acquire(blocking=False):
+                self._reloader = threading.Thread(target=self._reload, name="patient-reload", daemon=True)
+                self._reloader.start()
+        return self._snapshot
 
-        for patient_dict in data:
-            patient = PatientData(**patient_dict)
-            self.patients[patient.patient_id] = patient
+    def _reload(self):
+        try:
+            if self._mtime_ns() != self._snapshot.mtime_ns:
+                self._snapshot = self._load_patients()
+                self.reloads += 1
+        except Exception:
+            # Keep the last good load; the next mtime check retries
+            logger.exception("Reloading patient data from %s failed", self.data_path)
+        finally:
+            self._reload_lock.release()
+
+    def wait_for_reload(self, timeout: Optional[float] = None) -> bool:
+        """Block until a background reload (if any) finishes; False on timeout."""
+        reloader = self._reloader
+        if reloader is None:
+            return True
+        reloader.join(timeout)
+        return not reloader.is_alive()
+
+    @staticmethod
+    def _validated(snapshot: _Snapshot, patient_id: str) -> PatientData:
+        patient = snapshot.validated.get(patient_id)
+        if patient is None:
+            patient = snapshot.validated[patient_id] = PatientData(**snapshot.raw[patient_id])
+        return patient
 
     def get_patient(self, patient_id: str) -> PatientData:
         """Get patient data by ID."""
-        if patient_id not in self.patients:
+        snapshot = self._current()
+        if patient_id not in snapshot.raw:
             raise ValueError(f"Patient not found: {patient_id}")
-        return self.patients[patient_id]
-
-    def list_patients(self) -> list[Dict[str, Any]]:
-        """List all patients."""
-        return [
-            {
-                "patient_id": p.patient_id,
-                "name": p.name,
-                "age": p.age,
-                "symptoms": p.symptoms,
-            }
-            for p in self.patients.values()
-        ]
+        return self._validated(snapshot, patient_id)
+
+    def get_many(self, patient_ids: Sequence[str]) -> Dict[str, PatientData]:
+        """Get several patients at once; unknown IDs are left out."""
+        snapshot = self._current()
+        return {
+            patient_id: self._validated(snapshot, patient_id)
+            for patient_id in patient_ids
+            if patient_id in snapshot.raw
+        }
+
+    def get_fingerprint(self, patient_id: str) -> str:
+        """Content hash of a patient record; changes whenever the record does."""
+        snapshot = self._current()
+        fingerprint = snapshot.fingerprints.get(patient_id)
+        if fingerprint is None:
+            if patient_id not in snapshot.raw:
+                raise ValueError(f"Patient not found: {patient_id}")
+            fingerprint = snapshot.fingerprints[patient_id] = hashlib.sha1(
+                self._validated(snapshot, patient_id).model_dump_json().encode()
+            ).hexdigest()
+        return fingerprint
+
+    def patient_ids(self) -> List[str]:
+        """All patient IDs in file order."""
+        return list(self._current().raw)
+
+    def count(self) -> int:
+        return len(self._current().raw)
+
+    def filter_ids(
+        self,
+        symptom: Optional[str] = None,
+        age_band: Optional[str] = None,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Patient IDs matching every given filter, in file order. `symptom`
+        matches any recorded symptom containing it (case-insensitive).
+        """
+        snapshot = self._current()
+        candidates: Optional[Set[str]] = None
+        if symptom:
+            wanted = normalize_symptom(symptom)
+            candidates = set()
+            for key, ids in snapshot.by_symptom.items():
+                if wanted in key:
+                    candidates |= ids
+        if age_band:
+            ids = snapshot.by_age_band.get(age_band, set())
+            candidates = ids if candidates is None else candidates & ids
+        if candidates is None and min_age is None and max_age is None:
+            return list(snapshot.raw)
+
+        result = []
+        for patient_id in snapshot.raw:
+            if candidates is not None and patient_id not in candidates:
+                continue
+            age = snapshot.summaries[patient_id]["age"]
+            if min_age is not None and (not isinstance(age, int) or age < min_age):
+                continue
+            if max_age is not None and (not isinstance(age, int) or age > max_age):
+                continue
+            result.append(patient_id)
+        return result
+
+    def list_patients(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        **filters,
+    ) -> list[Dict[str, Any]]:
+        """List patient summaries, optionally filtered and paginated."""
+        ids = self.filter_ids(**filters)
+        end = None if limit is None else offset + limit
+        return self.summaries(ids[offset:end])
+
+    def summaries(self, patient_ids: Sequence[str]) -> list[Dict[str, Any]]:
+        """Prebuilt summaries (ID, name, age, symptoms) of known patients."""
+        summaries = self._current().summaries
+        return [summaries[patient_id] for patient_id in patient_ids if patient_id in summaries]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._current()
+        return {
+            "patients": len(snapshot.raw),
+            "validated": len(snapshot.validated),
+            "symptoms_indexed": len(snapshot.by_symptom),
+            "age_bands": sorted(snapshot.by_age_band),
+            "reloads": self.reloads,
+        }
 
 
 # Global store instance
@@ -58,8 +320,11 @@ def get_patient_data(patient_id: str) -> Dict[str, Any]:
     Tool function for agents to call.
     Returns patient data in a format suitable for Groq function calling.
     """
-    store = get_patient_store()
-    patient = store.get_patient(patient_id)
+    return patient_payload(get_patient_store().get_patient(patient_id))
+
+
+def patient_payload(patient: PatientData) -> Dict[str, Any]:
+    """Tool-call representation of a patient record."""
     return {
         "patient_id": patient.patient_id,
         "name": patient.name,
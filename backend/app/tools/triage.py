@@ -0,0 +1,157 @@
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from app.rag.routing import NG12_VOCABULARY, match_concepts, phrase
+
+
+DEFAULT_RULES_PATH = os.getenv("NG12_RULES_PATH", "./app/data/ng12_rules.json")
+
+_CONDITIONS = ("any_symptoms", "all_symptoms", "any_phrases", "any_risk_factors", "min_age", "max_age")
+
+
+@lru_cache(maxsize=4096)
+def _symptom_concepts(symptom: str) -> FrozenSet[str]:
+    return frozenset(match_concepts(symptom))
+
+
+@lru_cache(maxsize=4096)
+def _symptom_phrase(symptom: str) -> str:
+    return phrase(symptom)
+
+
+class TriageResult:
+    """Outcome of the rule pre-triage for one patient."""
+
+    def __init__(self, rule: "_Rule", version: str):
+        self.rule_id = rule.id
+        self.recommendation = rule.recommendation
+        self.definitive = rule.definitive
+        self.section = rule.section
+        self.rationale = rule.rationale
+        self.version = version
+
+    def describe(self) -> str:
+        section = f", NG12 section {self.section}" if self.section else ""
+        return f"{self.rationale} (rule {self.rule_id}{section}; rule table v{self.version})"
+
+
+class _Rule:
+    __slots__ = (
+        "id", "recommendation", "definitive", "section", "rationale", "rank",
+        "any_symptoms", "all_symptoms", "any_phrases", "any_risk_factors", "min_age", "max_age",
+    )
+
+    def __init__(self, spec: Dict[str, Any], rank: int):
+        self.id = spec["id"]
+        self.recommendation = spec["recommendation"]
+        self.definitive = bool(spec.get("definitive", False))
+        self.section = spec.get("section")
+        self.rationale = spec.get("rationale", "")
+        self.rank = rank
+        self.any_symptoms = frozenset(spec.get("any_symptoms", ()))
+        self.all_symptoms = frozenset(spec.get("all_symptoms", ()))
+        self.any_phrases = tuple(phrase(p) for p in spec.get("any_phrases", ()))
+        self.any_risk_factors = frozenset(spec.get("any_risk_factors", ()))
+        self.min_age = spec.get("min_age")
+        self.max_age = spec.get("max_age")
+
+    def matches(self, age: int, concepts: FrozenSet[str], phrases: List[str], risks: FrozenSet[str]) -> bool:
+        if self.min_age is not None and age < self.min_age:
+            return False
+        if self.max_age is not None and age > self.max_age:
+            return False
+        if self.all_symptoms and not self.all_symptoms <= concepts:
+            return False
+        if self.any_symptoms and not self.any_symptoms & concepts:
+            return False
+        if self.any_risk_factors and not self.any_risk_factors & risks:
+            return False
+        if self.any_phrases and not any(p in phrase for p in self.any_phrases for phrase in phrases):
+            return False
+        return True
+
+
+class RuleEngine:
+    """
+    Deterministic NG12 pre-triage compiled from a versioned rule table.
+
+    Each rule is a conjunction of conditions on the patient's symptom
+    concepts (the routing vocabulary, so spelling variants match), raw
+    symptom phrases, risk factors and age. Rules are checked most severe
+    first and the first match wins; `definitive` rules are clear-cut enough
+    to decide the assessment on their own, the rest are offered to the LLM
+    as a prior.
+    """
+
+    def __init__(self, table: Dict[str, Any]):
+        self.version = str(table["version"])
+        severity = table.get("severity", [])
+        self.risk_factors = {
+            name: (
+                tuple(form.lower() for form in spec.get("forms", ())),
+                tuple(form.lower() for form in spec.get("exclude", ())),
+            )
+            for name, spec in table.get("risk_factors", {}).items()
+        }
+
+        rules = []
+        for spec in table["rules"]:
+            unknown = (set(spec.get("any_symptoms", ())) | set(spec.get("all_symptoms", ()))) - set(NG12_VOCABULARY)
+            if unknown:
+                raise ValueError(f"Rule {spec['id']} uses unknown symptom concepts: {sorted(unknown)}")
+            unknown = set(spec.get("any_risk_factors", ())) - set(self.risk_factors)
+            if unknown:
+                raise ValueError(f"Rule {spec['id']} uses unknown risk factors: {sorted(unknown)}")
+            if not any(key in spec for key in _CONDITIONS):
+                raise ValueError(f"Rule {spec['id']} has no conditions")
+            rank = severity.index(spec["recommendation"]) if spec["recommendation"] in severity else 0
+            rules.append(_Rule(spec, rank))
+        # Most severe first; definitive before prior at equal severity
+        self.rules = sorted(rules, key=lambda r: (-r.rank, not r.definitive))
+
+    @classmethod
+    def load(cls, path: str) -> "RuleEngine":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _risks(self, texts: List[str]) -> FrozenSet[str]:
+        found = set()
+        for text in texts:
+            text = text.lower()
+            for name, (forms, exclude) in self.risk_factors.items():
+                if any(form in text for form in forms) and not any(form in text for form in exclude):
+                    found.add(name)
+        return frozenset(found)
+
+    def evaluate(self, patient_data: Dict[str, Any]) -> Optional[TriageResult]:
+        """The highest-severity matching rule, or None if no rule applies."""
+        symptoms = patient_data.get("symptoms") or []
+        concepts = frozenset().union(*(_symptom_concepts(s) for s in symptoms))
+        phrases = [_symptom_phrase(s) for s in symptoms]
+        risks = self._risks(
+            list(patient_data.get("risk_factors") or []) + list(patient_data.get("medical_history") or [])
+        )
+        age = patient_data.get("age") or 0
+        for rule in self.rules:
+            if rule.matches(age, concepts, phrases, risks):
+                return TriageResult(rule, self.version)
+        return None
+
+
+# Shared engine per rule file, reloaded when the file changes
+_engines: Dict[str, tuple] = {}
+
+
+def get_rule_engine(path: str = DEFAULT_RULES_PATH) -> Optional[RuleEngine]:
+    """Get the compiled rule engine for `path`, or None if the file doesn't exist."""
+    try:
+        mtime = Path(path).stat().st_mtime_ns
+    except OSError:
+        return None
+    cached = _engines.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = _engines[path] = (mtime, RuleEngine.load(path))
+    return cached[1]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Batch Assessment Script
+Assesses a list of patients (or the whole cohort) and writes one JSON line
+per patient as each assessment finishes.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def run_remote(url: str, patient_ids, concurrency: int, out):
+    """Stream results from a running server's /assess/batch endpoint."""
+    import requests
+
+    response = requests.post(
+        f"{url.rstrip('/')}/assess/batch",
+        json={"patient_ids": patient_ids, "concurrency": concurrency},
+        stream=True,
+        timeout=None,
+    )
+    response.raise_for_status()
+    count = 0
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            out.write(line + "\n")
+            out.flush()
+            count += 1
+    return count
+
+
+async def run_local(patient_ids, concurrency: int, out):
+    """Run the batch in-process with the clinical agent."""
+    from dotenv import load_dotenv
+    from app.agents.clinical_agent import ClinicalDecisionAgent
+    from app.tools.patient_tool import get_patient_store
+
+    load_dotenv()
+    if patient_ids == "all":
+        patient_ids = get_patient_store().patient_ids()
+
+    agent = ClinicalDecisionAgent()
+    count = 0
+    async for item in agent.assess_patients_async(patient_ids, concurrency=concurrency):
+        out.write(item.model_dump_json() + "\n")
+        out.flush()
+        count += 1
+        status = item.assessment.recommendation if item.assessment else f"ERROR {item.error}"
+        print(f"  {item.patient_id}: {status}", file=sys.stderr)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("patient_ids", nargs="*", help="Patient IDs to assess (default: all)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max concurrent LLM calls")
+    parser.add_argument("--output", help="Write JSON lines to this file instead of stdout")
+    parser.add_argument("--url", help="Use a running server (e.g. http://localhost:8000) instead of in-process")
+    args = parser.parse_args()
+
+    patient_ids = args.patient_ids or "all"
+    if patient_ids == ["all"]:
+        patient_ids = "all"
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        if args.url:
+            count = run_remote(args.url, patient_ids, args.concurrency, out)
+        else:
+            count = asyncio.run(run_local(patient_ids, args.concurrency, out))
+    finally:
+        if args.output:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Assessed {count} patients in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Chat History Benchmark
+Replays a long synthetic chat session and reports the history tokens sent
+per turn for three strategies: the full transcript, the most recent messages
+under CHAT_HISTORY_TOKENS, and the sliding window plus rolling summary.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.context import CHAT_HISTORY_TOKENS, ContextPacker, count_tokens
+from app.memory.history import HistoryManager
+from app.memory.records import make_record
+from app.schemas.models import Citation
+
+SYMPTOMS = ["haemoptysis", "dysphagia", "rectal bleeding", "weight loss", "persistent cough", "haematuria"]
+
+
+def synthetic_turn(i: int):
+    symptom = SYMPTOMS[i % len(SYMPTOMS)]
+    question = make_record(
+        "user",
+        f"What does NG12 recommend for a patient aged {40 + i % 30} with {symptom}? Is referral urgent?",
+    )
+    answer = make_record(
+        "assistant",
+        (
+            f"For {symptom} NG12 recommends a suspected cancer pathway referral [Source: NG12, page {i % 20 + 1}]. "
+            + "The recommendation depends on age, smoking history and other findings. " * 6
+        ),
+        [Citation(source="NG12 PDF", page=i % 20 + 1, chunk_id=f"c{i}", excerpt="")],
+    )
+    return question, answer
+
+
+def history_tokens(messages) -> int:
+    return sum(count_tokens(m.content) + 2 for m in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--window", type=int, default=None, help="Messages kept verbatim")
+    parser.add_argument("--summary-tokens", type=int, default=None, help="Rolling summary token cap")
+    parser.add_argument("--every", type=int, default=5, help="Print every Nth turn")
+    args = parser.parse_args()
+
+    manager = HistoryManager()
+    if args.window is not None:
+        manager.window = args.window
+    if args.summary_tokens is not None:
+        manager.summary_tokens = args.summary_tokens
+    packer = ContextPacker()
+
+    history = []
+    totals = {"full": 0, "capped": 0, "summary": 0}
+    build_seconds = 0.0
+
+    print("=" * 60)
+    print(f"Chat history benchmark ({args.turns} turns, window={manager.window}, "
+          f"summary cap={manager.summary_tokens})")
+    print("=" * 60)
+    print(f"{'turn':>5} {'full':>8} {'capped':>8} {'summary':>8}")
+    for i in range(args.turns):
+        full = history_tokens(history)
+        _, capped = packer.pack_history(history, CHAT_HISTORY_TOKENS)
+
+        start = time.perf_counter()
+        summary, recent = manager.build("bench", history)
+        build_seconds += time.perf_counter() - start
+        # The agent still caps the verbatim window at CHAT_HISTORY_TOKENS
+        _, window_tokens = packer.pack_history(recent, CHAT_HISTORY_TOKENS)
+        windowed = count_tokens(summary) + window_tokens
+
+        totals["full"] += full
+        totals["capped"] += capped
+        totals["summary"] += windowed
+        if (i + 1) % args.every == 0 or i == 0:
+            print(f"{i + 1:>5} {full:>8} {capped:>8} {windowed:>8}")
+        history.extend(synthetic_turn(i))
+
+    print("-" * 60)
+    print(f"{'avg':>5} " + " ".join(f"{round(totals[k] / args.turns):>8}" for k in ("full", "capped", "summary")))
+    print(f"Summary upkeep: {build_seconds * 1000 / args.turns:.3f} ms/turn, "
+          f"{manager.summarized_messages} messages summarized once each")
+
+
+if __name__ == "__main__":
+    main()
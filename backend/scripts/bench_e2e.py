@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+End-to-End Benchmark Suite
+Drives /assess and /chat through the ASGI app with LLM_PROVIDER=local, so
+every number is reproducible offline and free of vendor latency. For each
+scenario it reports throughput, latency percentiles and how much of each
+request was spent outside the LLM (retrieval, prompt building,
+serialization and queueing).
+
+Scenarios:
+  assess         /assess with bypass_cache, so every request runs the pipeline
+  assess-cached  /assess served from the assessment cache
+  assess-burst   /assess with bypass_cache, all workers asking for the same
+                 patient at once (exercises request coalescing)
+  chat           /chat, one session per worker
+  chat-stream    /chat/stream, reading the whole SSE body
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+
+SCENARIOS = ("assess", "assess-cached", "assess-burst", "chat", "chat-stream")
+QUESTIONS = [
+    "When should I refer persistent cough?",
+    "What does NG12 say about unexplained haemoptysis?",
+    "Which patients with dysphagia need an urgent referral?",
+    "How should unexplained weight loss be investigated?",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def configure_environment(args):
+    """Select the local stand-in before the app (and its config) is imported."""
+    os.environ["LLM_PROVIDER"] = "local"
+    os.environ["LLM_CACHE_MODE"] = "off"
+    os.environ["SESSION_BACKEND"] = "memory"
+    os.environ["LOCAL_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["LOCAL_LLM_LATENCY_DIST"] = args.latency_dist
+    os.environ["LOCAL_LLM_TOKEN_DELAY"] = str(args.token_delay)
+    os.environ["LOCAL_LLM_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ["LOCAL_LLM_STALL_RATE"] = str(args.stall_rate)
+    os.environ["LOCAL_LLM_STALL_SECONDS"] = str(args.stall_seconds)
+    os.environ["LOCAL_LLM_SEED"] = str(args.seed)
+    os.environ["LLM_TIMEOUT"] = str(args.timeout)
+    os.environ["LLM_RETRIES"] = str(args.retries)
+    os.environ["LLM_HEDGE"] = "on" if args.hedge else "off"
+
+
+async def send(
+    client: httpx.AsyncClient, scenario: str, i: int, worker: int, patient_ids: List[str], concurrency: int
+) -> Optional[str]:
+    """Issue request `i` of a scenario; returns an error description or None."""
+    if scenario.startswith("assess"):
+        # A burst is one patient per round of concurrent requests
+        patient = i // concurrency if scenario == "assess-burst" else i
+        resp = await client.post("/assess", json={
+            "patient_id": patient_ids[patient % len(patient_ids)],
+            "bypass_cache": scenario != "assess-cached",
+        })
+    else:
+        body = {"session_id": f"bench-{scenario}-{worker}", "message": QUESTIONS[i % len(QUESTIONS)], "top_k": 3}
+        resp = await client.post("/chat" if scenario == "chat" else "/chat/stream", json=body)
+        # Stream failures arrive as an SSE error event on a 200 response
+        if resp.status_code == 200 and "event: error" in resp.text:
+            return f"stream error: {resp.text[-100:]}"
+    if resp.status_code != 200:
+        return f"{resp.status_code}: {resp.text[:100]}"
+    return None
+
+
+async def run_scenario(app, scenario: str, requests: int, concurrency: int, warmup: int, patient_ids: List[str]) -> Dict:
+    from app.concurrency import get_single_flight
+    from app.llm import get_llm_provider
+
+    provider = get_llm_provider()
+    flight = get_single_flight("assess")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for i in range(warmup):
+            await send(client, scenario, i, 0, patient_ids, concurrency)
+
+        latencies: List[float] = []
+        errors: List[str] = []
+        counter = iter(range(requests))
+
+        async def worker(idx: int):
+            for i in counter:
+                start = time.perf_counter()
+                error = await send(client, scenario, i, idx, patient_ids, concurrency)
+                latencies.append(time.perf_counter() - start)
+                if error:
+                    errors.append(error)
+
+        calls, seconds, coalesced = provider.calls, provider.seconds, flight.coalesced
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(idx) for idx in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        llm_calls, llm_seconds = provider.calls - calls, provider.seconds - seconds
+        coalesced = flight.coalesced - coalesced
+
+    mean = sum(latencies) / len(latencies)
+    return {
+        "scenario": scenario,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "llm_calls": llm_calls,
+        "coalesced": coalesced,
+        "llm_ms_per_request": round(llm_seconds / len(latencies) * 1000, 1),
+        "non_llm_ms_per_request": round((mean - llm_seconds / len(latencies)) * 1000, 1),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Mean stand-in time to first token (seconds)")
+    parser.add_argument("--latency-dist", choices=["fixed", "normal", "lognormal"], default="lognormal")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Seconds per streamed chunk")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fraction of LLM calls that stall")
+    parser.add_argument("--stall-seconds", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-attempt LLM timeout (seconds)")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--hedge", action="store_true", help="Hedge LLM calls slower than the recent p95")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fake-retrieval", action="store_true", help="Skip the embedding model and vector store")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    configure_environment(args)
+
+    from app import main as app_main
+    from app.tools.patient_tool import get_patient_store
+
+    if args.fake_retrieval:
+        from load_test import install_fake_retrieval
+        install_fake_retrieval((app_main.clinical_agent, app_main.chat_agent))
+    patient_ids = get_patient_store().patient_ids()
+
+    print("=" * 60)
+    print(
+        f"End-to-end benchmark: local LLM {args.latency_dist} {args.llm_latency}s, "
+        f"concurrency={args.concurrency}, seed={args.seed}, hedge={'on' if args.hedge else 'off'}"
+    )
+    print("=" * 60)
+    print(
+        f"{'scenario':<14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'LLM calls':>9} {'LLM ms':>8} {'other ms':>9} {'coalesced':>9} {'errors':>7}"
+    )
+    results = []
+    for scenario in args.scenarios.split(","):
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario: {scenario}")
+        r = asyncio.run(run_scenario(
+            app_main.app, scenario, args.requests, args.concurrency, args.warmup, patient_ids
+        ))
+        results.append(r)
+        print(
+            f"{r['scenario']:<14} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+            f"{r['llm_calls']:>9} {r['llm_ms_per_request']:>8} {r['non_llm_ms_per_request']:>9} "
+            f"{r['coalesced']:>9} {r['errors']:>7}"
+        )
+        if r["first_error"]:
+            print(f"  first error: {r['first_error']}")
+
+    if args.output:
+        config = {k: v for k, v in vars(args).items() if k != "output"}
+        Path(args.output).write_text(json.dumps({"config": config, "results": results}, indent=2))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
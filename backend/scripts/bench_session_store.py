@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Session Store Microbenchmark
+Replays chat turns (read history, build the prompt, store the question and
+a cited answer) against the compact session store and against the previous
+Pydantic-message store, reporting time per turn and the memory blocks and
+bytes each leaves allocated.
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.memory.session_store import MemorySessionStore
+from app.schemas.models import ChatMessage, Citation
+
+
+class PydanticSessionStore:
+    """The previous store: one validated ChatMessage per message, citations as dicts."""
+
+    def __init__(self):
+        self.sessions: Dict[str, List[ChatMessage]] = {}
+
+    def get_session(self, session_id: str) -> List[ChatMessage]:
+        if session_id not in self.sessions:
+            self.sessions[session_id] = []
+        return self.sessions[session_id]
+
+    def add_message(self, session_id: str, role: str, content: str, citations: list = None):
+        self.get_session(session_id).append(ChatMessage(role=role, content=content, citations=citations or []))
+
+
+def corpus_citations(n: int) -> List[Citation]:
+    return [
+        Citation(
+            source="NG12 PDF",
+            page=i % 80 + 1,
+            chunk_id=f"{i:040x}",
+            excerpt=f"1.{i % 15}.{i % 7} Refer people using a suspected cancer pathway referral ... " * 2,
+            section=f"1.{i % 15} Section",
+            recommendation=f"1.{i % 15}.{i % 7}",
+        )
+        for i in range(n)
+    ]
+
+
+def run_turn(store, legacy: bool, session_id: str, turn: int, citations: List[Citation]):
+    history = store.get_session(session_id)
+    # What the agent does with the history on every turn
+    if legacy:
+        messages = [{"role": m.role, "content": m.content} for m in history]
+        prompt = "".join(f"{m['role']}: {m['content']}\n\n" for m in messages)
+    else:
+        prompt = "".join(f"{m.role}: {m.content}\n\n" for m in history)
+    cited = [citations[(turn * 5 + k) % len(citations)] for k in range(5)]
+    store.add_message(session_id, "user", f"Question {turn}: what does NG12 say about symptom {turn}?")
+    store.add_message(
+        session_id,
+        "assistant",
+        f"Answer {turn} [Source: NG12, page {cited[0].page}]. " + "Guideline detail. " * 20,
+        # The API previously dumped citations to dicts for the store to re-validate
+        citations=[c.model_dump() for c in cited] if legacy else cited,
+    )
+    return len(prompt)
+
+
+def measure(name: str, sessions: int, turns: int, citations: List[Citation]) -> dict:
+    legacy = name == "pydantic"
+    store = PydanticSessionStore() if legacy else MemorySessionStore(max_sessions=sessions, max_messages=turns * 2)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    for turn in range(turns):
+        for s in range(sessions):
+            run_turn(store, legacy, f"session-{s}", turn, citations)
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, "filename")
+    total_turns = sessions * turns
+    return {
+        "store": name,
+        "us_per_turn": round(elapsed / total_turns * 1e6, 1),
+        "retained_blocks": sum(stat.count_diff for stat in diff),
+        "retained_kb": round(sum(stat.size_diff for stat in diff) / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "bytes_per_message": round(sum(stat.size_diff for stat in diff) / (total_turns * 2)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--corpus-chunks", type=int, default=400)
+    args = parser.parse_args()
+
+    citations = corpus_citations(args.corpus_chunks)
+    results = [measure(name, args.sessions, args.turns, citations) for name in ("pydantic", "compact")]
+
+    print("=" * 60)
+    print(f"Session store microbenchmark ({args.sessions} sessions x {args.turns} turns)")
+    print("=" * 60)
+    print(f"{'store':<10} {'µs/turn':>9} {'blocks':>10} {'KB held':>10} {'peak KB':>10} {'B/msg':>7}")
+    for r in results:
+        print(
+            f"{r['store']:<10} {r['us_per_turn']:>9} {r['retained_blocks']:>10} "
+            f"{r['retained_kb']:>10} {r['peak_kb']:>10} {r['bytes_per_message']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures resident memory and time-to-first-request for the RAG components,
+comparing shared handles against the old one-model-per-component setup.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_once(mode: str, chroma_db_path: str) -> dict:
+    """Build two retrievers and one ingester, then serve a first query."""
+    from app.rag import registry
+    from app.rag.retriever import RAGRetriever
+    from app.rag.ingestion import PDFIngester
+
+    baseline = rss_mb()
+    start = time.perf_counter()
+
+    components = []
+    for factory in (RAGRetriever, RAGRetriever, lambda path: PDFIngester(path)):
+        if mode == "isolated":
+            # Forget previous handles so each component loads its own copy,
+            # reproducing the pre-registry behaviour.
+            registry.reset_registry()
+        components.append(factory(chroma_db_path))
+
+    ready = time.perf_counter()
+    components[0].retrieve("persistent cough and haemoptysis", top_k=3)
+    first_request = time.perf_counter()
+
+    return {
+        "mode": mode,
+        "init_s": round(ready - start, 3),
+        "time_to_first_request_s": round(first_request - start, 3),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_delta_mb": round(rss_mb() - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["shared", "isolated", "both"], default="both")
+    parser.add_argument("--chroma-db-path", default=str(Path(__file__).parent.parent / "vector_store"))
+    args = parser.parse_args()
+
+    if args.mode != "both":
+        print(json.dumps(run_once(args.mode, args.chroma_db_path)))
+        return
+
+    # Run each mode in a fresh interpreter so memory numbers don't overlap.
+    results = []
+    for mode in ("isolated", "shared"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--chroma-db-path", args.chroma_db_path],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=os.environ.copy(),
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print("=" * 60)
+    print("Startup benchmark (2 retrievers + 1 ingester)")
+    print("=" * 60)
+    print(f"{'mode':<10} {'init (s)':>10} {'first req (s)':>14} {'RSS (MB)':>10} {'ΔRSS (MB)':>10}")
+    for r in results:
+        print(
+            f"{r['mode']:<10} {r['init_s']:>10} {r['time_to_first_request_s']:>14} "
+            f"{r['rss_mb']:>10} {r['rss_delta_mb']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Vector Backend Benchmark
+Compares query latency, resident memory and on-disk size of the Chroma and
+NumPy (memory-mapped exact search) backends on a synthetic NG12-sized corpus.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from bench_startup import rss_mb
+
+
+def synthetic_corpus(n_chunks: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n_chunks, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = [f"ng12_bench_{i:05d}" for i in range(n_chunks)]
+    documents = [f"Synthetic NG12 chunk {i}" for i in range(n_chunks)]
+    metadatas = [{"page": i // 10 + 1, "chunk_id": ids[i], "section": f"1.{i % 12 + 1}"} for i in range(n_chunks)]
+    return ids, embeddings, documents, metadatas
+
+
+def dir_size_mb(path: Path) -> float:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / (1024 * 1024)
+
+
+def build(kind: str, store_dir: str, n_chunks: int, dim: int) -> dict:
+    from app.rag.registry import get_vector_backend
+
+    ids, embeddings, documents, metadatas = synthetic_corpus(n_chunks, dim)
+    backend = get_vector_backend(store_dir, kind=kind)
+    start = time.perf_counter()
+    batch_size = 256
+    for i in range(0, n_chunks, batch_size):
+        backend.upsert(
+            ids=ids[i:i + batch_size],
+            embeddings=embeddings[i:i + batch_size].tolist(),
+            documents=documents[i:i + batch_size],
+            metadatas=metadatas[i:i + batch_size],
+        )
+    backend.flush()
+    return {"build_s": round(time.perf_counter() - start, 3)}
+
+
+def query(kind: str, store_dir: str, n_queries: int, top_k: int, dim: int) -> dict:
+    from app.rag.registry import get_vector_backend
+
+    baseline = rss_mb()
+    start = time.perf_counter()
+    backend = get_vector_backend(store_dir, kind=kind)
+    backend.count()
+    open_s = time.perf_counter() - start
+    loaded = rss_mb()
+
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((n_queries, dim)).astype(np.float32)
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        backend.query([q.tolist()], top_k)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    t0 = time.perf_counter()
+    backend.query(queries.tolist(), top_k)
+    batch_s = time.perf_counter() - t0
+
+    filtered = []
+    for q in queries[:50]:
+        t0 = time.perf_counter()
+        backend.query([q.tolist()], top_k, where={"section": "1.3"})
+        filtered.append(time.perf_counter() - t0)
+    filtered.sort()
+
+    return {
+        "open_s": round(open_s, 3),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+        "batch_ms_per_query": round(batch_s / n_queries * 1000, 3),
+        "filtered_p50_ms": round(filtered[len(filtered) // 2] * 1000, 3),
+        "rss_delta_mb": round(rss_mb() - baseline, 1),
+        "rss_after_open_mb": round(loaded - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=3000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", default="chroma,numpy")
+    parser.add_argument("--phase", choices=["build", "query"], help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase == "build":
+        print(json.dumps(build(args.backend, args.dir, args.chunks, args.dim)))
+        return
+    if args.phase == "query":
+        print(json.dumps(query(args.backend, args.dir, args.queries, args.top_k, args.dim)))
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in args.backends.split(","):
+            store_dir = str(Path(tmp) / kind)
+            result = {"backend": kind}
+            # Build and query in separate interpreters so memory is measured cold
+            for phase in ("build", "query"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--phase", phase, "--backend", kind, "--dir", store_dir,
+                     "--chunks", str(args.chunks), "--dim", str(args.dim),
+                     "--queries", str(args.queries), "--top-k", str(args.top_k)],
+                    capture_output=True, text=True, check=True, env=os.environ.copy(),
+                )
+                result.update(json.loads(out.stdout.strip().splitlines()[-1]))
+            result["disk_mb"] = round(dir_size_mb(Path(store_dir)), 1)
+            rows.append(result)
+
+    print("=" * 78)
+    print(f"Vector backend benchmark: {args.chunks} chunks x {args.dim} dims, top_k={args.top_k}")
+    print("=" * 78)
+    print(f"{'backend':<8} {'build s':>8} {'open s':>7} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'batch ms/q':>10} {'filt p50':>9} {'ΔRSS MB':>8} {'disk MB':>8}")
+    for r in rows:
+        print(f"{r['backend']:<8} {r['build_s']:>8} {r['open_s']:>7} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['batch_ms_per_query']:>10} {r['filtered_p50_ms']:>9} {r['rss_delta_mb']:>8} {r['disk_mb']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ PDF Ingestion Script
 Downloads NG12 PDF from NICE website and ingests into ChromaDB
 """
 
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -11,6 +12,7 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from app.rag.extraction import DEFAULT_EXTRACT_WORKERS
 from app.rag.ingestion import ingest_ng12_pdf
 
 
@@ -113,6 +115,20 @@ def create_sample_pdf(output_path: str):
 
 def main():
     """Main ingestion workflow."""
+    parser = argparse.ArgumentParser(description="Ingest the NG12 PDF into the vector store")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-embed every chunk instead of only new or changed ones",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_EXTRACT_WORKERS,
+        help="Processes for PDF page extraction (default: INGEST_WORKERS or CPU count)",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("NG12 PDF Ingestion Pipeline")
     print("=" * 60)
@@ -148,7 +164,7 @@ def main():
     # Step 3: Ingest PDF into ChromaDB
     print("\n[Step 2] Ingesting PDF into ChromaDB...")
     try:
-        ingest_ng12_pdf(str(pdf_path), str(chroma_db_path))
+        ingest_ng12_pdf(str(pdf_path), str(chroma_db_path), force=args.full, workers=args.workers)
         print("\n✓ PDF ingestion complete!")
     except Exception as e:
         print(f"\n✗ Error during ingestion: {e}")
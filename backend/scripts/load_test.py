@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Load Test Harness
+Drives /assess and /chat in-process through the ASGI app with the local
+stand-in LLM provider, and reports requests/sec and latency percentiles per concurrency level.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+
+
+def install_fake_retrieval(agents):
+    """Replace embedding and vector search with fixed-cost fakes."""
+    def fake_embed(query):
+        time.sleep(0.005)
+        return [0.0] * 384
+
+    def fake_search(query_embedding, top_k, where=None):
+        time.sleep(0.002)
+        docs = [f"NG12 fake chunk {i}" for i in range(top_k)]
+        metas = [{"page": 1, "chunk_id": f"ng12_fake_{i}"} for i in range(top_k)]
+        return {"documents": [docs], "metadatas": [metas], "distances": [[0.1] * top_k]}
+
+    for agent in agents:
+        agent.retriever._embed = fake_embed
+        agent.retriever._search = fake_search
+
+
+def install_fakes(llm_latency: float, fake_retrieval: bool):
+    """
+    Point the agents at the local stand-in LLM (and optionally fake
+    retrieval) and switch off the response and result caches.
+    """
+    from app import main
+    from app.cache import get_assessment_cache, get_retrieval_cache
+    from app.llm import LocalProvider
+
+    provider = LocalProvider(latency=llm_latency, distribution="normal", spread=0.2, token_delay=0)
+    for agent in (main.clinical_agent, main.chat_agent):
+        agent.llm.provider = provider
+        # Measure the pipeline, not LLM response cache hits
+        agent.llm.cache = None
+
+    # Sessions draw from a handful of patients and questions, so the
+    # assessment and retrieval caches would otherwise answer nearly every
+    # request after the first few
+    for cache in (get_assessment_cache(), get_retrieval_cache()):
+        cache.invalidate()
+        cache.max_entries = 0
+
+    if fake_retrieval:
+        install_fake_retrieval((main.clinical_agent, main.chat_agent))
+
+    return main.app
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_session(client: httpx.AsyncClient, session_idx: int, requests_per_session: int,
+                      endpoint: str, patient_ids: List[str], latencies: List[float], errors: List[str]):
+    session_id = f"load-{session_idx}"
+    for i in range(requests_per_session):
+        target = endpoint if endpoint != "mixed" else random.choice(["assess", "chat"])
+        start = time.perf_counter()
+        if target == "assess":
+            resp = await client.post("/assess", json={"patient_id": random.choice(patient_ids)})
+        else:
+            resp = await client.post(
+                "/chat",
+                json={"session_id": session_id, "message": f"When should I refer persistent cough? ({i})", "top_k": 3},
+            )
+        latencies.append(time.perf_counter() - start)
+        if resp.status_code != 200:
+            errors.append(f"{resp.status_code}: {resp.text[:100]}")
+
+
+async def run_level(app, concurrency: int, requests_per_session: int, endpoint: str, patient_ids: List[str]) -> dict:
+    latencies: List[float] = []
+    errors: List[str] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_session(client, idx, requests_per_session, endpoint, patient_ids, latencies, errors)
+            for idx in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--levels", default="10,100,500", help="Comma-separated concurrent session counts")
+    parser.add_argument("--requests-per-session", type=int, default=5)
+    parser.add_argument("--endpoint", choices=["assess", "chat", "mixed"], default="mixed")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Mean stand-in LLM latency in seconds")
+    parser.add_argument("--fake-retrieval", action="store_true", help="Skip the embedding model and vector store")
+    args = parser.parse_args()
+
+    app = install_fakes(args.llm_latency, args.fake_retrieval)
+
+    from app.tools.patient_tool import get_patient_store
+    patient_ids = get_patient_store().patient_ids()
+
+    print("=" * 60)
+    print(f"Load test: endpoint={args.endpoint}, stand-in LLM latency={args.llm_latency}s")
+    print("=" * 60)
+    print(f"{'sessions':>8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for level in (int(x) for x in args.levels.split(",")):
+        r = asyncio.run(run_level(app, level, args.requests_per_session, args.endpoint, patient_ids))
+        print(f"{r['concurrency']:>8} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8} {r['p50_ms']:>9} {r['p99_ms']:>9}")
+        if r["first_error"]:
+            print(f"  first error: {r['first_error']}")
+
+
+if __name__ == "__main__":
+    main()
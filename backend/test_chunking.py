@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Check that the structure-aware chunker follows NG12 recommendation
+numbering, headings and tables, including across page breaks.
+Runs standalone or under pytest.
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.rag.chunking import StructureChunker
+
+
+PAGE_1 = {
+    "paragraphs": ["""Suspected cancer: recognition and referral (NG12)
+1.1 Lung and pleural cancers
+Lung cancer
+1.1.1 Refer people using a suspected cancer pathway referral for lung cancer if they:
+• have chest X-ray findings that suggest lung cancer or
+• are aged 40 and over with unexplained haemoptysis. [2015]
+1.1.2 Offer an urgent chest X-ray to assess for lung cancer in people aged 40 and over if
+© NICE 2023. All rights reserved. Subject to Notice of rights. Page 5 of 94"""],
+    "tables": [],
+}
+
+PAGE_2 = {
+    "paragraphs": ["""they have 2 or more of the following unexplained symptoms: cough, fatigue. [2015]
+1.2 Upper gastrointestinal tract cancers
+Oesophageal cancer
+1.2.1 Offer urgent direct access upper gastrointestinal endoscopy to people with dysphagia. [2015]"""],
+    "tables": [[["Symptom", "Possible cancer"], ["Haemoptysis", "Lung"], [None, None]]],
+}
+
+
+def test_recommendations_sections_and_tables():
+    chunker = StructureChunker()
+    page_1 = chunker.chunk_page(PAGE_1)
+    page_2 = chunker.chunk_page(PAGE_2)
+
+    assert [c["recommendation"] for c in page_1] == ["1.1.1", "1.1.2"]
+    assert all(c["section_id"] == "1.1" and c["heading"] == "Lung cancer" for c in page_1)
+    assert not any("NICE" in c["text"] for c in page_1)
+    assert page_1[0]["text"].startswith("1.1 Lung and pleural cancers > Lung cancer\n1.1.1 Refer")
+
+    # 1.1.2 runs over the page break and keeps its ID
+    assert page_2[0]["recommendation"] == "1.1.2"
+    assert "1.1.2 (continued)" in page_2[0]["text"]
+    assert (page_2[1]["section_id"], page_2[1]["recommendation"]) == ("1.2", "1.2.1")
+
+    table = page_2[-1]
+    assert table["kind"] == "table"
+    assert "Symptom | Possible cancer\nHaemoptysis | Lung" in table["text"]
+
+
+def test_long_recommendation_is_split():
+    chunker = StructureChunker(max_words=20)
+    words = " ".join(f"word{i}" for i in range(50))
+    chunks = chunker.chunk_page({"paragraphs": [f"1.5 Skin cancers\n1.5.1 {words}"]})
+    assert len(chunks) > 1
+    assert all(c["recommendation"] == "1.5.1" for c in chunks)
+    assert all(len(c["text"].split("\n", 1)[1].split()) <= 22 for c in chunks)
+
+
+def test_state_round_trip():
+    chunker = StructureChunker()
+    chunker.chunk_page(PAGE_1)
+    resumed = StructureChunker()
+    resumed.restore(chunker.state)
+    assert resumed.chunk_page(PAGE_2) == chunker.chunk_page(PAGE_2)
+
+
+if __name__ == "__main__":
+    print("Testing structure-aware chunking...")
+    tests = [
+        test_recommendations_sections_and_tables,
+        test_long_recommendation_is_split,
+        test_state_round_trip,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Check the token-budgeted context packer shared by both agents: budget
+enforcement, relevance order, overlap de-duplication, sentence-aligned
+trimming and history packing. Runs standalone or under pytest.
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.context import ContextPacker, count_chunk_tokens, count_tokens
+from app.memory.records import make_record
+from app.schemas.models import Citation
+
+
+def citation(n: int) -> Citation:
+    return Citation(source="NG12 PDF", page=n, chunk_id=f"c{n}", excerpt="")
+
+
+def sentences(prefix: str, n: int) -> str:
+    return " ".join(f"{prefix} sentence number {i} mentions a threshold of {i} weeks." for i in range(n))
+
+
+def test_budget_and_citations():
+    packer = ContextPacker(budget_tokens=10_000, min_trim_tokens=10)
+    texts = [sentences("alpha", 5), sentences("beta", 5), sentences("gamma", 5)]
+    budget = count_tokens(texts[0]) + count_tokens(texts[1]) + 20
+    packed = packer.pack_chunks(texts, [citation(i) for i in range(3)], budget=budget)
+
+    assert packed.tokens <= budget
+    assert packed.texts[:2] == texts[:2]
+    assert [c.chunk_id for c in packed.citations] == ["c0", "c1", "c2"]
+    # The third chunk was trimmed at a sentence boundary
+    assert packed.trimmed == 1
+    assert packed.texts[2].endswith("weeks.")
+
+
+def test_overlapping_chunks_are_dropped():
+    packer = ContextPacker()
+    base = sentences("delta", 4)
+    packed = packer.pack_chunks([base, base + " One extra sentence.", sentences("eps", 3)])
+    assert packed.duplicates == 1
+    assert len(packed.texts) == 2
+
+
+def test_scores_reorder_chunks():
+    packer = ContextPacker()
+    packed = packer.pack_chunks(["low relevance text", "high relevance text"], scores=[0.1, 0.9])
+    assert packed.texts[0] == "high relevance text"
+
+
+def test_history_keeps_most_recent():
+    packer = ContextPacker()
+    history = [make_record("user", f"message {i} " * 20) for i in range(10)]
+    kept, used = packer.pack_history(history, budget=150)
+    assert kept == history[-len(kept):]
+    assert 0 < len(kept) < 10 and used <= 150
+
+
+def test_only_recurring_texts_are_cached():
+    count_chunk_tokens.cache_clear()
+    chunks = [sentences("zeta", 3), sentences("eta", 3)]
+    ContextPacker().pack_chunks(chunks)
+    ContextPacker().pack_chunks(chunks)
+    info = count_chunk_tokens.cache_info()
+    assert info.currsize == 2 and info.hits == 2
+    # Whole prompts are unique per request and must not fill the cache
+    count_tokens("System prompt\n\n" + "\n".join(chunks) + "\n\nUser: unique question")
+    assert count_chunk_tokens.cache_info().currsize == 2
+
+
+if __name__ == "__main__":
+    print("Testing context packer...")
+    tests = [
+        test_budget_and_citations,
+        test_overlapping_chunks_are_dropped,
+        test_scores_reorder_chunks,
+        test_history_keeps_most_recent,
+        test_only_recurring_texts_are_cached,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
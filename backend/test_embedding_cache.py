@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Check the query-embedding cache: the in-memory byte/entry bound, sharing
+through the SQLite file, and the least-recently-used bound on that file.
+Runs standalone or under pytest.
+"""
+
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.rag.embedding_cache import EmbeddingCache
+
+
+def test_memory_bound_and_key_normalisation():
+    vector = [0.5] * 8  # 32 bytes packed
+    cache = EmbeddingCache(max_entries=100, max_bytes=3 * (32 + len(":q0")))
+    for i in range(4):
+        cache.put(f":q{i}", vector)
+    assert cache.get(":q0") is None and cache.get(":q3") == vector
+    assert cache.stats()["evictions"] == 1
+
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return [1.0, 2.0]
+
+    cache.get_or_compute("Persistent  Cough", compute)
+    cache.get_or_compute("persistent cough ", compute)
+    assert calls == ["Persistent  Cough"]
+
+
+def test_disk_level_is_shared_and_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "embeddings.db")
+        writer = EmbeddingCache(disk_path=path, disk_max_entries=5)
+        reader = EmbeddingCache(disk_path=path, disk_max_entries=5)
+        for i in range(100):
+            writer.put(f"k{i}", [float(i)])
+
+        # Read through another worker: a disk hit that refreshes k0's recency
+        assert reader.get("k0") == [0.0] and reader.stats()["disk_hits"] == 1
+
+        writer.put("k100", [100.0])  # the 101st write trims the file
+        keys = {row[0] for row in sqlite3.connect(path).execute("SELECT key FROM embeddings")}
+        assert keys == {"k0", "k97", "k98", "k99", "k100"}
+        assert writer.stats()["disk_evictions"] == 96
+
+
+if __name__ == "__main__":
+    print("Testing embedding cache...")
+    tests = [
+        test_memory_bound_and_key_normalisation,
+        test_disk_level_is_shared_and_bounded,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Check that parallel PDF page extraction produces exactly the same pages as
+the serial path. Runs standalone or under pytest; the test PDF is written
+with reportlab, a test-only dependency, and the check is skipped without it.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.rag.extraction import extract_pages
+
+
+def build_test_pdf(path: str, n_pages: int = 23):
+    """Write a multi-page PDF with distinct text per page (and a blank page)."""
+    pytest.importorskip("reportlab")
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path, pagesize=letter)
+    for page in range(1, n_pages + 1):
+        if page != 7:
+            y = 750
+            for line in range(12):
+                c.drawString(50, y, f"1.{page}.{line} Page {page} line {line}: refer people with haemoptysis")
+                y -= 20
+        c.showPage()
+    c.save()
+
+
+def test_parallel_extraction_matches_serial():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = str(Path(tmp) / "sample.pdf")
+        build_test_pdf(pdf_path)
+
+        serial, serial_timings = extract_pages(pdf_path, workers=1)
+        parallel, parallel_timings = extract_pages(pdf_path, workers=4)
+
+        assert parallel == serial
+        assert [p for p, _ in parallel_timings] == [p for p, _ in serial_timings]
+        assert [p["page"] for p in serial] == [p for p in range(1, 24) if p != 7]
+
+
+if __name__ == "__main__":
+    print("Testing parallel PDF extraction...")
+    try:
+        test_parallel_extraction_matches_serial()
+    except pytest.skip.Exception as e:
+        print(f"- Skipped: {e}")
+        sys.exit(0)
+    except AssertionError:
+        print("\n Parallel extraction differs from serial extraction")
+        sys.exit(1)
+    print("✓ Parallel extraction matches serial extraction")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Check the chat history window and rolling summary: incremental
+summarization, the summary token cap, session reset and bounded prompt
+growth over a long session. Runs standalone or under pytest.
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.context import count_tokens
+from app.memory.history import HistoryManager, summarize_message
+from app.memory.records import make_record
+from app.schemas.models import Citation
+
+
+def conversation(turns: int, topic: str = "haemoptysis"):
+    history = []
+    for i in range(turns):
+        history.append(make_record("user", f"Question {i} about {topic}? Please give detail."))
+        history.append(make_record(
+            "assistant",
+            f"Answer {i}: refer urgently for {topic}. " + "Further explanation. " * 30,
+            [Citation(source="NG12 PDF", page=i + 1, chunk_id=f"history-{i}", excerpt="")],
+        ))
+    return history
+
+
+def test_window_and_summary():
+    manager = HistoryManager(window=4, summary_tokens=1000)
+    history = conversation(5)
+    summary, recent = manager.build("s1", history)
+    assert recent == history[-4:]
+    lines = summary.split("\n")
+    assert len(lines) == 6
+    assert lines[0] == "User asked: Question 0 about haemoptysis?"
+    assert lines[1].startswith("Assistant answered: Answer 0:") and lines[1].endswith("(NG12 p. 1)")
+
+
+def test_summary_is_incremental():
+    manager = HistoryManager(window=2, summary_tokens=1000)
+    history = conversation(10)
+    for turn in range(2, 11):
+        manager.build("s1", history[:turn * 2])
+    # Each message was summarized once, not once per turn
+    assert manager.summarized_messages == len(history) - 2
+
+
+def test_summary_token_cap():
+    manager = HistoryManager(window=2, summary_tokens=60)
+    summary, _ = manager.build("s1", conversation(20))
+    assert count_tokens(summary) <= 60
+    # Oldest lines are dropped first
+    assert "Question 18" in summary and "Question 0 " not in summary
+
+
+def test_reused_session_resets_summary():
+    manager = HistoryManager(window=2, summary_tokens=1000)
+    manager.build("s1", conversation(4))
+    summary, _ = manager.build("s1", conversation(3, topic="dysphagia"))
+    assert "haemoptysis" not in summary
+    manager.forget("s1")
+    assert manager.stats()["cached_sessions"] == 0
+
+
+def test_summary_strips_stored_context():
+    message = make_record("user", "What about cough?\n--- Relevant Guidelines Context ---\nlots of text")
+    assert summarize_message(message) == "User asked: What about cough?"
+
+
+def test_history_tokens_stay_bounded():
+    manager = HistoryManager(window=4, summary_tokens=200)
+    history = conversation(40)
+    sizes = []
+    for turn in range(1, 41):
+        summary, recent = manager.build("s1", history[:turn * 2])
+        sizes.append(count_tokens(summary) + sum(count_tokens(m.content) for m in recent))
+    assert max(sizes[10:]) - min(sizes[10:]) < 50
+
+
+if __name__ == "__main__":
+    print("Testing chat history window and summary...")
+    tests = [
+        test_window_and_summary,
+        test_summary_is_incremental,
+        test_summary_token_cap,
+        test_reused_session_resets_summary,
+        test_summary_strips_stored_context,
+        test_history_tokens_stay_bounded,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
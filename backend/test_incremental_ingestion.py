@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Check incremental re-ingestion against the manifest: unchanged pages are
+skipped, only added or modified chunks are embedded, chunks the PDF no
+longer produces are deleted, chunks that move page only get new metadata
+(including a deduplicated chunk taken over by an unchanged page), and the
+index version is bumped only when the store changed. Runs standalone or
+under pytest.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.rag import ingestion
+from app.rag.backends import NumpyBackend
+from app.rag.ingestion import PDFIngester
+from app.rag.registry import get_index_version
+
+
+def page(section: str, title: str, recommendations):
+    lines = [f"{section} {title}"]
+    lines += [f"{section}.{i} {text}" for i, text in enumerate(recommendations, 1)]
+    return {"paragraphs": ["\n".join(lines)], "tables": []}
+
+
+LUNG = page("1.1", "Lung and pleural cancers", [
+    "Refer people aged 40 and over with unexplained haemoptysis. [2015]",
+    "Offer an urgent chest X-ray to people aged 40 and over with cough. [2015]",
+])
+UPPER_GI = page("1.2", "Upper gastrointestinal tract cancers", [
+    "Offer urgent endoscopy to people with dysphagia. [2015]",
+    "Offer urgent endoscopy to people aged 55 and over with weight loss. [2015]",
+])
+BREAST = page("1.3", "Breast cancer", [
+    "Refer people aged 30 and over with an unexplained breast lump. [2015]",
+])
+
+
+class CountingModel:
+    """Embedding model stand-in that records which texts were encoded."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, convert_to_list=False):
+        self.encoded.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+
+
+def ingest(tmp: str, pages):
+    """Run one ingestion of `pages` (in order) into a NumPy store under `tmp`."""
+    original = ingestion.iter_page_results
+    ingestion.iter_page_results = lambda pdf_path, workers=1: (
+        (num, data, 0.001) for num, data in enumerate(pages, 1)
+    )
+    try:
+        ingester = PDFIngester(tmp, extract_workers=1)
+        ingester.model = CountingModel()
+        ingester.backend = NumpyBackend(str(Path(tmp) / "numpy"))
+        stats = ingester.ingest_pdf("ng12.pdf")
+    finally:
+        ingestion.iter_page_results = original
+    return stats, ingester
+
+
+def test_unchanged_pdf_does_no_work():
+    with tempfile.TemporaryDirectory() as tmp:
+        first, ingester = ingest(tmp, [LUNG, UPPER_GI, BREAST])
+        assert first["chunks"] == first["chunks_embedded"] == len(ingester.model.encoded) > 0
+        version = get_index_version(tmp)
+
+        again, ingester = ingest(tmp, [LUNG, UPPER_GI, BREAST])
+        assert again["pages_unchanged"] == 3 and again["chunks_embedded"] == 0
+        assert again["chunks_deleted"] == 0 and ingester.model.encoded == []
+        assert get_index_version(tmp) == version
+
+
+def test_add_modify_delete():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, before = ingest(tmp, [LUNG, UPPER_GI, BREAST])
+        old_ids = set(before.backend.get()["ids"])
+        version = get_index_version(tmp)
+
+        modified_gi = page("1.2", "Upper gastrointestinal tract cancers", [
+            "Offer urgent endoscopy to people with dysphagia. [2015]",
+            "Offer urgent endoscopy to people aged 55 and over with weight loss and reflux. [2023]",
+        ])
+        new_page = page("1.4", "Gynaecological cancers", [
+            "Refer people with postmenopausal bleeding. [2015]",
+        ])
+        # Page 3 (breast) is dropped, page 2 is edited and a new page 3 is added
+        stats, after = ingest(tmp, [LUNG, modified_gi, new_page])
+
+        assert stats["pages_unchanged"] == 1
+        encoded = after.model.encoded
+        assert len(encoded) == stats["chunks_embedded"] == 2
+        assert any("weight loss and reflux" in text for text in encoded)
+        assert any("postmenopausal bleeding" in text for text in encoded)
+
+        stored = after.backend.get()
+        new_ids = set(stored["ids"])
+        assert len(new_ids) == stats["chunks"]
+        # The edited recommendation and the dropped breast page are gone
+        assert stats["chunks_deleted"] == len(old_ids - new_ids) == 2
+        assert not any("breast lump" in text for text in stored["documents"])
+        assert get_index_version(tmp) != version
+
+
+def test_moved_chunks_keep_their_embeddings():
+    with tempfile.TemporaryDirectory() as tmp:
+        ingest(tmp, [LUNG, UPPER_GI])
+        preface = {"paragraphs": ["Suspected cancer: recognition and referral (NG12)"], "tables": []}
+        stats, after = ingest(tmp, [preface, LUNG, UPPER_GI])
+
+        assert stats["chunks_moved"] > 0 and stats["chunks_deleted"] == 0
+        assert all("NG12" in text for text in after.model.encoded)
+        stored = after.backend.get()
+        lung = [m["page"] for m, text in zip(stored["metadatas"], stored["documents"]) if "haemoptysis" in text]
+        assert lung == [2]
+
+
+def test_duplicate_follows_to_its_unchanged_page():
+    skin = page("1.5", "Skin cancers", [
+        "Refer people with a suspicious pigmented skin lesion. [2015]",
+    ])
+    with tempfile.TemporaryDirectory() as tmp:
+        # The same text on pages 1 and 3 is stored once, under page 1
+        ingest(tmp, [skin, LUNG, skin])
+        # Page 1 now drops it; page 3 still reads the same and is not re-chunked
+        stats, after = ingest(tmp, [UPPER_GI, LUNG, skin])
+
+        assert stats["pages_unchanged"] == 1 and stats["chunks_moved"] == 1
+        assert not any("pigmented" in text for text in after.model.encoded)
+        stored = after.backend.get()
+        skin_pages = [m["page"] for m, text in zip(stored["metadatas"], stored["documents"]) if "pigmented" in text]
+        assert skin_pages == [3]
+
+        # The repaired page is in the manifest, so the next run has nothing to do
+        again, _ = ingest(tmp, [UPPER_GI, LUNG, skin])
+        assert again["chunks_moved"] == 0 and again["chunks_embedded"] == 0
+
+
+if __name__ == "__main__":
+    print("Testing incremental ingestion...")
+    tests = [
+        test_unchanged_pdf_does_no_work,
+        test_add_modify_delete,
+        test_moved_chunks_keep_their_embeddings,
+        test_duplicate_follows_to_its_unchanged_page,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Check the streaming ingestion stages: bounded prefetch, the background
+upsert writer and the adaptive embedding batch size. Runs standalone or
+under pytest.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.rag.backends import NumpyBackend
+from app.rag.pipeline import AdaptiveBatchSize, BackgroundWriter, IngestionMetrics, prefetch
+
+
+class RecordingBackend(NumpyBackend):
+    """Backend that records upserts (and the thread making them) instead of storing them."""
+
+    def __init__(self, fail_after: int = None):
+        super().__init__("/nonexistent")
+        self.upserts = []
+        self.thread_names = set()
+        self.fail_after = fail_after
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        if self.fail_after is not None and len(self.upserts) >= self.fail_after:
+            raise RuntimeError("disk full")
+        self.thread_names.add(threading.current_thread().name)
+        self.upserts.append(list(ids))
+
+
+def test_prefetch_preserves_order_and_errors():
+    assert list(prefetch(range(100), maxsize=3)) == list(range(100))
+
+    def broken():
+        yield 1
+        raise ValueError("bad page")
+
+    seen = []
+    try:
+        for item in prefetch(broken()):
+            seen.append(item)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("producer error was swallowed")
+    assert seen == [1]
+
+
+def test_writer_batches_upserts_in_background():
+    backend = RecordingBackend()
+    metrics = IngestionMetrics()
+    writer = BackgroundWriter(backend, metrics, batch_size=10, max_pending=2).start()
+    for start in range(0, 25, 5):
+        ids = [f"c{i}" for i in range(start, start + 5)]
+        writer.put(ids, [[0.0]] * 5, ids, [{}] * 5)
+    writer.close()
+
+    assert [len(batch) for batch in backend.upserts] == [10, 10, 5]
+    assert sum(backend.upserts, []) == [f"c{i}" for i in range(25)]
+    assert backend.thread_names == {"ingest-writer"}
+    assert metrics.counts["upserts"] == 25
+
+
+def test_writer_surfaces_errors():
+    writer = BackgroundWriter(RecordingBackend(fail_after=0), IngestionMetrics(), batch_size=1).start()
+    writer.put(["a"], [[0.0]], ["a"], [{}])
+    try:
+        writer.close()
+    except RuntimeError:
+        return
+    raise AssertionError("write error was swallowed")
+
+
+def test_adaptive_batch_size():
+    size = AdaptiveBatchSize(initial=32, minimum=8, maximum=128, target_seconds=1.0)
+    size.observe(32, 0.1)
+    size.observe(64, 0.1)
+    size.observe(128, 0.1)
+    assert size.size == 128
+    # Partial batches don't change the size
+    size.observe(10, 5.0)
+    assert size.size == 128
+    for _ in range(5):
+        size.observe(size.size, 5.0)
+    assert size.size == 8
+
+
+if __name__ == "__main__":
+    print("Testing streaming ingestion stages...")
+    tests = [
+        test_prefetch_preserves_order_and_errors,
+        test_writer_batches_upserts_in_background,
+        test_writer_surfaces_errors,
+        test_adaptive_batch_size,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
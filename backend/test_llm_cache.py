@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Check the LLM response cache: key normalisation, memory and SQLite levels
+(the latter opt-in), TTL, the size bound, per-request bypass, replay mode,
+and the LLMClient wrapper the agents call through. Runs standalone or under
+pytest.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import app.cache as cache_module
+from app.cache import LLMCacheMiss, LLMResponseCache, get_llm_cache
+from app.llm import LLMClient, LLMProvider
+
+CONFIG = {"max_output_tokens": 1024, "temperature": 0.7}
+
+
+class CountingProvider(LLMProvider):
+    """Provider that records how often it is called."""
+
+    kind = "counting"
+
+    def __init__(self):
+        super().__init__("m")
+        self.count = 0
+
+    def generate(self, prompt, config):
+        self.count += 1
+        return f"answer {self.count}"
+
+    async def generate_async(self, prompt, config):
+        return self.generate(prompt, config)
+
+    async def stream(self, prompt, config):
+        self.count += 1
+        for text in ("streamed ", "answer"):
+            yield text
+
+
+def test_key_normalisation():
+    key = LLMResponseCache.make_key("What  is\nNG12?", "m", CONFIG)
+    assert key == LLMResponseCache.make_key("What is NG12?", "m", dict(reversed(list(CONFIG.items()))))
+    assert key != LLMResponseCache.make_key("What is NG12?", "other-model", CONFIG)
+    assert key != LLMResponseCache.make_key("What is NG12?", "m", {**CONFIG, "temperature": 0.0})
+
+
+def test_disk_level_survives_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "llm.db")
+        cache = LLMResponseCache(db_path=db_path)
+        cache.put("k", "cached answer", "m")
+        assert cache.get("k") == "cached answer"
+        assert cache.stats()["memory_hits"] == 1
+
+        restarted = LLMResponseCache(db_path=db_path)
+        assert restarted.get("k") == "cached answer"
+        assert restarted.get("k") == "cached answer"
+        stats = restarted.stats()
+        assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+        assert restarted.get("missing") is None
+        assert restarted.stats()["hit_rate"] == round(2 / 3, 4)
+
+
+def test_ttl_and_size_bound():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "llm.db")
+        cache = LLMResponseCache(ttl_seconds=0.05, db_path=db_path)
+        cache.put("k", "stale", "m")
+        time.sleep(0.1)
+        assert cache.get("k") is None
+        assert cache.stats()["disk_entries"] == 0
+
+        bounded = LLMResponseCache(max_entries=2, db_path=db_path, db_max_entries=3)
+        # The disk bound is enforced every 100 writes
+        for i in range(101):
+            bounded.put(f"k{i}", str(i), "m")
+        stats = bounded.stats()
+        assert stats["memory_entries"] == 2 and stats["disk_entries"] == 3
+        assert bounded.get("k100") == "100" and bounded.get("k0") is None
+
+
+def test_client_caches_and_bypasses():
+    model = CountingProvider()
+    client = LLMClient(model, cache=LLMResponseCache())
+    assert client.generate("prompt", CONFIG) == "answer 1"
+    assert client.generate("prompt", CONFIG) == "answer 1"
+    assert model.count == 1
+
+    # Bypass calls the model and refreshes the cached answer
+    assert client.generate("prompt", CONFIG, bypass_cache=True) == "answer 2"
+    assert client.generate("prompt", CONFIG) == "answer 2"
+    assert model.count == 2 and client.cache.stats()["bypassed"] == 1
+
+    async def run():
+        assert await client.generate_async("other", CONFIG) == "answer 3"
+        assert await client.generate_async("other", CONFIG) == "answer 3"
+        first = [t async for t in client.stream("streamed", CONFIG)]
+        second = [t async for t in client.stream("streamed", CONFIG)]
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == ["streamed ", "answer"] and second == ["streamed answer"]
+    assert model.count == 4
+
+
+def test_replay_mode_fails_on_miss():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "llm.db")
+        recorder = LLMClient(CountingProvider(), cache=LLMResponseCache(db_path=db_path))
+        recorder.generate("recorded", CONFIG)
+
+        model = CountingProvider()
+        replay = LLMClient(model, cache=LLMResponseCache(db_path=db_path, mode="replay"))
+        assert replay.generate("recorded", CONFIG) == "answer 1"
+        try:
+            replay.generate("not recorded", CONFIG)
+        except LLMCacheMiss:
+            pass
+        else:
+            raise AssertionError("replay mode called the model on a miss")
+        assert model.count == 0
+
+
+def test_disk_level_is_opt_in():
+    saved = os.environ.pop("LLM_CACHE_DB_PATH", None)
+    original = cache_module._llm_cache
+    cache_module._llm_cache = None
+    try:
+        assert get_llm_cache().stats()["disk_entries"] is None
+    finally:
+        cache_module._llm_cache = original
+        if saved is not None:
+            os.environ["LLM_CACHE_DB_PATH"] = saved
+
+
+if __name__ == "__main__":
+    print("Testing LLM response cache...")
+    tests = [
+        test_key_normalisation,
+        test_disk_level_survives_restart,
+        test_ttl_and_size_bound,
+        test_client_caches_and_bypasses,
+        test_replay_mode_fails_on_miss,
+        test_disk_level_is_opt_in,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
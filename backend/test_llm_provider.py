@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Check the LLM provider layer: the local stand-in's deterministic answers,
+latency distributions, streaming and failure injection, provider selection,
+the LLMProvider interface and the call accounting LLMClient reports. Runs
+standalone or under pytest.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.llm import GeminiProvider, LLMClient, LLMProvider, LLMProviderError, LLMResilience, LocalProvider, create_llm_provider
+
+CONFIG = {"max_output_tokens": 1024, "temperature": 0.7}
+ASSESS_PROMPT = (
+    "Assess this patient:\nRule-based pre-triage suggests: Urgent Referral. Weight loss (rule x)\n"
+    "Provide your assessment as JSON with keys: recommendation, reasoning"
+)
+
+
+def test_answers_are_deterministic():
+    a = LocalProvider(latency=0, token_delay=0, seed=1)
+    b = LocalProvider(latency=0, token_delay=0, seed=2)
+    assessment = json.loads(a.generate(ASSESS_PROMPT, CONFIG))
+    assert assessment["recommendation"] == "Urgent Referral"
+    answer = a.generate("User: When should I refer cough?\n\nAssistant:", CONFIG)
+    assert answer == b.generate("User: When should I refer cough?\n\nAssistant:", CONFIG)
+    assert "[Source: NG12, page" in answer and len(answer.split()) == 80
+
+
+def test_latency_distributions():
+    fixed = LocalProvider(latency=0.2, distribution="fixed")
+    assert all(fixed._first_token_delay()[0] == 0.2 for _ in range(10))
+    lognormal = LocalProvider(latency=0.2, distribution="lognormal", spread=0.5, seed=3)
+    samples = [lognormal._first_token_delay()[0] for _ in range(4000)]
+    assert abs(sum(samples) / len(samples) - 0.2) < 0.02
+    assert max(samples) > 0.4
+    again = LocalProvider(latency=0.2, distribution="lognormal", spread=0.5, seed=3)
+    assert [again._first_token_delay()[0] for _ in range(5)] == samples[:5]
+
+
+def test_streaming_and_failure_injection():
+    provider = LocalProvider(latency=0.01, token_delay=0.001)
+
+    async def collect(p):
+        return [chunk async for chunk in p.stream("User: hi\n\nAssistant:", CONFIG)]
+
+    chunks = asyncio.run(collect(provider))
+    assert len(chunks) > 1
+    assert "".join(chunks) == provider.generate("User: hi\n\nAssistant:", CONFIG)
+
+    failing = LocalProvider(latency=0, token_delay=0, failure_rate=1.0)
+    for call in (lambda: failing.generate("x", CONFIG), lambda: asyncio.run(collect(failing))):
+        try:
+            call()
+        except LLMProviderError:
+            pass
+        else:
+            raise AssertionError("injected failure not raised")
+    assert failing.stats()["injected_failures"] == 2
+
+    stalling = LocalProvider(latency=0, token_delay=0, stall_rate=1.0, stall_seconds=0.05)
+    start = time.perf_counter()
+    stalling.generate("x", CONFIG)
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_client_records_provider_calls():
+    provider = LocalProvider(latency=0.01, token_delay=0, failure_rate=0.0)
+    client = LLMClient(provider, resilience=LLMResilience(retries=0))
+    client.cache = None
+    asyncio.run(client.generate_async("x", CONFIG))
+    provider.failure_rate = 1.0
+    try:
+        asyncio.run(client.generate_async("y", CONFIG))
+    except LLMProviderError:
+        pass
+    stats = provider.stats()
+    assert stats["provider"] == "local" and stats["calls"] == 2 and stats["errors"] == 1
+    assert stats["avg_latency_ms"] >= 10
+
+
+def gemini_response(text):
+    import google.ai.generativelanguage as glm
+
+    return glm.GenerateContentResponse(candidates=[{"content": {"role": "model", "parts": [{"text": text}]}}])
+
+
+class FakeGeminiTransport:
+    """Stands in for the SDK's gRPC clients, below GenerativeModel's request building."""
+
+    def __init__(self):
+        self.requests = []
+
+    def generate_content(self, request):
+        self.requests.append(request)
+        return gemini_response("sync answer")
+
+
+class FakeGeminiAsyncTransport(FakeGeminiTransport):
+    async def generate_content(self, request):
+        self.requests.append(request)
+        return gemini_response("async answer")
+
+    async def stream_generate_content(self, request):
+        self.requests.append(request)
+
+        async def chunks():
+            for text in ("streamed ", "answer"):
+                yield gemini_response(text)
+
+        return chunks()
+
+
+def test_gemini_calls_match_sdk_signature():
+    # Runs the installed google-generativeai's own generate_content, so keyword
+    # arguments it doesn't accept fail here rather than in production
+    provider = GeminiProvider("gemini-1.5-pro", api_key="test-key")
+    provider.model._client = FakeGeminiTransport()
+    provider.model._async_client = FakeGeminiAsyncTransport()
+
+    async def collect():
+        return [chunk async for chunk in provider.stream("hi", CONFIG)]
+
+    assert provider.generate("hi", CONFIG) == "sync answer"
+    assert asyncio.run(provider.generate_async("hi", CONFIG)) == "async answer"
+    assert "".join(asyncio.run(collect())) == "streamed answer"
+    request = provider.model._client.requests[0]
+    assert request.generation_config.max_output_tokens == 1024
+
+    client = LLMClient(provider, resilience=LLMResilience(retries=0))
+    client.cache = None
+    assert client.generate("hi", CONFIG) == "sync answer"
+
+
+def test_provider_selection():
+    assert isinstance(create_llm_provider("local"), LocalProvider)
+    try:
+        create_llm_provider("nope")
+    except ValueError as e:
+        assert "nope" in str(e)
+    else:
+        raise AssertionError("unknown provider accepted")
+
+
+def test_incomplete_provider_fails_at_construction():
+    class BlockingOnly(LLMProvider):
+        def generate(self, prompt, config):
+            return "answer"
+
+    try:
+        BlockingOnly("m")
+    except TypeError as e:
+        assert "generate_async" in str(e) and "stream" in str(e)
+    else:
+        raise AssertionError("provider missing abstract methods was instantiated")
+
+
+if __name__ == "__main__":
+    print("Testing LLM providers...")
+    tests = [
+        test_answers_are_deterministic,
+        test_latency_distributions,
+        test_streaming_and_failure_injection,
+        test_client_records_provider_calls,
+        test_gemini_calls_match_sdk_signature,
+        test_provider_selection,
+        test_incomplete_provider_fails_at_construction,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
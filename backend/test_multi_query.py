@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Check rank fusion of per-symptom sub-query results: de-duplication by chunk
+ID, RRF ordering and the context token budget. Runs standalone or under
+pytest.
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.context import count_tokens
+from app.rag.retriever import RAGRetriever
+
+
+def backend_result(rankings):
+    """Chroma-shaped query result with one ranking (list of chunk IDs) per sub-query."""
+    return {
+        "ids": [list(ids) for ids in rankings],
+        "documents": [[f"text of {chunk_id} " * 10 for chunk_id in ids] for ids in rankings],
+        "metadatas": [[{"page": 1, "chunk_id": chunk_id} for chunk_id in ids] for ids in rankings],
+    }
+
+
+def test_fusion_deduplicates_and_ranks():
+    retriever = RAGRetriever("/nonexistent")
+    raw = backend_result([["a", "b", "c"], ["b", "d", "a"], ["e", "b", "f"]])
+    texts, citations = retriever._fuse_queries(raw, [0, 1, 2], top_k=4, rrf_k=60, max_tokens=None)
+
+    ids = [c.chunk_id for c in citations]
+    assert ids[0] == "b"  # ranked by all three sub-queries
+    assert ids[1] == "a"
+    assert len(ids) == len(set(ids)) == 4
+
+
+def test_fusion_respects_token_budget():
+    retriever = RAGRetriever("/nonexistent")
+    raw = backend_result([["a", "b", "c", "d"]])
+    per_chunk = count_tokens(raw["documents"][0][0])
+    texts, _ = retriever._fuse_queries(raw, [0], top_k=4, rrf_k=60, max_tokens=per_chunk * 2 + 1)
+    assert len(texts) == 2
+    # The best chunk is kept even if it alone exceeds the budget
+    texts, _ = retriever._fuse_queries(raw, [0], top_k=4, rrf_k=60, max_tokens=1)
+    assert len(texts) == 1
+
+
+if __name__ == "__main__":
+    print("Testing multi-query fusion...")
+    tests = [test_fusion_deduplicates_and_ranks, test_fusion_respects_token_budget]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Check the patient data store: streaming JSON/JSONL loading, lazy
+validation, symptom and age-band filters, pagination (and its bounds on
+/patients), bulk lookup and background mtime-based reload. Runs
+standalone or under pytest.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import app.tools.patient_tool as patient_tool
+from app.tools.patient_tool import PatientDataStore, age_band, iter_json_array
+
+SAMPLE = Path(__file__).parent / "app" / "data" / "patients.json"
+
+
+def patient(i: int, age: int, symptoms):
+    return {
+        "patient_id": f"PT-{i}",
+        "name": f"Patient {i}",
+        "age": age,
+        "symptoms": symptoms,
+        "medical_history": [],
+        "risk_factors": [],
+    }
+
+
+COHORT = [
+    patient(1, 55, ["Unexplained hemoptysis", "fatigue"]),
+    patient(2, 62, ["persistent cough"]),
+    patient(3, 58, ["weight loss", "persistent cough"]),
+    patient(4, 41, ["dysphagia"]),
+]
+
+
+def test_streaming_parser_matches_json_load():
+    original = patient_tool._READ_SIZE
+    patient_tool._READ_SIZE = 37  # force records across read boundaries
+    try:
+        assert list(iter_json_array(SAMPLE)) == json.loads(SAMPLE.read_text())
+    finally:
+        patient_tool._READ_SIZE = original
+
+
+def test_jsonl_and_lazy_validation():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "patients.jsonl"
+        path.write_text("\n".join(json.dumps(p) for p in COHORT) + "\n")
+        store = PatientDataStore(str(path))
+        assert store.count() == 4
+        assert store.stats()["validated"] == 0
+        assert store.get_patient("PT-2").symptoms == ["persistent cough"]
+        assert store.stats()["validated"] == 1
+
+
+def test_filters_and_pagination():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "patients.json"
+        path.write_text(json.dumps(COHORT))
+        store = PatientDataStore(str(path))
+        assert age_band(55) == "50-59"
+        assert store.filter_ids(symptom="COUGH") == ["PT-2", "PT-3"]
+        assert store.filter_ids(symptom="hemoptysis", age_band="50-59") == ["PT-1"]
+        assert store.filter_ids(min_age=50, max_age=60) == ["PT-1", "PT-3"]
+        page = store.list_patients(offset=1, limit=2)
+        assert [p["patient_id"] for p in page] == ["PT-2", "PT-3"]
+        assert set(store.get_many(["PT-4", "PT-9", "PT-1"])) == {"PT-4", "PT-1"}
+
+
+def touch(path: Path):
+    """Bump the mtime so the change is seen even within the filesystem's resolution."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_reload_on_change():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "patients.json"
+        path.write_text(json.dumps(COHORT[:2]))
+        store = PatientDataStore(str(path), reload_interval=0)
+        before = store.get_fingerprint("PT-2")
+
+        edited = [COHORT[0], patient(2, 63, ["persistent cough"]), COHORT[3]]
+        path.write_text(json.dumps(edited))
+        touch(path)
+
+        # The reload runs in the background; requests keep the old snapshot meanwhile
+        release = threading.Event()
+        load = store._load_patients
+
+        def slow_load():
+            release.wait(5)
+            return load()
+
+        store._load_patients = slow_load
+        assert store.count() == 2
+        assert store.get_patient("PT-2").age == 62
+        release.set()
+        assert store.wait_for_reload(5)
+
+        assert store.count() == 3
+        assert store.get_patient("PT-2").age == 63
+        assert store.get_fingerprint("PT-2") != before
+        assert store.stats()["reloads"] == 1
+
+
+def test_failed_reload_keeps_last_good_load():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "patients.json"
+        path.write_text(json.dumps(COHORT))
+        store = PatientDataStore(str(path), reload_interval=0)
+
+        path.write_text(json.dumps(COHORT)[:40])  # caught mid-write
+        touch(path)
+        store.count()
+        assert store.wait_for_reload(5)
+        assert store.count() == 4 and store.stats()["reloads"] == 0
+        assert store.wait_for_reload(5)  # those checks retried the broken file
+
+        path.write_text(json.dumps(COHORT[:1]))
+        touch(path)
+        store.count()
+        assert store.wait_for_reload(5)
+        assert store.count() == 1 and store.stats()["reloads"] == 1
+
+
+def test_patients_endpoint_validates_pagination():
+    from fastapi.testclient import TestClient
+    from app.main import PATIENTS_MAX_PAGE, app
+
+    client = TestClient(app)
+    for params in ({"offset": -1}, {"limit": -1}, {"limit": PATIENTS_MAX_PAGE + 1}):
+        assert client.get("/patients", params=params).status_code == 422, params
+    response = client.get("/patients", params={"offset": 1, "limit": 2})
+    assert response.status_code == 200 and len(response.json()) == 2
+    assert int(response.headers["X-Total-Count"]) > 2
+
+
+if __name__ == "__main__":
+    print("Testing patient data store...")
+    tests = [
+        test_streaming_parser_matches_json_load,
+        test_jsonl_and_lazy_validation,
+        test_filters_and_pagination,
+        test_reload_on_change,
+        test_failed_reload_keeps_last_good_load,
+        test_patients_endpoint_validates_pagination,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Check LLM call resilience against the fault-injecting local provider:
+per-attempt timeouts, retries with backoff, the circuit breaker (including
+half-open trials that are cancelled or rejected as bad requests), hedged
+requests, and the agents' fallbacks when the LLM is unavailable. Runs
+standalone or under pytest.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.cache import LLMResponseCache
+from app.llm import CircuitBreaker, LLMClient, LLMResilience, LLMUnavailable, LocalProvider
+
+CONFIG = {"max_output_tokens": 1024, "temperature": 0.7}
+
+
+def client(provider, **policy):
+    policy.setdefault("backoff_base", 0.001)
+    return LLMClient(provider, cache=LLMResponseCache(), resilience=LLMResilience(seed=0, **policy))
+
+
+def expect_unavailable(call):
+    try:
+        call()
+    except LLMUnavailable as e:
+        return e
+    raise AssertionError("LLMUnavailable not raised")
+
+
+def test_timeout_then_retry_succeeds():
+    provider = LocalProvider(latency=0.01, token_delay=0, stall_rate=1.0, stall_seconds=5)
+    llm = client(provider, timeout=0.1, retries=2)
+
+    async def run():
+        task = asyncio.ensure_future(llm.generate_async("User: hi\n\nAssistant:", CONFIG))
+        await asyncio.sleep(0.15)
+        provider.stall_rate = 0.0  # the vendor recovers
+        return await task
+
+    start = time.perf_counter()
+    assert asyncio.run(run()).startswith("Based on NG12")
+    assert time.perf_counter() - start < 1
+    stats = llm.resilience.stats()
+    assert stats["timeouts"] >= 1 and stats["retries"] >= 1 and stats["breaker"]["state"] == "closed"
+
+
+def test_retries_are_bounded():
+    provider = LocalProvider(latency=0, token_delay=0, failure_rate=1.0)
+    llm = client(provider, retries=2)
+    error = expect_unavailable(lambda: llm.generate("x", CONFIG))
+    assert "3 attempt" in str(error)
+    assert provider.stats()["calls"] == 3
+    # Sync calls are bounded by the per-attempt timeout too, even though the
+    # provider itself has no timeout
+    slow = client(LocalProvider(latency=0.5, distribution="fixed", token_delay=0), timeout=0.05, retries=0)
+    start = time.perf_counter()
+    expect_unavailable(lambda: slow.generate("x", CONFIG))
+    assert time.perf_counter() - start < 0.3
+    assert slow.resilience.stats()["timeouts"] == 1
+
+
+def test_breaker_opens_and_recovers():
+    provider = LocalProvider(latency=0, token_delay=0, failure_rate=1.0)
+    llm = client(provider, retries=0, breaker=CircuitBreaker(failure_threshold=3, reset_seconds=0.1))
+    for _ in range(3):
+        expect_unavailable(lambda: llm.generate("x", CONFIG))
+    error = expect_unavailable(lambda: llm.generate("x", CONFIG))
+    assert "circuit breaker is open" in str(error)
+    assert provider.stats()["calls"] == 3
+
+    provider.failure_rate = 0.0
+    time.sleep(0.15)
+    assert llm.generate("x", CONFIG).startswith("Based on NG12")
+    assert llm.resilience.breaker.state == "closed"
+
+
+class BadRequest(Exception):
+    code = 400
+
+
+class ScriptedProvider(LocalProvider):
+    """Local provider that raises `error` instead of answering while it is set."""
+
+    error = None
+
+    async def generate_async(self, prompt, config):
+        if self.error is not None:
+            raise self.error
+        return await super().generate_async(prompt, config)
+
+
+def open_breaker(provider, llm):
+    provider.failure_rate = 1.0
+    expect_unavailable(lambda: asyncio.run(llm.generate_async("x", CONFIG)))
+    assert llm.resilience.breaker.state == "open"
+    provider.failure_rate = 0.0
+    time.sleep(0.06)
+
+
+def test_breaker_trial_released_after_bad_request():
+    provider = ScriptedProvider(latency=0, token_delay=0)
+    llm = client(provider, retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=0.05))
+    llm.cache = None
+    open_breaker(provider, llm)
+
+    # The trial call reaches the provider, which rejects the request itself
+    provider.error = BadRequest("invalid argument")
+    try:
+        asyncio.run(llm.generate_async("x", CONFIG))
+    except BadRequest:
+        pass
+    else:
+        raise AssertionError("non-retryable error not raised")
+    assert llm.resilience.breaker.state == "closed"
+    provider.error = None
+    assert asyncio.run(llm.generate_async("x", CONFIG)).startswith("Based on NG12")
+
+
+def test_breaker_trial_released_after_cancel():
+    provider = ScriptedProvider(latency=0, distribution="fixed", token_delay=0)
+    llm = client(provider, retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=0.05))
+    llm.cache = None
+    open_breaker(provider, llm)
+
+    async def cancel_trial():
+        provider.latency = 1.0
+        task = asyncio.ensure_future(llm.generate_async("x", CONFIG))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        provider.latency = 0.0
+
+    asyncio.run(cancel_trial())
+    # A cancelled trial proves nothing either way, so the next call becomes the trial
+    assert llm.resilience.breaker.state == "half_open"
+    assert asyncio.run(llm.generate_async("x", CONFIG)).startswith("Based on NG12")
+    assert llm.resilience.breaker.state == "closed"
+
+
+class OneSlowCall(LocalProvider):
+    """Local provider whose next call, once armed, takes an extra second."""
+
+    slow_next = False
+
+    def _first_token_delay(self):
+        delay, fail = super()._first_token_delay()
+        if self.slow_next:
+            self.slow_next = False
+            delay += 1.0
+        return delay, fail
+
+
+def test_hedging_cuts_tail_latency():
+    provider = OneSlowCall(latency=0.02, distribution="fixed", token_delay=0)
+    llm = client(provider, hedge=True, hedge_quantile=0.95, hedge_min_delay=0.01)
+    llm.cache = None
+
+    async def run():
+        for i in range(LLMResilience.HEDGE_MIN_SAMPLES):
+            await llm.generate_async(f"warm {i}", CONFIG)
+        # The next call is slow; its hedge answers at normal speed
+        provider.slow_next = True
+        start = time.perf_counter()
+        await llm.generate_async("slow", CONFIG)
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    stats = llm.resilience.stats()
+    assert elapsed < 0.5 and stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_stale_answer_served_when_bypassing():
+    provider = LocalProvider(latency=0, token_delay=0)
+    llm = client(provider, retries=0)
+    cached = llm.generate("x", CONFIG)
+    provider.failure_rate = 1.0
+    assert llm.generate("x", CONFIG, bypass_cache=True) == cached
+
+
+def test_agents_fall_back():
+    from app.agents.chat_agent import ChatAgent
+    from app.agents.clinical_agent import ClinicalDecisionAgent
+    from app.schemas.models import Citation
+
+    provider = LocalProvider(latency=0, token_delay=0, failure_rate=1.0)
+    citations = [Citation(source="NG12 PDF", page=7, chunk_id="fallback_1", excerpt="Refer urgently for chest X-ray.")]
+
+    clinical = ClinicalDecisionAgent()
+    clinical.llm = client(provider, retries=0)
+    patient = {"patient_id": "PT-F", "name": "F", "age": 50, "symptoms": ["fatigue"], "medical_history": [], "risk_factors": []}
+    assessment = asyncio.run(clinical._generate_async(patient, ["text"], citations, ("v",), True))
+    assert assessment.decision_path == "llm_unavailable" and assessment.recommendation == "Urgent Referral"
+    assert assessment.citations == citations
+
+    chat = ChatAgent()
+    chat.llm = client(provider, retries=0)
+    chat._retrieve_async = lambda *args, **kwargs: asyncio.sleep(0, (["text"], citations))
+    response = asyncio.run(chat.chat_async("s", "When should I refer?", [], bypass_cache=True))
+    assert response.degraded and "[Source: NG12, page 7]" in response.answer
+
+    async def stream():
+        return [event async for event in chat.chat_stream("s", "When should I refer?", [], bypass_cache=True)]
+
+    events = asyncio.run(stream())
+    assert [e for e, _ in events] == ["citations", "token", "done"]
+    assert "page 7" in events[-1][1]
+
+
+if __name__ == "__main__":
+    print("Testing LLM resilience...")
+    tests = [
+        test_timeout_then_retry_succeeds,
+        test_retries_are_bounded,
+        test_breaker_opens_and_recovers,
+        test_breaker_trial_released_after_bad_request,
+        test_breaker_trial_released_after_cancel,
+        test_hedging_cuts_tail_latency,
+        test_stale_answer_served_when_bypassing,
+        test_agents_fall_back,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
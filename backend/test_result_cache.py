@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Check the version-stamped result cache behind retrieval and assessment
+caching: stale-version misses, TTL and LRU bounds, cosine-threshold reuse of
+near-duplicate queries, and retrieval invalidation when the collection is
+re-ingested. Runs standalone or under pytest.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.cache import ResultCache
+
+
+def test_stale_version_is_a_miss():
+    cache = ResultCache()
+    cache.put("PT-101", "assessment v1", version="v1")
+    assert cache.get("PT-101", "v1") == "assessment v1"
+    assert cache.get("PT-101", "v2") is None
+    # The stale entry is dropped, so the old version doesn't come back either
+    assert cache.get("PT-101", "v1") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["stale"] == 1 and stats["entries"] == 0
+
+
+def test_ttl_and_lru_bounds():
+    cache = ResultCache(max_entries=2, ttl_seconds=0.05)
+    cache.put("a", 1, "v")
+    cache.put("b", 2, "v")
+    assert cache.get("a", "v") == 1  # "a" is now most recently used
+    cache.put("c", 3, "v")
+    assert cache.get("b", "v") is None and cache.get("a", "v") == 1 and cache.get("c", "v") == 3
+    time.sleep(0.06)
+    assert cache.get("a", "v") is None and cache.stats()["stale"] == 1
+
+
+def test_near_duplicates_reuse_within_threshold():
+    cache = ResultCache(similarity_threshold=0.95)
+    cache.put("persistent cough", "cough chunks", "v1", embedding=[1.0, 0.0, 0.0], group=(5,))
+
+    # cos = 0.995 (vectors needn't be normalised)
+    assert cache.get_similar([2.0, 0.2, 0.0], "v1", group=(5,)) == "cough chunks"
+    # cos = 0.707: a different question
+    assert cache.get_similar([1.0, 1.0, 0.0], "v1", group=(5,)) is None
+    # Same vector, but a different version or top_k/section group
+    assert cache.get_similar([1.0, 0.0, 0.0], "v2", group=(5,)) is None
+    assert cache.get_similar([1.0, 0.0, 0.0], "v1", group=(3,)) is None
+    assert cache.stats()["near_duplicate_hits"] == 1
+
+    # Without a threshold, only exact keys are reused
+    exact_only = ResultCache()
+    exact_only.put("persistent cough", "cough chunks", "v1", embedding=[1.0, 0.0, 0.0], group=(5,))
+    assert exact_only.get_similar([1.0, 0.0, 0.0], "v1", group=(5,)) is None
+
+
+def test_retrieval_invalidated_by_reingestion():
+    from app.rag.registry import bump_index_version
+    from app.rag.retriever import RAGRetriever
+
+    with tempfile.TemporaryDirectory() as tmp:
+        retriever = RAGRetriever(tmp)
+        searches = []
+
+        def fake_search(query_embedding, top_k, where=None):
+            searches.append(query_embedding)
+            return {
+                "documents": [[f"NG12 chunk {len(searches)}"]],
+                "metadatas": [[{"page": 1, "chunk_id": f"cache_{len(searches)}"}]],
+                "distances": [[0.1]],
+            }
+
+        retriever._embed = lambda query: [1.0, 0.0]
+        retriever._search = fake_search
+
+        first, _ = retriever.retrieve("When should I refer haemoptysis?", top_k=1)
+        again, _ = retriever.retrieve("when should I refer  haemoptysis?", top_k=1)
+        assert again == first and len(searches) == 1
+
+        bump_index_version(tmp)
+        fresh, _ = retriever.retrieve("When should I refer haemoptysis?", top_k=1)
+        assert len(searches) == 2 and fresh != first
+
+
+if __name__ == "__main__":
+    print("Testing result cache...")
+    tests = [
+        test_stale_version_is_a_miss,
+        test_ttl_and_lru_bounds,
+        test_near_duplicates_reuse_within_threshold,
+        test_retrieval_invalidated_by_reingestion,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
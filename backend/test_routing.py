@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Check the symptom -> NG12 section routing index.
+Runs standalone or under pytest.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.rag.routing import RoutingIndex, match_concepts
+
+
+CHUNKS = [
+    ("c1", "1.1 Lung and pleural cancers > Lung cancer\n1.1.1 Refer people aged 40 and over with unexplained haemoptysis.", "1.1"),
+    ("c2", "1.2 Upper gastrointestinal tract cancers > Oesophageal cancer\n1.2.1 Offer endoscopy to people with dysphagia.", "1.2"),
+    ("c3", "1.3 Lower gastrointestinal tract cancers\n1.3.1 Refer people with rectal bleeding and weight loss.", "1.3"),
+]
+
+
+def build_index() -> RoutingIndex:
+    ids = [chunk_id for chunk_id, _, _ in CHUNKS]
+    texts = [text for _, text, _ in CHUNKS]
+    metadatas = [{"section_id": section_id} for _, _, section_id in CHUNKS]
+    return RoutingIndex.build(ids, texts, metadatas)
+
+
+def test_concepts_match_spelling_variants():
+    assert match_concepts("unexplained hemoptysis") == ["haemoptysis"]
+    assert match_concepts("Loss of appetite") == ["appetite loss"]
+    assert match_concepts("itchy ears") == []
+
+
+def test_route_symptoms_to_sections():
+    index = build_index()
+    assert index.route(["unexplained hemoptysis"]) == ["1.1"]
+    assert index.route(["dysphagia", "weight loss"]) == ["1.2", "1.3"]
+    assert index.route(["itchy ears"]) == []
+
+
+def test_save_and_load():
+    index = build_index()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "routing_index.json")
+        index.save(path)
+        assert RoutingIndex.load(path).concepts == index.concepts
+
+
+if __name__ == "__main__":
+    print("Testing symptom routing index...")
+    tests = [
+        test_concepts_match_spelling_variants,
+        test_route_symptoms_to_sections,
+        test_save_and_load,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
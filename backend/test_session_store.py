@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Check both chat session backends (in-memory LRU and SQLite/WAL): reads
+don't create sessions, citations shared by chunk ID, per-session message
+caps, TTL expiry, LRU eviction, byte accounting, sharing a SQLite store
+between instances, the sweeper logging failed sweeps and carrying on, and
+the SessionStore interface rejecting incomplete backends. Runs standalone
+or under pytest.
+"""
+
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.memory.session_store import MemorySessionStore, SessionStore, SQLiteSessionStore
+from app.schemas.models import Citation
+
+
+def with_stores(test, **limits):
+    """Run `test(store)` against a fresh store of each backend."""
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in (
+            MemorySessionStore(**limits),
+            SQLiteSessionStore(db_path=str(Path(tmp) / "sessions.db"), **limits),
+        ):
+            try:
+                test(store)
+            finally:
+                store.close()
+
+
+def test_read_does_not_create_session():
+    def check(store):
+        assert store.get_session("missing") == []
+        assert store.list_sessions() == []
+        assert store.stats()["active_sessions"] == 0
+    with_stores(check)
+
+
+def test_messages_and_citations_round_trip():
+    def check(store):
+        citation = {"source": "NG12 PDF", "page": 3, "chunk_id": "c1", "excerpt": "refer"}
+        store.add_message("s1", "user", "question")
+        store.add_message("s1", "assistant", "answer", citations=[citation])
+        messages = store.get_session("s1")
+        assert [m.role for m in messages] == ["user", "assistant"]
+        assert messages[1].citations[0].page == 3
+        stats = store.stats()
+        assert stats["messages"] == 2 and stats["bytes"] > 0
+        store.clear_session("s1")
+        assert store.get_session("s1") == [] and store.stats()["bytes"] == 0
+    with_stores(check)
+
+
+def test_citations_are_shared_by_chunk_id():
+    def check(store):
+        citation = Citation(source="NG12 PDF", page=5, chunk_id="shared-chunk", excerpt="refer")
+        store.add_message("s1", "assistant", "one", citations=[citation])
+        store.add_message("s2", "assistant", "two", citations=[citation.model_dump()])
+        first, second = store.get_session("s1")[0], store.get_session("s2")[0]
+        assert first.citation_ids == second.citation_ids == ("shared-chunk",)
+        assert first.citations[0] is second.citations[0]
+        # Pydantic only at the API boundary
+        assert first.to_chat_message().citations[0].page == 5
+    with_stores(check)
+
+
+def test_message_cap_drops_oldest():
+    def check(store):
+        for i in range(7):
+            store.add_message("s1", "user", f"message {i}")
+        assert [m.content for m in store.get_session("s1")] == [f"message {i}" for i in range(4, 7)]
+        assert store.stats()["messages"] == 3
+    with_stores(check, max_messages=3)
+
+
+def test_ttl_expiry_and_sweep():
+    def check(store):
+        store.add_message("old", "user", "hello")
+        time.sleep(0.3)
+        store.add_message("new", "user", "hello")
+        assert store.sweep() == 1
+        assert store.list_sessions() == ["new"]
+        assert store.stats()["expired"] == 1
+    with_stores(check, ttl_seconds=0.2)
+
+
+def test_session_cap_evicts_least_recent():
+    def check(store):
+        for session_id in ("a", "b"):
+            store.add_message(session_id, "user", "hi")
+            time.sleep(0.01)
+        store.get_session("a")  # refreshes "a"
+        time.sleep(0.01)
+        store.add_message("c", "user", "hi")
+        store.sweep()
+        assert sorted(store.list_sessions()) == ["a", "c"]
+    with_stores(check, max_sessions=2)
+
+
+def test_sqlite_store_is_shared():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "sessions.db")
+        writer, reader = SQLiteSessionStore(db_path=path), SQLiteSessionStore(db_path=path)
+        writer.add_message("s1", "user", "from another worker")
+        assert [m.content for m in reader.get_session("s1")] == ["from another worker"]
+        writer.close()
+        reader.close()
+
+
+def test_sweeper_logs_failures_and_keeps_running():
+    store = MemorySessionStore()
+    sweeps = []
+
+    def failing_sweep():
+        sweeps.append(1)
+        raise RuntimeError("database is locked")
+
+    store.sweep = failing_sweep
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("app.memory.session_store")
+    logger.addHandler(handler)
+
+    async def run():
+        task = asyncio.ensure_future(store.run_sweeper(interval=0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    try:
+        asyncio.run(run())
+    finally:
+        logger.removeHandler(handler)
+    assert len(sweeps) > 1
+    assert records and records[0].getMessage() == "Session sweep failed" and records[0].exc_info
+
+
+def test_incomplete_store_fails_at_construction():
+    class ReadOnlyStore(SessionStore):
+        def get_session(self, session_id):
+            return []
+
+    try:
+        ReadOnlyStore()
+    except TypeError as e:
+        assert "add_message" in str(e)
+    else:
+        raise AssertionError("store missing abstract methods was instantiated")
+
+
+if __name__ == "__main__":
+    print("Testing session stores...")
+    tests = [
+        test_read_does_not_create_session,
+        test_messages_and_citations_round_trip,
+        test_citations_are_shared_by_chunk_id,
+        test_message_cap_drops_oldest,
+        test_ttl_expiry_and_sweep,
+        test_session_cap_evicts_least_recent,
+        test_sqlite_store_is_shared,
+        test_sweeper_logs_failures_and_keeps_running,
+        test_incomplete_store_fails_at_construction,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
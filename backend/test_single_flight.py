@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Check request coalescing: concurrent identical calls share one in-flight
+computation (threads and asyncio), errors reach every waiter, a cancelled
+caller doesn't cancel the shared work, and concurrent /assess-style calls
+for one patient make a single LLM call. Runs standalone or under pytest.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.concurrency import SingleFlight
+
+
+def test_async_calls_share_one_flight():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work(x):
+        calls.append(x)
+        await asyncio.sleep(0.02)
+        return [x]
+
+    async def run():
+        same = await asyncio.gather(*(flight.do_async("a", work, 1) for _ in range(10)))
+        other = await flight.do_async("b", work, 2)
+        return same, other
+
+    same, other = asyncio.run(run())
+    assert calls == [1, 2]
+    assert all(result is same[0] for result in same) and other == [2]
+    stats = flight.stats()
+    assert stats["calls"] == 11 and stats["coalesced"] == 9 and stats["in_flight"] == 0
+
+
+def test_errors_and_cancellation():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("Patient not found: PT-X")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        results = await asyncio.gather(*(flight.do_async("x", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+        first = asyncio.ensure_future(flight.do_async("y", slow))
+        second = asyncio.ensure_future(flight.do_async("y", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_threads_share_one_flight():
+    flight = SingleFlight("test")
+    calls = []
+    results = []
+    start = threading.Barrier(5)
+
+    def work():
+        calls.append(1)
+        time.sleep(0.05)
+        return "result"
+
+    def caller():
+        start.wait()
+        results.append(flight.do("k", work))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and results == ["result"] * 5
+    assert flight.do("k", work) == "result" and len(calls) == 2
+
+
+def test_disabled_flight_runs_every_call():
+    flight = SingleFlight("test", enabled=False)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(flight.do_async("a", work) for _ in range(3)))
+
+    asyncio.run(run())
+    assert len(calls) == 3
+
+
+def test_concurrent_assessments_make_one_llm_call():
+    from app.agents.clinical_agent import ClinicalDecisionAgent
+    from app.llm import LocalProvider
+
+    agent = ClinicalDecisionAgent()
+    agent.llm.provider = LocalProvider(latency=0.05, token_delay=0)
+    agent.llm.cache = None
+    searches = []
+
+    def fake_search(query_embedding, top_k, where=None):
+        searches.append(1)
+        time.sleep(0.01)
+        return {
+            "documents": [[f"NG12 chunk {i}" for i in range(top_k)]],
+            "metadatas": [[{"page": 1, "chunk_id": f"coalesce_{i}"} for i in range(top_k)]],
+            "distances": [[0.1] * top_k],
+        }
+
+    agent.retriever._embed = lambda query: [0.0] * 384
+    agent.retriever._search = fake_search
+
+    async def run():
+        return await asyncio.gather(*(
+            agent.assess_patient_async("PT-102", bypass_cache=True) for _ in range(5)
+        ))
+
+    results = asyncio.run(run())
+    assert len({id(r) for r in results}) == 1
+    assert agent.llm.provider.calls == 1 and len(searches) == 1
+
+
+if __name__ == "__main__":
+    print("Testing request coalescing...")
+    tests = [
+        test_async_calls_share_one_flight,
+        test_errors_and_cancellation,
+        test_threads_share_one_flight,
+        test_disabled_flight_runs_every_call,
+        test_concurrent_assessments_make_one_llm_call,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
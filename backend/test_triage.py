@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Check the NG12 rule pre-triage: rule matching on symptom concepts, phrases,
+risk factors and age, rule table validation, and the decision path the
+clinical agent records. Runs standalone or under pytest.
+"""
+
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.tools.triage import RuleEngine
+
+RULES_PATH = Path(__file__).parent / "app" / "data" / "ng12_rules.json"
+
+
+def patient(symptoms, risk_factors=(), age=55, history=()):
+    return {
+        "patient_id": "PT-T",
+        "name": "Test Patient",
+        "age": age,
+        "symptoms": list(symptoms),
+        "medical_history": list(history),
+        "risk_factors": list(risk_factors),
+    }
+
+
+def test_red_flags_are_definitive():
+    engine = RuleEngine.load(str(RULES_PATH))
+    result = engine.evaluate(patient(["unexplained hemoptysis", "fatigue"]))
+    assert result.rule_id == "red-flag-haemoptysis"
+    assert result.recommendation == "Same-Day Referral" and result.definitive
+    assert engine.evaluate(patient(["severe chest pain"])).rule_id == "red-flag-severe-chest-pain"
+    assert engine.evaluate(patient(["chest wall pain"])) is None
+
+
+def test_most_severe_rule_wins():
+    engine = RuleEngine.load(str(RULES_PATH))
+    result = engine.evaluate(patient(["dysphagia", "shortness of breath", "weight loss"]))
+    assert result.rule_id == "red-flag-dysphagia-dyspnoea"
+    for wording in ("difficulty breathing", "breathing difficulty"):
+        result = engine.evaluate(patient(["difficulty swallowing", wording]))
+        assert result.rule_id == "red-flag-dysphagia-dyspnoea", wording
+        assert result.recommendation == "Same-Day Referral"
+
+
+def test_risk_factors_and_age():
+    engine = RuleEngine.load(str(RULES_PATH))
+    result = engine.evaluate(patient(["persistent cough"], ["previous smoker"]))
+    assert result.rule_id == "urgent-cough-smoking" and not result.definitive
+    assert engine.evaluate(patient(["persistent cough"], ["non-smoker"])) is None
+    assert engine.evaluate(patient(["persistent cough"], ["current smoker"], age=35)) is None
+    assert engine.evaluate(patient(["cough"], history=["smoking history"])).rule_id == "urgent-cough-smoking"
+
+
+def test_rule_table_is_validated():
+    table = {"version": "t", "rules": [{"id": "bad", "recommendation": "Urgent Referral", "any_symptoms": ["itch"]}]}
+    try:
+        RuleEngine(table)
+    except ValueError as e:
+        assert "itch" in str(e)
+    else:
+        raise AssertionError("unknown symptom concept accepted")
+
+
+def test_agent_records_decision_path():
+    from app.agents.clinical_agent import ClinicalDecisionAgent
+
+    agent = ClinicalDecisionAgent()
+    engine = RuleEngine.load(str(RULES_PATH))
+    red_flag = patient(["stridor"])
+    triage = engine.evaluate(red_flag)
+    assert agent._decides(triage)
+    assessment = agent._rule_response(red_flag, triage, [])
+    assert assessment.decision_path == "rules" and assessment.triage_rule == "red-flag-stridor"
+
+    prior = engine.evaluate(patient(["weight loss"]))
+    assert not agent._decides(prior)
+    parsed = agent._build_response(
+        red_flag, '{"recommendation": "Routine GP Screening", "reasoning": "x"}', [], prior
+    )
+    assert parsed.decision_path == "llm_with_prior" and parsed.recommendation == "Routine GP Screening"
+    unparsed = agent._build_response(red_flag, "not json", [], prior)
+    assert unparsed.decision_path == "llm_unparsed" and unparsed.recommendation == "Urgent Referral"
+
+
+if __name__ == "__main__":
+    print("Testing NG12 rule pre-triage...")
+    tests = [
+        test_red_flags_are_definitive,
+        test_most_severe_rule_wins,
+        test_risk_factors_and_age,
+        test_rule_table_is_validated,
+        test_agent_records_decision_path,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Check the NumPy exact-search vector backend: top-k order and cosine
+distances against brute force, Chroma-style metadata filters, buffered
+writes that appear on flush (also to other instances), and the
+VectorBackend interface rejecting incomplete backends. Runs standalone or
+under pytest.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.rag.backends import NumpyBackend, VectorBackend
+
+
+def populated(path: str, n: int = 40, dim: int = 16, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(n, dim)).astype(np.float32)
+    backend = NumpyBackend(path)
+    backend.upsert(
+        [f"chunk_{i}" for i in range(n)],
+        embeddings.tolist(),
+        [f"text {i}" for i in range(n)],
+        [{"page": i % 5 + 1, "section_id": "1.1" if i % 2 else "1.3"} for i in range(n)],
+    )
+    backend.flush()
+    return backend, embeddings
+
+
+def brute_force(embeddings, query, rows, k):
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = unit[rows] @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores)[:k]
+    return [f"chunk_{rows[i]}" for i in order], [1.0 - scores[i] for i in order]
+
+
+def test_top_k_matches_brute_force():
+    with tempfile.TemporaryDirectory() as tmp:
+        backend, embeddings = populated(tmp)
+        queries = np.random.default_rng(1).normal(size=(3, 16)).astype(np.float32)
+        results = backend.query(queries.tolist(), top_k=5)
+        assert len(results["ids"]) == 3
+        for q, query in enumerate(queries):
+            ids, distances = brute_force(embeddings, query, list(range(40)), 5)
+            assert results["ids"][q] == ids
+            assert np.allclose(results["distances"][q], distances, atol=1e-5)
+            assert results["documents"][q][0] == f"text {ids[0].split('_')[1]}"
+        # top_k larger than the collection returns everything
+        assert len(backend.query(queries[:1].tolist(), top_k=100)["ids"][0]) == 40
+
+
+def test_metadata_filters():
+    with tempfile.TemporaryDirectory() as tmp:
+        backend, embeddings = populated(tmp)
+        query = embeddings[4]  # chunk_4 is in section 1.3
+
+        results = backend.query([query.tolist()], top_k=3, where={"section_id": "1.1"})
+        assert all(m["section_id"] == "1.1" for m in results["metadatas"][0])
+        odd = [i for i in range(40) if i % 2]
+        assert results["ids"][0] == brute_force(embeddings, query, odd, 3)[0]
+
+        results = backend.query([query.tolist()], top_k=3, where={"section_id": {"$in": ["1.3"]}})
+        assert results["ids"][0][0] == "chunk_4"
+
+        where = {"$and": [{"section_id": "1.3"}, {"page": {"$ne": 5}}]}
+        results = backend.query([query.tolist()], top_k=40, where=where)
+        assert all(m["section_id"] == "1.3" and m["page"] != 5 for m in results["metadatas"][0])
+        assert len(results["ids"][0]) == 16
+
+        assert backend.query([query.tolist()], top_k=3, where={"section_id": "9.9"})["ids"] == [[]]
+
+
+def test_writes_apply_on_flush_and_reach_other_readers():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer, embeddings = populated(tmp, n=6)
+        reader = NumpyBackend(tmp)
+        assert reader.count() == 6
+
+        writer.delete(["chunk_0"])
+        writer.update_metadata(["chunk_1"], [{"page": 99, "section_id": "1.1"}])
+        writer.upsert(["chunk_new"], [embeddings[0].tolist()], ["new text"], [{"page": 7, "section_id": "1.3"}])
+        assert writer.count() == 6  # buffered until flush
+
+        writer.flush()
+        assert reader.count() == 6
+        assert reader.get(ids=["chunk_0"])["ids"] == []
+        assert reader.get(ids=["chunk_1"])["metadatas"] == [{"page": 99, "section_id": "1.1"}]
+        top = reader.query([embeddings[0].tolist()], top_k=1)
+        assert top["ids"] == [["chunk_new"]] and abs(top["distances"][0][0]) < 1e-5
+
+
+def test_incomplete_backend_fails_at_construction():
+    class SearchOnly(VectorBackend):
+        def query(self, query_embeddings, top_k, where=None):
+            return {}
+
+    try:
+        SearchOnly()
+    except TypeError as e:
+        assert "upsert" in str(e)
+    else:
+        raise AssertionError("backend missing abstract methods was instantiated")
+
+
+if __name__ == "__main__":
+    print("Testing vector backends...")
+    tests = [
+        test_top_k_matches_brute_force,
+        test_metadata_filters,
+        test_writes_apply_on_flush_and_reach_other_readers,
+        test_incomplete_backend_fails_at_construction,
+    ]
+    failed = False
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"✗ {test.__name__}: {e}")
+    sys.exit(1 if failed else 0)
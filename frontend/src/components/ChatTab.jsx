@@ -45,7 +45,7 @@ export default function ChatTab() {
     }])
 
     try {
-      const response = await fetch(`${API_BASE}/chat`, {
+      const response = await fetch(`${API_BASE}/chat/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -61,18 +61,62 @@ export default function ChatTab() {
         throw new Error(`Chat failed: ${response.statusText}`)
       }
 
-      const data = await response.json()
-
-      // Add assistant message
+      // Placeholder assistant message, filled in as events arrive
       setMessages(prev => [...prev, {
         role: 'assistant',
-        content: data.answer,
-        citations: data.citations || []
+        content: '',
+        citations: []
       }])
+
+      const updateAssistant = (update) => {
+        setMessages(prev => {
+          const next = [...prev]
+          next[next.length - 1] = { ...next[next.length - 1], ...update(next[next.length - 1]) }
+          return next
+        })
+      }
+
+      // Parse Server-Sent Events: citations first, then tokens, then done
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let finished = false
+
+      while (!finished) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+
+        let boundary
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const rawEvent = buffer.slice(0, boundary)
+          buffer = buffer.slice(boundary + 2)
+
+          let eventName = 'message'
+          let data = ''
+          for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event: ')) eventName = line.slice(7)
+            else if (line.startsWith('data: ')) data += line.slice(6)
+          }
+          const payload = data ? JSON.parse(data) : null
+
+          if (eventName === 'citations') {
+            updateAssistant(() => ({ citations: payload || [] }))
+          } else if (eventName === 'token') {
+            updateAssistant(msg => ({ content: msg.content + payload.text }))
+            setLoading(false)
+          } else if (eventName === 'done') {
+            updateAssistant(() => ({ content: payload.answer }))
+            finished = true
+          } else if (eventName === 'error') {
+            throw new Error(payload.detail)
+          }
+        }
+      }
     } catch (err) {
       setError(`Error: ${err.message}`)
-      // Remove the user message if there was an error
-      setMessages(prev => prev.slice(0, -1))
+      // Remove the user message (and any partial answer) if there was an error
+      setMessages(prev => prev[prev.length - 1]?.role === 'assistant' ? prev.slice(0, -2) : prev.slice(0, -1))
     } finally {
       setLoading(false)
     }